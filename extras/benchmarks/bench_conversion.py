@@ -0,0 +1,36 @@
+import shutil
+import typing as ty
+from pathlib import Path
+import pytest
+from fileformats.medimage import DicomDir, Nifti1, NiftiGz, NiftiGzX
+
+
+@pytest.mark.skipif(shutil.which("dcm2niix") is None, reason="dcm2niix not installed")
+def test_convert_dicom_to_nifti_gz_x(
+    measure: ty.Any,
+    dicom_series: ty.List[ty.List[Path]],
+    tmp_path: Path,
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    monkeypatch.chdir(tmp_path)
+    series_dir = dicom_series[0][0].parent
+    converted = measure(NiftiGzX.convert, lambda: ((DicomDir(series_dir),), {}))
+    assert isinstance(converted, NiftiGzX)
+
+
+@pytest.mark.parametrize(
+    "source,target", [(Nifti1, NiftiGz), (NiftiGz, Nifti1)], ids=["gzip", "gunzip"]
+)
+def test_convert_nifti(
+    measure: ty.Any,
+    nifti_images: ty.List[Path],
+    nifti_gz_images: ty.List[Path],
+    tmp_path: Path,
+    monkeypatch: pytest.MonkeyPatch,
+    source: ty.Type[Nifti1],
+    target: ty.Type[Nifti1],
+) -> None:
+    monkeypatch.chdir(tmp_path)
+    fspath = (nifti_images if source is Nifti1 else nifti_gz_images)[0]
+    converted = measure(target.convert, lambda: ((source(fspath),), {}))
+    assert isinstance(converted, target)
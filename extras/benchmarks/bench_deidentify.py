@@ -0,0 +1,24 @@
+import typing as ty
+import tempfile
+from pathlib import Path
+import pytest
+from fileformats.medimage import DicomSeries
+from fileformats.extras.medimage.deidentification import (
+    DeidentificationProfile,
+    BASIC_PROFILE,
+)
+
+
+@pytest.mark.parametrize("spec", [None, BASIC_PROFILE], ids=["default", "basic"])
+def test_dicom_series_deidentify(
+    measure: ty.Any,
+    dicom_series: ty.List[ty.List[Path]],
+    tmp_path: Path,
+    spec: ty.Optional[DeidentificationProfile],
+) -> None:
+    def setup() -> ty.Tuple[ty.Tuple[ty.Any, ...], ty.Dict[str, ty.Any]]:
+        out_dir = tempfile.mkdtemp(dir=tmp_path)
+        return (DicomSeries(dicom_series[0]),), {"spec": spec, "out_dir": out_dir}
+
+    deidentified, _ = measure(DicomSeries.deidentify, setup)
+    assert len(deidentified.fspaths) == len(dicom_series[0])
@@ -0,0 +1,39 @@
+import typing as ty
+from pathlib import Path
+from fileformats.medimage import DicomSeries
+from fileformats.medimage.sniffing import FormatSniffer
+
+
+def test_sniff_formats(
+    measure: ty.Any,
+    dicom_series: ty.List[ty.List[Path]],
+    nifti_images: ty.List[Path],
+    nifti_gz_images: ty.List[Path],
+) -> None:
+    fspaths = [p for s in dicom_series for p in s] + nifti_images + nifti_gz_images
+
+    def sniff() -> ty.List[ty.List[type]]:
+        sniffer = FormatSniffer()
+        return [sniffer.sniff(p) for p in fspaths]
+
+    assert all(measure(sniff))
+
+
+def test_dicom_series_from_paths(
+    measure: ty.Any, dicom_series: ty.List[ty.List[Path]]
+) -> None:
+    fspaths = [p for s in dicom_series for p in s]
+    series, remaining = measure(DicomSeries.from_paths, lambda: ((fspaths,), {}))
+    assert len(series) == len(dicom_series)
+    assert not remaining
+
+
+def test_dicom_series_iter_from_paths(
+    measure: ty.Any, dicom_series: ty.List[ty.List[Path]]
+) -> None:
+    fspaths = [p for s in dicom_series for p in s]
+
+    def split() -> ty.List[DicomSeries]:
+        return list(DicomSeries.iter_from_paths(fspaths, scope="directory"))
+
+    assert len(measure(split)) == len(dicom_series)
@@ -0,0 +1,70 @@
+import re
+import sys
+import statistics
+import subprocess
+import typing as ty
+import pytest
+
+IMPORTS = {
+    "package": "import fileformats.medimage",
+    "nifti": "from fileformats.medimage import Nifti",
+    "dicom": "from fileformats.medimage import DicomSeries",
+    "all": "from fileformats.medimage import *",
+}
+
+# Prints the peak RSS of the interpreter in KiB after the import. ru_maxrss can't be
+# used as on Linux it includes the RSS of the parent process the interpreter was forked
+# from
+PRINT_PEAK_RSS = (
+    "import re; print(re.search(r'VmHWM:\\s+(\\d+)', open('/proc/self/status').read())[1])"
+    if sys.platform == "linux"
+    else "print(0)"
+)
+
+IMPORT_ROUNDS = 10
+
+
+@pytest.mark.parametrize("statement", IMPORTS.values(), ids=IMPORTS.keys())
+def test_import(measure: ty.Any, statement: str) -> None:
+    """Times the import in a fresh interpreter (including its start-up), recording the
+    median total import time reported by ``-X importtime`` and the increase in the peak
+    RSS of the interpreter compared with bare ones"""
+    bare = [_run(PRINT_PEAK_RSS) for _ in range(IMPORT_ROUNDS)]
+    results: ty.List["subprocess.CompletedProcess[str]"] = []
+
+    def run() -> None:
+        results.append(_run(statement + "\n" + PRINT_PEAK_RSS))
+
+    measure.benchmark.pedantic(run, rounds=IMPORT_ROUNDS)
+    measure.benchmark.extra_info["import_time_ms"] = (
+        statistics.median(_total_import_time(r.stderr) for r in results)
+        - statistics.median(_total_import_time(r.stderr) for r in bare)
+    ) / 1000
+    if sys.platform == "linux":
+        measure.record_rss(
+            (
+                statistics.median(int(r.stdout) for r in results)
+                - statistics.median(int(r.stdout) for r in bare)
+            )
+            / 1024
+        )
+
+
+def _run(code: str) -> "subprocess.CompletedProcess[str]":
+    return subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code],
+        capture_output=True,
+        check=True,
+        text=True,
+    )
+
+
+def _total_import_time(importtime: str) -> int:
+    """Sums the cumulative times (in microseconds) of the top-level imports in the
+    output of ``-X importtime``"""
+    return sum(
+        int(m.group(1))
+        for m in re.finditer(
+            r"^import time:\s+\d+ \|\s+(\d+) \| \S", importtime, re.MULTILINE
+        )
+    )
@@ -0,0 +1,49 @@
+import typing as ty
+from pathlib import Path
+import pytest
+from fileformats.medimage import DicomSeries, DicomMultiframe, Nifti1, NiftiGz
+
+
+def test_dicom_read_metadata(
+    measure: ty.Any, dicom_series: ty.List[ty.List[Path]]
+) -> None:
+    metadata = measure(
+        DicomSeries.read_metadata, lambda: ((DicomSeries(dicom_series[0]),), {})
+    )
+    assert metadata["SeriesNumber"] == 1
+
+
+@pytest.mark.parametrize("method", ["read_array", "dims", "vox_sizes"])
+def test_dicom_series(
+    measure: ty.Any, dicom_series: ty.List[ty.List[Path]], method: str
+) -> None:
+    assert (
+        measure(
+            getattr(DicomSeries, method), lambda: ((DicomSeries(dicom_series[0]),), {})
+        )
+        is not None
+    )
+
+
+@pytest.mark.parametrize("method", ["read_array", "dims", "vox_sizes"])
+def test_dicom_multiframe(measure: ty.Any, dicom_multiframe: Path, method: str) -> None:
+    assert (
+        measure(
+            getattr(DicomMultiframe, method),
+            lambda: ((DicomMultiframe(dicom_multiframe),), {}),
+        )
+        is not None
+    )
+
+
+@pytest.mark.parametrize("klass", [Nifti1, NiftiGz])
+@pytest.mark.parametrize("method", ["read_metadata", "read_array", "dims", "vox_sizes"])
+def test_nifti(
+    measure: ty.Any,
+    nifti_images: ty.List[Path],
+    nifti_gz_images: ty.List[Path],
+    klass: ty.Type[Nifti1],
+    method: str,
+) -> None:
+    fspath = (nifti_images if klass is Nifti1 else nifti_gz_images)[0]
+    assert measure(getattr(klass, method), lambda: ((klass(fspath),), {})) is not None
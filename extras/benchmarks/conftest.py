@@ -0,0 +1,301 @@
+"""Fixtures for the benchmarks of the medimage readers, grouping, conversion and
+deidentification, which are run with pytest-benchmark from the repository root, e.g.
+
+    pytest extras/benchmarks --benchmark-save=baseline
+
+to record a new baseline (saved in ``extras/benchmarks/baselines``) and
+
+    pytest extras/benchmarks --benchmark-compare --benchmark-compare-fail=mean:20% \\
+        --rss-compare --rss-compare-fail=20
+
+to fail if the wall times or peak RSS increase by more than 20% compared with the
+latest saved baseline. The size of the generated data is scaled with ``--data-scale``.
+"""
+
+import gc
+import re
+import json
+import ctypes
+import ctypes.util
+import typing as ty
+from pathlib import Path
+import pytest
+from pytest_benchmark.utils import get_machine_id
+from fileformats.core import SampleFileGenerator
+from fileformats.medimage.header_index import set_header_index
+from fileformats.extras.medimage.conversion_cache import set_conversion_cache
+from fileformats.extras.medimage.synthetic import (
+    generate_dicom_series,
+    generate_nifti_images,
+)
+
+# The number of timed rounds of each benchmark, each on freshly created filesets so
+# that values cached on the filesets aren't measured
+ROUNDS = 5
+
+# Increases in peak RSS below this size (in MiB) are treated as noise when comparing
+# against the baseline
+RSS_NOISE_FLOOR = 2.0
+
+
+def pytest_addoption(parser: pytest.Parser) -> None:
+    group = parser.getgroup("medimage benchmarks")
+    group.addoption(
+        "--data-scale",
+        type=int,
+        default=1,
+        help="multiplies the number of generated series and images (default: 1)",
+    )
+    group.addoption(
+        "--rss-compare",
+        nargs="?",
+        const="latest",
+        default=None,
+        help=(
+            "compare the peak RSS of each benchmark with the saved run with the given "
+            "number or path, by default the latest one"
+        ),
+    )
+    group.addoption(
+        "--rss-compare-fail",
+        type=float,
+        default=None,
+        help="fail if the peak RSS increases by more than the given percentage",
+    )
+
+
+@pytest.fixture(scope="session")
+def data_scale(request: pytest.FixtureRequest) -> int:
+    return int(request.config.getoption("--data-scale"))
+
+
+@pytest.fixture(scope="session", autouse=True)
+def disable_caches() -> ty.Iterator[None]:
+    """Makes sure the persistent header index and conversion cache aren't used, even if
+    they are enabled in the environment"""
+    header_index = set_header_index(None)
+    conversion_cache = set_conversion_cache(None)
+    yield
+    set_header_index(header_index)
+    set_conversion_cache(conversion_cache)
+
+
+@pytest.fixture(scope="session")
+def data_dir(tmp_path_factory: pytest.TempPathFactory) -> Path:
+    return tmp_path_factory.mktemp("data")
+
+
+@pytest.fixture(scope="session")
+def dicom_series(data_dir: Path, data_scale: int) -> ty.List[ty.List[Path]]:
+    """Single-frame DICOM series, each in its own directory"""
+    return generate_dicom_series(
+        SampleFileGenerator(data_dir / "dicom", seed=1, fname_stem="series"),
+        num_series=4 * data_scale,
+        num_slices=64,
+        matrix_size=(128, 128),
+    )
+
+
+@pytest.fixture(scope="session")
+def dicom_multiframe(data_dir: Path, data_scale: int) -> Path:
+    """A multi-frame DICOM image"""
+    ((fspath,),) = generate_dicom_series(
+        SampleFileGenerator(data_dir / "multiframe", seed=1, fname_stem="series"),
+        num_slices=64 * data_scale,
+        matrix_size=(128, 128),
+        multiframe=True,
+    )
+    return fspath
+
+
+@pytest.fixture(scope="session")
+def nifti_images(data_dir: Path, data_scale: int) -> ty.List[Path]:
+    """Uncompressed NIfTI-1 images"""
+    return generate_nifti_images(
+        SampleFileGenerator(data_dir / "nifti", seed=1, fname_stem="image"),
+        num_images=4 * data_scale,
+        shape=(128, 128, 64),
+        compressed=False,
+    )
+
+
+@pytest.fixture(scope="session")
+def nifti_gz_images(data_dir: Path, data_scale: int) -> ty.List[Path]:
+    """Gzipped NIfTI-1 images"""
+    return generate_nifti_images(
+        SampleFileGenerator(data_dir / "nifti-gz", seed=1, fname_stem="image"),
+        num_images=4 * data_scale,
+        shape=(128, 128, 64),
+    )
+
+
+class Measure:
+    """Times a function with pytest-benchmark and records the peak resident set size
+    (RSS) of the process while running it in the extra info of the benchmark, which is
+    saved with the timings"""
+
+    def __init__(
+        self,
+        benchmark: ty.Any,
+        rss_baseline: ty.Optional[float] = None,
+        rss_limit: ty.Optional[float] = None,
+    ):
+        self.benchmark = benchmark
+        self.rss_baseline = rss_baseline
+        self.rss_limit = rss_limit
+
+    def __call__(
+        self,
+        func: ty.Callable[..., ty.Any],
+        setup: ty.Optional[
+            ty.Callable[[], ty.Tuple[ty.Tuple[ty.Any, ...], ty.Dict[str, ty.Any]]]
+        ] = None,
+        rounds: int = ROUNDS,
+    ) -> ty.Any:
+        """Runs the function to warm up, once more to measure its peak RSS and then for
+        the given number of timed rounds
+
+        Parameters
+        ----------
+        func : Callable
+            the function to benchmark
+        setup : Callable, optional
+            returns the positional and keyword arguments to call the function with,
+            which is called before each run and isn't timed
+        rounds : int, optional
+            the number of timed rounds, by default ROUNDS
+
+        Returns
+        -------
+        Any
+            the value returned by the function in the last round
+        """
+        if setup is None:
+            setup = _no_args
+        # Warm up so one-off imports and caches aren't included in the peak RSS
+        args, kwargs = setup()
+        func(*args, **kwargs)
+        args, kwargs = setup()
+        increase = peak_rss_increase(func, *args, **kwargs)
+        if increase is not None:
+            self.record_rss(increase)
+        return self.benchmark.pedantic(func, setup=setup, rounds=rounds)
+
+    def record_rss(self, increase: float) -> None:
+        """Records an increase in peak RSS (in MiB) measured for the benchmark and fails
+        if it exceeds the baseline it is compared with by more than the limit"""
+        self.benchmark.extra_info["peak_rss_increase_mib"] = round(increase, 2)
+        if self.rss_baseline is None or self.rss_limit is None:
+            return
+        if increase > max(
+            self.rss_baseline * (1 + self.rss_limit / 100),
+            self.rss_baseline + RSS_NOISE_FLOOR,
+        ):
+            pytest.fail(
+                f"Peak RSS increase of {increase:.1f} MiB is more than "
+                f"{self.rss_limit}% above the baseline of {self.rss_baseline:.1f} MiB"
+            )
+
+
+@pytest.fixture
+def measure(benchmark: ty.Any, request: pytest.FixtureRequest) -> Measure:
+    saved_run = request.config.getoption("--rss-compare")
+    if saved_run is None:
+        return Measure(benchmark)
+    return Measure(
+        benchmark,
+        rss_baseline=_saved_rss(request.config, saved_run).get(benchmark.fullname),
+        rss_limit=request.config.getoption("--rss-compare-fail"),
+    )
+
+
+def peak_rss_increase(
+    func: ty.Callable[..., ty.Any], *args: ty.Any, **kwargs: ty.Any
+) -> ty.Optional[float]:
+    """Calls the function and returns how much the peak RSS of the process exceeded the
+    RSS before the call, in MiB. The high-water mark of the RSS is reset before the call
+    through ``/proc/self/clear_refs``, so it is only measured on Linux
+
+    Parameters
+    ----------
+    func : Callable
+        the function to call
+    *args, **kwargs
+        the arguments to call the function with
+
+    Returns
+    -------
+    float or None
+        the increase in MiB, or None if the peak RSS can't be reset on this platform
+    """
+    gc.collect()
+    # Return freed memory to the OS so it isn't reused without increasing the RSS
+    if _libc is not None:
+        _libc.malloc_trim(0)
+    try:
+        with open("/proc/self/clear_refs", "w") as f:
+            f.write("5")
+    except OSError:
+        func(*args, **kwargs)
+        return None
+    before = _proc_status_kib("VmRSS")
+    func(*args, **kwargs)
+    return (_proc_status_kib("VmHWM") - before) / 1024
+
+
+def _load_libc() -> ty.Optional[ctypes.CDLL]:
+    """Loads the C library if it is glibc, which provides ``malloc_trim``"""
+    name = ctypes.util.find_library("c")
+    try:
+        libc = ctypes.CDLL(name)
+        libc.malloc_trim
+    except (OSError, AttributeError, TypeError):
+        return None
+    return libc
+
+
+_libc = _load_libc()
+
+
+def _proc_status_kib(field: str) -> int:
+    with open("/proc/self/status") as f:
+        match = re.search(rf"^{field}:\s+(\d+) kB", f.read(), re.MULTILINE)
+    assert match, f"{field} not found in /proc/self/status"
+    return int(match.group(1))
+
+
+def _no_args() -> ty.Tuple[ty.Tuple[ty.Any, ...], ty.Dict[str, ty.Any]]:
+    return (), {}
+
+
+_SAVED_RSS: ty.Dict[str, ty.Dict[str, float]] = {}
+
+
+def _saved_rss(config: pytest.Config, saved_run: str) -> ty.Dict[str, float]:
+    """Reads the peak RSS increases of the benchmarks from a saved run, either the path
+    to the saved JSON file or the number of the run (or "latest") saved for this machine
+    in the benchmark storage"""
+    if saved_run not in _SAVED_RSS:
+        fspath = Path(saved_run)
+        if not fspath.exists():
+            storage = Path(
+                config.getoption("benchmark_storage").replace("file://", "", 1)
+            )
+            saved = sorted(
+                (storage / get_machine_id()).glob("[0-9][0-9][0-9][0-9]_*.json")
+            )
+            if saved_run != "latest":
+                saved = [p for p in saved if p.name.startswith(saved_run.zfill(4))]
+            if not saved:
+                raise pytest.UsageError(
+                    f"No saved benchmark run {saved_run} in {storage}"
+                )
+            fspath = saved[-1]
+        with open(fspath) as f:
+            benchmarks = json.load(f)["benchmarks"]
+        _SAVED_RSS[saved_run] = {
+            b["fullname"]: b["extra_info"]["peak_rss_increase_mib"]
+            for b in benchmarks
+            if "peak_rss_increase_mib" in b["extra_info"]
+        }
+    return _SAVED_RSS[saved_run]
@@ -2,5 +2,12 @@
 from ._version import __version__
 from . import converters
 from . import dicom
+from . import dicom_to_nifti
 from . import diffusion
 from . import nifti
+from . import geometry
+from . import gzip_index
+from . import deidentification
+from . import batch
+from . import conversion_cache
+from . import synthetic
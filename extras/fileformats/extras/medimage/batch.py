@@ -0,0 +1,306 @@
+"""Converts many DICOM collections (e.g. the series returned by
+``DicomSeries.from_paths``) in a single batch, with bounded concurrency and a manifest of
+completed conversions that allows interrupted batches to be resumed.
+"""
+
+import os
+import json
+import shutil
+import hashlib
+import logging
+import tempfile
+import threading
+import typing as ty
+from collections import deque
+from concurrent.futures import Executor, Future, ThreadPoolExecutor
+from pathlib import Path
+import attrs
+from fileformats.core import FileSet
+from fileformats.core.typing import PathType
+from fileformats.medimage import DicomCollection, NiftiGzX
+from fileformats.medimage.dicom import worker_pool
+from fileformats.medimage.header_index import file_key
+from .dicom import _dicom_files
+
+logger = logging.getLogger("fileformats")
+
+MANIFEST_NAME = "conversions.jsonl"
+
+
+class ConversionResult(ty.NamedTuple):
+    """The outcome of converting one collection in a batch"""
+
+    collection: DicomCollection
+    out_file: ty.Optional[FileSet]
+    skipped: bool = False
+    error: ty.Optional[str] = None
+
+
+def convert_dicom_collections(
+    collections: ty.Iterable[DicomCollection],
+    out_dir: PathType,
+    target_format: ty.Type[FileSet] = NiftiGzX,
+    max_workers: ty.Optional[int] = None,
+    pool: ty.Union[str, Executor] = "process",
+    manifest: ty.Optional[PathType] = None,
+    out_name: ty.Optional[ty.Callable[[DicomCollection], str]] = None,
+    ignore_errors: bool = False,
+    **kwargs: ty.Any,
+) -> ty.Iterator[ConversionResult]:
+    """Converts DICOM collections into the target format, saving the converted files in
+    the output directory. Conversions are recorded in a manifest as they complete, so
+    collections that have already been converted with the same converter and arguments,
+    and haven't been modified since, are skipped when the batch is rerun.
+
+    Each worker reuses a single scratch directory for the intermediate files of the
+    conversions it runs, which is cleared after each job.
+
+    Parameters
+    ----------
+    collections : Iterable[DicomCollection]
+        the collections to convert, which are only consumed as workers become free
+    out_dir : str or Path
+        the directory to save the converted files in
+    target_format : type, optional
+        the format to convert the collections to, by default NiftiGzX
+    max_workers : int, optional
+        the maximum number of conversions to run concurrently
+    pool : str or Executor, optional
+        the type of worker pool to run the conversions in, "process" (default) or
+        "thread", or an existing executor. Converter tasks change the working directory
+        of the process they run in, so thread pools can only be used with a single
+        worker (i.e. max_workers=1)
+    manifest : str or Path, optional
+        path to the manifest of completed conversions, by default "conversions.jsonl"
+        in the output directory
+    out_name : Callable[[DicomCollection], str], optional
+        returns the stem of the converted files for a collection, which needs to be
+        unique and stable across runs, by default the series number followed by a hash
+        of the paths of the DICOM files
+    ignore_errors : bool, optional
+        whether to record failed conversions in the results and carry on instead of
+        raising the error, by default False
+    **kwargs
+        keyword arguments passed on to the converter task
+
+    Yields
+    ------
+    ConversionResult
+        the results of the conversions in the order of the input collections
+    """
+    if max_workers != 1 and (pool == "thread" or isinstance(pool, ThreadPoolExecutor)):
+        raise ValueError(
+            "Conversions can only be run in a thread pool with a single worker "
+            "(max_workers=1) as converter tasks change the working directory of the "
+            f"process, not {max_workers}"
+        )
+    out_dir = Path(out_dir).absolute()
+    out_dir.mkdir(parents=True, exist_ok=True)
+    manifest_path = Path(manifest) if manifest else out_dir / MANIFEST_NAME
+    if out_name is None:
+        out_name = default_out_name
+    completed = read_manifest(manifest_path)
+    params: ty.Dict[ty.Type[DicomCollection], str] = {}
+    scratch_dir = Path(tempfile.mkdtemp(prefix="dicom-conversions-"))
+    try:
+        with (
+            worker_pool(pool, max_workers) as executor,
+            open(manifest_path, "a") as manifest_file,
+        ):
+            max_pending = 2 * (max_workers or os.cpu_count() or 1)
+            pending: ty.Deque[
+                ty.Tuple[DicomCollection, ty.Optional[Future[ty.Any]], ty.Any]
+            ] = deque()
+            for collection in collections:
+                name = out_name(collection)
+                signature = input_signature(collection)
+                source_format = type(collection)
+                if source_format not in params:
+                    params[source_format] = conversion_signature(
+                        target_format.get_converter(source_format=source_format), kwargs
+                    )
+                entry = completed.get(name)
+                if (
+                    entry is not None
+                    and entry["inputs"] == signature
+                    and entry["target"] == target_format.mime_like
+                    and entry.get("params") == params[source_format]
+                    and all((out_dir / p).exists() for p in entry["outputs"])
+                ):
+                    out_file = target_format([out_dir / p for p in entry["outputs"]])
+                    pending.append((collection, None, out_file))
+                else:
+                    future = executor.submit(
+                        _convert,
+                        collection,
+                        target_format,
+                        out_dir,
+                        name,
+                        scratch_dir,
+                        kwargs,
+                    )
+                    pending.append(
+                        (collection, future, (name, signature, params[source_format]))
+                    )
+                while len(pending) > max_pending or (pending and pending[0][1] is None):
+                    yield _collect(
+                        pending.popleft(),
+                        manifest_file,
+                        out_dir,
+                        target_format,
+                        ignore_errors,
+                    )
+            while pending:
+                yield _collect(
+                    pending.popleft(),
+                    manifest_file,
+                    out_dir,
+                    target_format,
+                    ignore_errors,
+                )
+    finally:
+        shutil.rmtree(scratch_dir, ignore_errors=True)
+
+
+def default_out_name(collection: DicomCollection) -> str:
+    """The series number of the collection followed by a hash of the paths of its files,
+    so that series with the same number in different sessions don't clash"""
+    paths = sorted(os.path.abspath(p) for p in _dicom_files(collection))
+    digest = hashlib.sha1("\n".join(paths).encode()).hexdigest()[:12]
+    try:
+        prefix = str(collection.series_number())
+    except Exception:
+        prefix = "unknown"
+    return f"{prefix}-{digest}"
+
+
+def input_signature(collection: DicomCollection) -> str:
+    """A hash of the paths, sizes and modification times of the files in the collection,
+    which changes if any of them are modified"""
+    keys = sorted(file_key(p) for p in _dicom_files(collection))
+    return hashlib.sha1(json.dumps(keys).encode()).hexdigest()
+
+
+def conversion_signature(converter: ty.Any, kwargs: ty.Dict[str, ty.Any]) -> str:
+    """A hash of the converter task (including any arguments preset in its
+    registration) and the keyword arguments passed to it, which changes if a collection
+    would be converted differently"""
+    if converter is None:
+        identity = None
+    else:
+        task = converter.task
+        constructor = getattr(task, "constructor", type(task))
+        identity = [
+            f"{constructor.__module__}.{constructor.__qualname__}",
+            repr(task),
+        ]
+    params = json.dumps([identity, kwargs], sort_keys=True, default=repr)
+    return hashlib.sha1(params.encode()).hexdigest()
+
+
+def read_manifest(manifest_path: PathType) -> ty.Dict[str, ty.Dict[str, ty.Any]]:
+    """Reads the entries of a conversion manifest, keyed by the names of the converted
+    collections, ignoring any partially written last line left by an interrupted batch
+
+    Parameters
+    ----------
+    manifest_path : str or Path
+        path to the manifest
+
+    Returns
+    -------
+    dict[str, dict[str, Any]]
+        the latest entry for each converted collection
+    """
+    entries: ty.Dict[str, ty.Dict[str, ty.Any]] = {}
+    try:
+        with open(manifest_path) as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except json.JSONDecodeError:
+                    logger.warning(
+                        "Ignoring corrupt line in conversion manifest %s: %r",
+                        manifest_path,
+                        line,
+                    )
+                    continue
+                entries[entry["name"]] = entry
+    except FileNotFoundError:
+        pass
+    return entries
+
+
+def _collect(
+    job: ty.Tuple[DicomCollection, ty.Optional["Future[ty.Any]"], ty.Any],
+    manifest_file: ty.TextIO,
+    out_dir: Path,
+    target_format: ty.Type[FileSet],
+    ignore_errors: bool,
+) -> ConversionResult:
+    """Waits for a conversion job to complete and records it in the manifest"""
+    collection, future, info = job
+    if future is None:
+        return ConversionResult(collection, info, skipped=True)
+    name, signature, params = info
+    try:
+        out_file = future.result()
+    except Exception as e:
+        if not ignore_errors:
+            raise
+        logger.warning("Could not convert %s: %s", collection, e)
+        return ConversionResult(collection, None, error=str(e))
+    entry = {
+        "name": name,
+        "inputs": signature,
+        "target": target_format.mime_like,
+        "params": params,
+        "outputs": [str(p.relative_to(out_dir)) for p in sorted(out_file.fspaths)],
+    }
+    manifest_file.write(json.dumps(entry) + "\n")
+    manifest_file.flush()
+    os.fsync(manifest_file.fileno())
+    return ConversionResult(collection, out_file)
+
+
+def _convert(
+    collection: DicomCollection,
+    target_format: ty.Type[FileSet],
+    out_dir: Path,
+    name: str,
+    scratch_dir: Path,
+    kwargs: ty.Dict[str, ty.Any],
+) -> FileSet:
+    """Runs the converter task in the worker's scratch directory and copies the
+    converted files into the output directory"""
+    work_dir = scratch_dir / f"worker-{os.getpid()}-{threading.get_ident()}"
+    work_dir.mkdir(parents=True, exist_ok=True)
+    try:
+        converter = target_format.get_converter(source_format=type(collection))
+        converted: FileSet
+        if converter is None:
+            converted = collection
+        else:
+            task_kwargs = dict(kwargs)
+            if converter.is_chain:
+                task_kwargs = {"converter_kwargs": task_kwargs} if task_kwargs else {}
+            task_kwargs[converter.in_file] = collection
+            task = attrs.evolve(converter.task, **task_kwargs)
+            outputs = task(cache_root=work_dir)
+            converted = getattr(outputs, converter.out_file)
+        if not isinstance(converted, target_format):
+            converted = target_format(converted)
+        return converted.copy(
+            out_dir,
+            mode=FileSet.CopyMode.hardlink_or_copy,
+            collation=FileSet.CopyCollation.siblings,
+            new_stem=name,
+            overwrite=True,
+        )
+    finally:
+        # Clear the scratch directory so it can be reused by the next job
+        for path in work_dir.iterdir():
+            if path.is_dir():
+                shutil.rmtree(path, ignore_errors=True)
+            else:
+                path.unlink(missing_ok=True)
@@ -0,0 +1,296 @@
+"""A content-addressed, on-disk cache of converted images, so that converting the same
+input files with the same options again (e.g. in repeated runs of a pipeline over the
+same archive) just links the previously converted files back instead of running the
+converter.
+
+The cache is disabled by default and can be enabled by either setting the
+``FILEFORMATS_MEDIMAGE_CONVERSION_CACHE`` environment variable to the path of the cache
+directory or by calling ``set_conversion_cache``. The total size of the cache is bounded
+(by ``FILEFORMATS_MEDIMAGE_CONVERSION_CACHE_SIZE`` bytes if set), with the least recently
+used conversions evicted first.
+"""
+
+import os
+import json
+import uuid
+import shutil
+import hashlib
+import functools
+import typing as ty
+from pathlib import Path
+from fileformats.core import FileSet, from_mime
+from fileformats.medimage import instrumentation
+from ._version import __version__
+
+CONVERSION_CACHE_ENV_VAR = "FILEFORMATS_MEDIMAGE_CONVERSION_CACHE"
+CONVERSION_CACHE_SIZE_ENV_VAR = "FILEFORMATS_MEDIMAGE_CONVERSION_CACHE_SIZE"
+
+DEFAULT_MAX_SIZE = 10 * 1024**3
+
+# Size of the chunks sampled from the start, middle and end of each file to fingerprint it
+FINGERPRINT_SAMPLE_SIZE = 64 * 1024
+
+MANIFEST_NAME = "__fileset__.json"
+
+
+class ConversionCache:
+    """A cache of converted file-sets stored under the hash of their inputs (see
+    ``conversion_key``), with the least recently used conversions evicted when the total
+    size of the cache exceeds its limit.
+
+    Each conversion is stored in its own directory, which is created atomically so the
+    cache can be shared between concurrent processes.
+
+    Parameters
+    ----------
+    path : str or os.PathLike
+        path to the cache directory, which is created if it doesn't exist
+    max_size : int, optional
+        the maximum total size of the cached files in bytes, by default 10 GiB
+    """
+
+    def __init__(
+        self,
+        path: ty.Union[str, os.PathLike[str]],
+        max_size: int = DEFAULT_MAX_SIZE,
+    ):
+        self.path = Path(path).absolute()
+        self.max_size = max_size
+        self.path.mkdir(parents=True, exist_ok=True)
+
+    def __repr__(self) -> str:
+        return f"{type(self).__name__}({str(self.path)!r}, max_size={self.max_size})"
+
+    def __contains__(self, key: str) -> bool:
+        return (self._entry_dir(key) / MANIFEST_NAME).exists()
+
+    def get(self, key: str, dest_dir: ty.Union[str, os.PathLike[str]]) -> FileSet:
+        """Links the cached files of a conversion into the destination directory
+
+        Parameters
+        ----------
+        key : str
+            the key the conversion is cached under
+        dest_dir : str or os.PathLike
+            the directory to link the files into
+
+        Returns
+        -------
+        FileSet
+            the cached file-set, in the destination directory
+
+        Raises
+        ------
+        KeyError
+            if the conversion isn't in the cache (e.g. if it has since been evicted)
+        """
+        entry_dir = self._entry_dir(key)
+        try:
+            with open(entry_dir / MANIFEST_NAME) as f:
+                manifest = json.load(f)
+            dest_dir = Path(dest_dir)
+            fspaths = []
+            for fname in manifest["files"]:
+                fspath = dest_dir / fname
+                _link_or_copy(entry_dir / fname, fspath)
+                fspaths.append(fspath)
+        except FileNotFoundError:
+            instrumentation.count("conversion_cache.miss")
+            raise KeyError(key)
+        instrumentation.count("conversion_cache.hit")
+        # Record the access for the LRU eviction order
+        os.utime(entry_dir)
+        klass = ty.cast(ty.Type[FileSet], from_mime(manifest["type"]))
+        return klass(fspaths)
+
+    def put(self, key: str, fileset: FileSet) -> None:
+        """Adds a converted file-set to the cache, evicting the least recently used
+        conversions if the cache is now over its size limit
+
+        Parameters
+        ----------
+        key : str
+            the key to cache the conversion under
+        fileset : FileSet
+            the converted file-set
+        """
+        entry_dir = self._entry_dir(key)
+        if entry_dir.exists():
+            return
+        names = [p.name for p in fileset.fspaths]
+        if len(set(names)) != len(names) or MANIFEST_NAME in names:
+            return  # can't be stored in a flat directory
+        # Populate a temporary directory and move it into place in one step so other
+        # processes never see partially written entries
+        tmp_dir = self.path / "tmp" / uuid.uuid4().hex
+        tmp_dir.mkdir(parents=True)
+        try:
+            for fspath in fileset.fspaths:
+                _link_or_copy(fspath, tmp_dir / fspath.name)
+            with open(tmp_dir / MANIFEST_NAME, "w") as f:
+                json.dump({"type": fileset.mime_like, "files": sorted(names)}, f)
+            entry_dir.parent.mkdir(exist_ok=True)
+            try:
+                tmp_dir.rename(entry_dir)
+            except OSError:
+                pass  # already added by another process
+        finally:
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+        self.evict()
+
+    def evict(self) -> None:
+        """Removes the least recently used conversions until the total size of the cache
+        is within its limit"""
+        entries = []
+        total_size = 0
+        for entry_dir in self.path.glob("??/*"):
+            try:
+                last_used = entry_dir.stat().st_mtime
+                size = sum(p.stat().st_size for p in entry_dir.iterdir())
+            except FileNotFoundError:
+                continue  # evicted by another process
+            entries.append((last_used, size, entry_dir))
+            total_size += size
+        for _, size, entry_dir in sorted(entries):
+            if total_size <= self.max_size:
+                break
+            shutil.rmtree(entry_dir, ignore_errors=True)
+            total_size -= size
+
+    def clear(self) -> None:
+        """Removes all conversions from the cache"""
+        for entry_dir in self.path.glob("??/*"):
+            shutil.rmtree(entry_dir, ignore_errors=True)
+
+    def _entry_dir(self, key: str) -> Path:
+        return self.path / key[:2] / key
+
+
+def conversion_key(
+    converter: str, fileset: FileSet, params: ty.Mapping[str, ty.Any]
+) -> str:
+    """Generates the key a conversion is cached under from the name and parameters of
+    the converter and the fingerprints of the input files (see ``file_fingerprint``).
+
+    The key depends on the contents of the files but not their names or locations, so
+    copies of the same files (e.g. in different work directories) share conversions
+
+    Parameters
+    ----------
+    converter : str
+        the name of the converter
+    fileset : FileSet
+        the input file-set
+    params : Mapping[str, Any]
+        the parameters passed to the converter, which need to be JSON serialisable
+
+    Returns
+    -------
+    str
+        the hex digest of the hash of the converter and inputs
+    """
+    fingerprints: ty.List[str] = []
+    for fspath in fileset.fspaths:
+        if fspath.is_dir():
+            fingerprints.extend(
+                file_fingerprint(p) for p in fspath.rglob("*") if p.is_file()
+            )
+        else:
+            fingerprints.append(file_fingerprint(fspath))
+    spec = {
+        "converter": converter,
+        "version": __version__,
+        "params": dict(params),
+        "inputs": sorted(fingerprints),
+    }
+    return hashlib.sha256(json.dumps(spec, sort_keys=True).encode()).hexdigest()
+
+
+def file_fingerprint(fspath: ty.Union[str, os.PathLike[str]]) -> str:
+    """A fast fingerprint of the contents of a file, a hash of its size and chunks
+    sampled from its start, middle and end, which is memoised on the path, size and
+    modification time of the file so it is only read once while unchanged
+
+    Parameters
+    ----------
+    fspath : str or os.PathLike
+        path to the file
+
+    Returns
+    -------
+    str
+        the hex digest of the fingerprint
+    """
+    path = os.path.abspath(fspath)
+    stat = os.stat(path)
+    return _sampled_hash(path, stat.st_size, stat.st_mtime_ns)
+
+
+@functools.lru_cache(maxsize=65536)
+def _sampled_hash(path: str, size: int, mtime: int) -> str:
+    crypto = hashlib.sha256(str(size).encode())
+    with open(path, "rb") as f:
+        if size <= 3 * FINGERPRINT_SAMPLE_SIZE:
+            crypto.update(f.read())
+        else:
+            for offset in (
+                0,
+                (size - FINGERPRINT_SAMPLE_SIZE) // 2,
+                size - FINGERPRINT_SAMPLE_SIZE,
+            ):
+                f.seek(offset)
+                crypto.update(f.read(FINGERPRINT_SAMPLE_SIZE))
+    return crypto.hexdigest()
+
+
+def _link_or_copy(src: Path, dst: Path) -> None:
+    try:
+        os.link(src, dst)
+    except OSError:
+        shutil.copyfile(src, dst)
+
+
+def get_conversion_cache() -> ty.Optional[ConversionCache]:
+    """Returns the conversion cache that is currently in use, if any
+
+    Returns
+    -------
+    ConversionCache or None
+        the cache set by ``set_conversion_cache`` or, if it hasn't been called, the
+        one at the path in the ``FILEFORMATS_MEDIMAGE_CONVERSION_CACHE`` environment
+        variable. None if neither are set.
+    """
+    if _conversion_cache is not _UNSET:
+        return _conversion_cache  # type: ignore[return-value]
+    path = os.environ.get(CONVERSION_CACHE_ENV_VAR)
+    if not path:
+        return None
+    max_size = os.environ.get(CONVERSION_CACHE_SIZE_ENV_VAR)
+    return ConversionCache(path, int(max_size) if max_size else DEFAULT_MAX_SIZE)
+
+
+def set_conversion_cache(
+    cache: ty.Union[ConversionCache, str, os.PathLike[str], None],
+) -> ty.Optional[ConversionCache]:
+    """Sets the conversion cache to use, overriding the one set in the environment
+
+    Parameters
+    ----------
+    cache : ConversionCache or str or os.PathLike or None
+        the cache or path to the cache directory to use, or None to disable caching
+
+    Returns
+    -------
+    ConversionCache or None
+        the cache that was previously in use
+    """
+    global _conversion_cache
+    previous = get_conversion_cache()
+    if cache is not None and not isinstance(cache, ConversionCache):
+        cache = ConversionCache(cache)
+    _conversion_cache = cache
+    return previous
+
+
+_UNSET = object()
+_conversion_cache: ty.Union[ConversionCache, None, object] = _UNSET
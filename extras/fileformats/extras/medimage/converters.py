@@ -4,12 +4,18 @@ import typing as ty
 import tempfile
 from fileformats.core import converter
 from pydra.compose import python, workflow
+from pydra.utils import get_fields
 from fileformats.medimage.dicom import DicomDir, DicomCollection, DicomSeries
 from fileformats.application import Json
 from fileformats.medimage import (
     MedicalImage,
     Analyze,
+    Mgh,
+    MghGz,
+    Nrrd,
+    NrrdGz,
     Nifti,
+    Nifti1,
     NiftiGz,
     NiftiX,
     NiftiGzX,
@@ -19,16 +25,28 @@ from fileformats.medimage import (
     NiftiGzXBvec,
 )
 from fileformats.core.typing import PathType
+from fileformats.medimage import instrumentation
+from fileformats.medimage.gzip_codec import (
+    ParallelGzipCodec,
+    compress_file,
+    decompress_file,
+    DEFAULT_COMPRESS_LEVEL,
+)
 from pydra.tasks.dcm2niix import Dcm2Niix
 from pydra.tasks.mrtrix3.v3_1 import MrConvert
 from fileformats.generic import File, Directory  # noqa: F401
 from fileformats.vendor.mrtrix3.medimage import ImageIn, ImageOut, Tracks  # noqa: F401
+from .dicom_to_nifti import convert_dicom_to_nifti, supports_native_conversion
+from .conversion_cache import conversion_key, get_conversion_cache
 
 
 @python.define  # type: ignore
 def EnsureDicomDir(dicom: DicomCollection) -> DicomDir:
     if isinstance(dicom, DicomSeries):
-        dicom_dir_fspath = tempfile.mkdtemp()
+        # Link the files into the task's working directory so they are cleaned up
+        # along with the rest of its outputs
+        dicom_dir_fspath = Path.cwd() / "dicom"
+        dicom_dir_fspath.mkdir(exist_ok=True)
         dicom.copy(dicom_dir_fspath, mode=DicomDir.CopyMode.link)
         dicom = DicomDir(dicom_dir_fspath)
     elif not isinstance(dicom, DicomDir):
@@ -43,10 +61,10 @@ def EnsureDicomDir(dicom: DicomCollection) -> DicomDir:
 @converter(source_format=DicomCollection, target_format=NiftiGz, compress="y")  # type: ignore
 @converter(source_format=DicomCollection, target_format=NiftiX)  # type: ignore
 @converter(source_format=DicomCollection, target_format=NiftiGzX, compress="y")  # type: ignore
-@converter(source_format=DicomCollection, target_format=NiftiXBvec)  # type: ignore
-@converter(source_format=DicomCollection, target_format=NiftiBvec)  # type: ignore
-@converter(source_format=DicomCollection, target_format=NiftiGzBvec)  # type: ignore
-@converter(source_format=DicomCollection, target_format=NiftiGzXBvec, compress="y")  # type: ignore
+@converter(source_format=DicomCollection, target_format=NiftiXBvec, native=False)  # type: ignore
+@converter(source_format=DicomCollection, target_format=NiftiBvec, native=False)  # type: ignore
+@converter(source_format=DicomCollection, target_format=NiftiGzBvec, native=False)  # type: ignore
+@converter(source_format=DicomCollection, target_format=NiftiGzXBvec, compress="y", native=False)  # type: ignore
 @workflow.define(outputs=["out_file"])  # type: ignore
 def ExtendedDcm2niix(
     in_file: DicomCollection,
@@ -55,6 +73,7 @@ def ExtendedDcm2niix(
     side_car_jq: ty.Optional[str] = None,
     extract_volume: ty.Optional[int] = None,
     to_4d: bool = False,
+    native: bool = True,
 ) -> Nifti:
     """The Dcm2niix command wrapped in a workflow in order to map the inputs and outputs
     onto "in_file" and "out_file", respectively, and implement optional post-conversion
@@ -79,6 +98,14 @@ def ExtendedDcm2niix(
         volume to extract, by default None
     to_4d : bool, optional
         whether to wrap resulting 3D NIfTI volume in a 4D dataset, by default False
+    native : bool, optional
+        whether to convert simple single-volume series (see
+        ``supports_native_conversion``) in-process instead of running dcm2niix when no
+        post-conversion manipulations are requested, by default True
+
+    If a conversion cache is configured (see ``get_conversion_cache``), the converted
+    files are linked from the cache when the same files have been converted with the same
+    options before, and added to it otherwise.
 
     Returns
     -------
@@ -95,6 +122,89 @@ def ExtendedDcm2niix(
         raise ValueError(
             f"'extract_volume' ({extract_volume}) and 'to_4d' are mutually exclusive"
         )
+    conversion = workflow.add(
+        CachedConversion(
+            conversion=Dcm2niixConversion(
+                in_file=in_file,
+                compress=compress,
+                file_postfix=file_postfix,
+                side_car_jq=side_car_jq,
+                extract_volume=extract_volume,
+                to_4d=to_4d,
+                native=native,
+            )
+        )
+    )
+    return conversion.out  # type: ignore[no-any-return]
+
+
+@python.define  # type: ignore
+def CachedConversion(conversion: ty.Any) -> Nifti:
+    """Runs a conversion task, linking its outputs from the conversion cache instead if
+    the same inputs have been converted with the same options before. The cache is looked
+    up when the task is run rather than when the workflow is constructed, as pydra reuses
+    workflows constructed for the same inputs"""
+    cache = get_conversion_cache()
+    if cache is not None:
+        # Key on the input options, skipping the workflow constructor, which is
+        # covered by the name of the conversion and the version of this package
+        params = {
+            f.name: getattr(conversion, f.name)
+            for f in get_fields(conversion)
+            if f.name != "in_file" and not callable(getattr(conversion, f.name))
+        }
+        key = conversion_key(type(conversion).__name__, conversion.in_file, params)
+        try:
+            return cache.get(key, Path.cwd())  # type: ignore[return-value]
+        except KeyError:
+            pass
+    with instrumentation.span("conversion", converter=type(conversion).__name__):
+        out_file = conversion(cache_root=Path.cwd() / "conversion").out_file
+    if cache is not None:
+        cache.put(key, out_file)
+    return out_file  # type: ignore[no-any-return]
+
+
+@workflow.define(outputs=["out_file"])  # type: ignore
+def Dcm2niixConversion(
+    in_file: DicomCollection,
+    compress: str = "n",
+    file_postfix: ty.Optional[str] = None,
+    side_car_jq: ty.Optional[str] = None,
+    extract_volume: ty.Optional[int] = None,
+    to_4d: bool = False,
+    native: bool = True,
+) -> Nifti:
+    """The steps of the ``ExtendedDcm2niix`` conversion (see its docstring for the
+    descriptions of the parameters), which are run within ``CachedConversion``"""
+
+    if (
+        native
+        and file_postfix is None
+        and extract_volume is None
+        and not to_4d
+        and isinstance(in_file, DicomCollection)
+        and supports_native_conversion(in_file)
+    ):
+        # Skip the temporary directory and dcm2niix process for simple series
+        dicom_to_nifti = workflow.add(DicomToNifti(in_file=in_file, compress=compress))
+        out_json = dicom_to_nifti.out_json
+        if side_car_jq is not None:
+            json_edit = workflow.add(
+                EditDcm2niixSideCar(in_file=out_json, jq_expr=side_car_jq),
+                name="json_edit",
+            )
+            out_json = json_edit.out
+        collect_outputs = workflow.add(
+            CollectDcm2niixOutputs(
+                out_file=dicom_to_nifti.out_file,
+                out_json=out_json,
+                out_bvec=None,
+                out_bval=None,
+            )
+        )
+        return collect_outputs.out  # type: ignore[no-any-return]
+
     # Create workflow to map input field to "in_file" and optionally perform post-conversion
     # steps to manipulate the converted NIfTI files
     ensure_dicom_dir = workflow.add(EnsureDicomDir(dicom=in_file))
@@ -146,6 +256,17 @@ def ExtendedDcm2niix(
     return collect_outputs.out  # type: ignore[no-any-return]
 
 
+@python.define(outputs=["out_file", "out_json"])  # type: ignore
+def DicomToNifti(in_file: DicomCollection, compress: str = "n") -> ty.Tuple[Path, Path]:
+    """Converts a simple single-volume DICOM series to NIfTI in-process (see
+    ``convert_dicom_to_nifti``), producing the same outputs as dcm2niix"""
+    out_dir = Path.cwd()
+    compressed = compress == "y"
+    out_file = out_dir / ("out" + (NiftiGz.ext if compressed else Nifti.ext))
+    with instrumentation.span("dicom_to_nifti.convert", num_files=len(in_file)):
+        return convert_dicom_to_nifti(in_file, out_file, compress=compressed)
+
+
 @python.define  # type: ignore
 def EditDcm2niixSideCar(
     in_file: ty.Optional[Json], jq_expr: str, out_file: ty.Optional[PathType] = None
@@ -208,6 +329,40 @@ def CollectDcm2niixOutputs(
     )
 
 
+@converter(source_format=Nifti1, target_format=NiftiGz, out_ext=NiftiGz.ext)  # type: ignore
+@converter(source_format=Mgh, target_format=MghGz, out_ext=MghGz.ext)  # type: ignore
+@converter(source_format=Nrrd, target_format=NrrdGz, out_ext=NrrdGz.ext)  # type: ignore
+@python.define(outputs=["out_file"])  # type: ignore
+def GzipCompress(
+    in_file: File,
+    out_ext: str = ".gz",
+    threads: ty.Optional[int] = None,
+    compresslevel: int = DEFAULT_COMPRESS_LEVEL,
+) -> Path:
+    """Gzips an image with the block-parallel gzip codec (see
+    ``fileformats.medimage.gzip_codec``), using the given number of threads or the
+    configured codec if not provided"""
+    out_file = Path.cwd() / (in_file.fspath.name.split(".")[0] + out_ext)
+    codec = ParallelGzipCodec(threads) if threads else None
+    compress_file(in_file.fspath, out_file, codec=codec, compresslevel=compresslevel)
+    return out_file
+
+
+@converter(source_format=NiftiGz, target_format=Nifti1, out_ext=Nifti1.ext)  # type: ignore
+@converter(source_format=MghGz, target_format=Mgh, out_ext=Mgh.ext)  # type: ignore
+@converter(source_format=NrrdGz, target_format=Nrrd, out_ext=Nrrd.ext)  # type: ignore
+@python.define(outputs=["out_file"])  # type: ignore
+def GzipDecompress(
+    in_file: File, out_ext: str = "", threads: ty.Optional[int] = None
+) -> Path:
+    """Decompresses a gzipped image, in parallel if it was written by the block-parallel
+    gzip codec"""
+    out_file = Path.cwd() / (in_file.fspath.name.split(".")[0] + out_ext)
+    codec = ParallelGzipCodec(threads) if threads else None
+    decompress_file(in_file.fspath, out_file, codec=codec)
+    return out_file
+
+
 converter(
     source_format=MedicalImage,
     target_format=Analyze,
@@ -0,0 +1,504 @@
+import re
+import typing as ty
+import numpy
+import pydicom
+import pydicom.uid
+from pydicom.datadict import dictionary_VR
+
+ActionType = ty.Union[str, ty.Callable[[ty.Any], ty.Any]]
+
+
+class DeidentificationProfile:
+    """A set of rules specifying how each element of a DICOM header is treated when it
+    is deidentified, which is compiled once into sorted arrays of integer tags and
+    wildcard masks so that the elements of each data set can be matched in a single
+    vectorised pass.
+
+    Actions can be one of
+
+    * "keep" - leave the element as is
+    * "remove" - delete the element
+    * "empty" - replace the value with an empty one
+    * "dummy" - replace the value with a dummy value appropriate for its VR
+    * "uid" - replace the UID with a new one derived from it, so that references
+      between deidentified data sets are preserved
+    * a callable - replace the value with the one returned when called with the
+      original value (needs to be picklable to deidentify with a process pool)
+
+    Parameters
+    ----------
+    actions : Mapping[str or int, str or Callable]
+        the actions to apply to elements matching each tag, where the tags are either
+        integers or hex strings of the form "(gggg,eeee)" or "gggg,eeee", in which any
+        of the hex digits can be replaced by "x" to match any value (e.g. "(50xx,xxxx)")
+    private : str or Callable, optional
+        the action to apply to private elements (odd group numbers) that don't match
+        any of the tags, by default "keep"
+    vrs : Mapping[str, str or Callable], optional
+        the actions to apply to elements with the given VRs that don't match any of the
+        tags or the private rule, e.g. {"PN": "empty"}
+    default : str or Callable, optional
+        the action to apply to all other elements, by default "keep"
+    uid_salt : str, optional
+        a secret mixed into the generation of replacement UIDs to prevent them from
+        being matched back to the original UIDs, by default ""
+    """
+
+    def __init__(
+        self,
+        actions: ty.Mapping[ty.Union[str, int], ActionType],
+        private: ActionType = "keep",
+        vrs: ty.Optional[ty.Mapping[str, ActionType]] = None,
+        default: ActionType = "keep",
+        uid_salt: str = "",
+    ):
+        self.actions = dict(actions)
+        self.private = private
+        self.vrs = dict(vrs) if vrs else {}
+        self.default = default
+        self.uid_salt = uid_salt
+        # Actions are referred to by their index in this list in the compiled arrays
+        self._action_list: ty.List[ActionType] = ["keep"]
+        exact: ty.Dict[int, int] = {}
+        wildcards = []
+        for pattern, action in self.actions.items():
+            mask, value = parse_tag_pattern(pattern)
+            if mask == 0xFFFFFFFF:
+                exact[value] = self._action_index(action)
+            else:
+                wildcards.append((mask, value, self._action_index(action)))
+        self._exact_tags = numpy.array(sorted(exact), dtype=numpy.uint32)
+        self._exact_actions = numpy.array(
+            [exact[t] for t in sorted(exact)], dtype=numpy.intp
+        )
+        # Apply the least specific wildcards first so the more specific ones override
+        # them
+        self._wildcards = sorted(wildcards, key=lambda w: bin(w[0]).count("1"))
+        self._private_action = self._action_index(private)
+        self._vr_actions = {vr: self._action_index(a) for vr, a in self.vrs.items()}
+        self._default_action = self._action_index(default)
+
+    def __repr__(self) -> str:
+        return (
+            f"{type(self).__name__}({len(self.actions)} tags, private={self.private!r},"
+            f" vrs={self.vrs!r}, default={self.default!r})"
+        )
+
+    @classmethod
+    def from_spec(cls, spec: ty.Any) -> "DeidentificationProfile":
+        """Creates a profile from the `spec` argument passed to `deidentify`
+
+        Parameters
+        ----------
+        spec : DeidentificationProfile or Mapping or None
+            an existing profile, a mapping of keyword arguments to create a profile
+            with (or of tags to actions if it doesn't contain an "actions" key), or None
+            for the default profile
+
+        Returns
+        -------
+        DeidentificationProfile
+            the profile
+        """
+        if spec is None:
+            return DEFAULT_PROFILE
+        if hasattr(spec, "apply"):
+            # Check for the method rather than the class so that profiles created from
+            # separately imported copies of this module are accepted
+            return spec  # type: ignore[no-any-return]
+        if isinstance(spec, ty.Mapping):
+            if "actions" in spec:
+                return cls(**spec)
+            return cls(spec)
+        raise TypeError(
+            f"Cannot create a deidentification profile from {spec!r}, should be a "
+            "DeidentificationProfile, a mapping or None"
+        )
+
+    def apply(self, dataset: pydicom.Dataset) -> ty.Dict[str, ty.Any]:
+        """Deidentifies a data set in place, including the data sets nested within any
+        sequences that are kept
+
+        Parameters
+        ----------
+        dataset : pydicom.Dataset
+            the data set to deidentify
+
+        Returns
+        -------
+        dict[str, Any]
+            the original values of the elements that were modified or removed, keyed by
+            their keywords (or "gggg,eeee" if they don't have one), prefixed by the
+            path to them for elements nested within sequences, e.g.
+            "ReferencedStudySequence[0].StudyInstanceUID"
+        """
+        reid_metadata: ty.Dict[str, ty.Any] = {}
+        self._apply(dataset, reid_metadata)
+        # Keep the file meta information consistent with the deidentified instance UID,
+        # so that the original UID isn't left in it
+        file_meta = getattr(dataset, "file_meta", None)
+        if (
+            "SOPInstanceUID" in reid_metadata
+            and file_meta is not None
+            and "MediaStorageSOPInstanceUID" in file_meta
+        ):
+            if dataset.get("SOPInstanceUID"):
+                file_meta.MediaStorageSOPInstanceUID = dataset.SOPInstanceUID
+            else:
+                file_meta.MediaStorageSOPInstanceUID = pydicom.uid.generate_uid(
+                    entropy_srcs=[
+                        str(file_meta.MediaStorageSOPInstanceUID),
+                        self.uid_salt,
+                    ]
+                )
+        return reid_metadata
+
+    def _apply(
+        self,
+        dataset: pydicom.Dataset,
+        reid_metadata: ty.Dict[str, ty.Any],
+        prefix: str = "",
+    ) -> None:
+        tags = numpy.fromiter(dataset.keys(), dtype=numpy.uint32, count=len(dataset))
+        indices = self._match(tags, dataset)
+        modified = indices != KEEP
+        for tag, index in zip(tags[modified].tolist(), indices[modified].tolist()):
+            elem = dataset[tag]
+            action = self._action_list[index]
+            reid_metadata[prefix + _element_key(elem)] = elem.value
+            if action == "remove":
+                del dataset[tag]
+            elif action == "empty":
+                elem.value = [] if elem.VR == "SQ" else ""
+            elif action == "dummy":
+                elem.value = DUMMY_VALUES.get(elem.VR)
+            elif action == "uid":
+                if elem.value:
+                    elem.value = pydicom.uid.generate_uid(
+                        entropy_srcs=[str(elem.value), self.uid_salt]
+                    )
+            else:
+                elem.value = action(elem.value)
+        # Recurse into the sequences that have been kept, including private ones, the
+        # VRs of which are only known once their raw elements are converted
+        for tag in tags[~modified].tolist():
+            vr = _element_vr(dataset, tag)
+            if vr is None:
+                vr = dataset[tag].VR
+            if vr != "SQ":
+                continue
+            elem = dataset[tag]
+            for i, item in enumerate(elem.value):
+                self._apply(item, reid_metadata, f"{prefix}{_element_key(elem)}[{i}].")
+
+    def _match(
+        self, tags: "numpy.ndarray[ty.Any, ty.Any]", dataset: pydicom.Dataset
+    ) -> "numpy.ndarray[ty.Any, ty.Any]":
+        """Returns the indices of the actions to apply to each of the tags, matching
+        the rules in reverse order of precedence so that higher precedence rules
+        override lower ones"""
+        indices = numpy.full(len(tags), UNMATCHED, dtype=numpy.intp)
+        private = (tags >> 16) & 1 == 1
+        indices[private] = self._private_action
+        for mask, value, index in self._wildcards:
+            indices[(tags & mask) == value] = index
+        if len(self._exact_tags):
+            pos = numpy.searchsorted(self._exact_tags, tags)
+            pos[pos == len(self._exact_tags)] = 0
+            found = self._exact_tags[pos] == tags
+            indices[found] = self._exact_actions[pos[found]]
+        if self._vr_actions:
+            # VRs are only looked up for the elements that don't match any other rules
+            for i in numpy.flatnonzero(indices == UNMATCHED).tolist():
+                vr = _element_vr(dataset, int(tags[i]))
+                if vr in self._vr_actions:
+                    indices[i] = self._vr_actions[vr]
+        indices[indices == UNMATCHED] = self._default_action
+        return indices
+
+    def _action_index(self, action: ActionType) -> int:
+        if not callable(action) and action not in ACTIONS:
+            raise ValueError(
+                f"Unrecognised deidentification action {action!r}, should be one of "
+                f"{ACTIONS} or a callable"
+            )
+        try:
+            return self._action_list.index(action)
+        except ValueError:
+            self._action_list.append(action)
+            return len(self._action_list) - 1
+
+
+def parse_tag_pattern(pattern: ty.Union[str, int]) -> ty.Tuple[int, int]:
+    """Parses a tag pattern into a mask and the value the masked tag should equal
+
+    Parameters
+    ----------
+    pattern : str or int
+        the tag as an integer or a hex string of the form "(gggg,eeee)" or "gggg,eeee",
+        where any of the hex digits can be "x" to match any value
+
+    Returns
+    -------
+    tuple[int, int]
+        the mask and the masked value
+
+    Raises
+    ------
+    ValueError
+        if the pattern isn't a valid tag pattern
+    """
+    if isinstance(pattern, int):
+        return 0xFFFFFFFF, pattern
+    match = TAG_PATTERN_RE.match(pattern)
+    if not match:
+        raise ValueError(
+            f"Invalid tag pattern {pattern!r}, should be of the form '(gggg,eeee)' with "
+            "'x' in place of any wildcard digits"
+        )
+    digits = (match.group(1) + match.group(2)).lower()
+    mask = int("".join("0" if d == "x" else "f" for d in digits), 16)
+    value = int(digits.replace("x", "0"), 16)
+    return mask, value
+
+
+def _element_key(elem: ty.Any) -> str:
+    """Returns the key an element is stored under in the re-identification metadata"""
+    return elem.keyword or "{:04X},{:04X}".format(elem.tag >> 16, elem.tag & 0xFFFF)
+
+
+def _element_vr(dataset: pydicom.Dataset, tag: int) -> ty.Optional[str]:
+    """Returns the VR of an element without converting raw elements where possible"""
+    vr = dataset.get_item(tag).VR
+    if vr is None:
+        try:
+            vr = dictionary_VR(tag)
+        except KeyError:
+            return None
+    return str(vr)
+
+
+ACTIONS = ("keep", "remove", "empty", "dummy", "uid")
+
+# Index of the "keep" action in the list of actions of each profile and the value that
+# elements that don't match any rules are marked with before the default is applied
+KEEP = 0
+UNMATCHED = -1
+
+TAG_PATTERN_RE = re.compile(r"^\(?([0-9a-fA-Fx]{4}),\s*([0-9a-fA-Fx]{4})\)?$")
+
+DUMMY_VALUES = {
+    "AE": "ANONYMOUS",
+    "AS": "000Y",
+    "CS": "ANONYMOUS",
+    "DA": "19000101",
+    "DS": "0",
+    "DT": "19000101000000",
+    "IS": "0",
+    "LO": "ANONYMOUS",
+    "LT": "ANONYMOUS",
+    "PN": "Anonymous^Anonymous",
+    "SH": "ANONYMOUS",
+    "ST": "ANONYMOUS",
+    "TM": "000000",
+    "UC": "ANONYMOUS",
+    "UT": "ANONYMOUS",
+}
+
+
+def anonymise_name(value: ty.Any) -> str:
+    return "Anonymous^Anonymous"
+
+
+def truncate_date_to_year(value: ty.Any) -> str:
+    return str(value)[:4] + "0101" if value else ""
+
+
+FIELDS_TO_DEIDENTIFY = [
+    ("0008", "0014"),  # Instance Creator UID
+    ("0008", "1111"),  # Referenced Performed Procedure Step SQ
+    ("0008", "1120"),  # Referenced Patient SQ
+    ("0008", "1140"),  # Referenced Image SQ
+    ("0008", "0096"),  # Referring Physician Identification SQ
+    ("0008", "1032"),  # Procedure Code SQ
+    ("0008", "1048"),  # Physician(s) of Record
+    ("0008", "1049"),  # Physician(s) of Record Identification SQ
+    ("0008", "1050"),  # Performing Physicians' Name
+    ("0008", "1052"),  # Performing Physician Identification SQ
+    ("0008", "1060"),  # Name of Physician(s) Reading Study
+    ("0008", "1062"),  # Physician(s) Reading Study Identification SQ
+    ("0008", "1110"),  # Referenced Study SQ
+    ("0008", "1250"),  # Related Series SQ
+    ("0008", "9092"),  # Referenced Image Evidence SQ
+    ("0008", "0080"),  # Institution Name
+    ("0008", "0081"),  # Institution Address
+    ("0008", "0082"),  # Institution Code Sequence
+    ("0008", "0092"),  # Referring Physician's Address
+    ("0008", "0094"),  # Referring Physician's Telephone Numbers
+    ("0008", "009C"),  # Consulting Physician's Name
+    ("0008", "1070"),  # Operators' Name
+    ("0010", "4000"),  # Patient Comments
+    # ("0010", "0010"),  # Patient's Name
+    ("0010", "0021"),  # Issuer of Patient ID
+    ("0010", "0032"),  # Patient's Birth Time
+    ("0010", "0050"),  # Patient's Insurance Plan Code SQ
+    ("0010", "0101"),  # Patient's Primary Language Code SQ
+    ("0010", "1000"),  # Other Patient IDs
+    ("0010", "1001"),  # Other Patient Names
+    ("0010", "1002"),  # Other Patient IDs SQ
+    ("0010", "1005"),  # Patient's Birth Name
+    ("0010", "1010"),  # Patient's Age
+    ("0010", "1040"),  # Patient's Address
+    ("0010", "1060"),  # Patient's Mother's Birth Name
+    ("0010", "1080"),  # Military Rank
+    ("0010", "1081"),  # Branch of Service
+    ("0010", "1090"),  # Medical Record Locator
+    ("0010", "2000"),  # Medical Alerts
+    ("0010", "2110"),  # Allergies
+    ("0010", "2150"),  # Country of Residence
+    ("0010", "2152"),  # Region of Residence
+    ("0010", "2154"),  # Patient's Telephone Numbers
+    ("0010", "2160"),  # Ethnic Group
+    ("0010", "2180"),  # Occupation
+    ("0010", "21A0"),  # Smoking Status
+    ("0010", "21B0"),  # Additional Patient History
+    ("0010", "21C0"),  # Pregnancy Status
+    ("0010", "21D0"),  # Last Menstrual Date
+    ("0010", "21F0"),  # Patient's Religious Preference
+    ("0010", "2203"),  # Patient's Sex Neutered
+    ("0010", "2297"),  # Responsible Person
+    ("0010", "2298"),  # Responsible Person Role
+    ("0010", "2299"),  # Responsible Organization
+    ("0020", "9221"),  # Dimension Organization SQ
+    ("0020", "9222"),  # Dimension Index SQ
+    ("0038", "0010"),  # Admission ID
+    ("0038", "0011"),  # Issuer of Admission ID
+    ("0038", "0060"),  # Service Episode ID
+    ("0038", "0061"),  # Issuer of Service Episode ID
+    ("0038", "0062"),  # Service Episode Description
+    ("0038", "0500"),  # Patient State
+    ("0038", "0100"),  # Pertinent Documents SQ
+    ("0040", "0260"),  # Performed Protocol Code SQ
+    ("0088", "0130"),  # Storage Media File-Set ID
+    ("0088", "0140"),  # Storage Media File-Set UID
+    ("0400", "0561"),  # Original Attributes Sequence
+    ("5200", "9229"),  # Shared Functional Groups SQ
+]
+
+# The profile used when no spec is passed to `deidentify`, which blanks the fields
+# above, replaces the patient's name and truncates their birth date to the year
+DEFAULT_PROFILE = DeidentificationProfile(
+    {
+        **{"{},{}".format(*f): "empty" for f in FIELDS_TO_DEIDENTIFY},
+        "0010,0010": anonymise_name,  # Patient's Name
+        "0010,0030": truncate_date_to_year,  # Patient's Birth Date
+    }
+)
+
+# A subset of the DICOM PS3.15 Annex E Basic Application Level Confidentiality Profile
+# covering the commonly populated identifying attributes, with private elements
+# removed
+BASIC_PROFILE = DeidentificationProfile(
+    {
+        # UIDs are replaced consistently so references between instances are kept
+        "0008,0014": "uid",  # Instance Creator UID
+        "0008,0018": "uid",  # SOP Instance UID
+        "0008,1155": "uid",  # Referenced SOP Instance UID
+        "0008,3010": "uid",  # Irradiation Event UID
+        "0020,000D": "uid",  # Study Instance UID
+        "0020,000E": "uid",  # Series Instance UID
+        "0020,0052": "uid",  # Frame of Reference UID
+        "0020,0200": "uid",  # Synchronization Frame of Reference UID
+        "0020,9161": "uid",  # Concatenation UID
+        "0020,9164": "uid",  # Dimension Organization UID
+        # Type 2 attributes, which need to be present, are emptied
+        "0008,0020": "empty",  # Study Date
+        "0008,0023": "empty",  # Content Date
+        "0008,0030": "empty",  # Study Time
+        "0008,0033": "empty",  # Content Time
+        "0008,0050": "empty",  # Accession Number
+        "0008,0090": "empty",  # Referring Physician's Name
+        "0010,0010": "empty",  # Patient's Name
+        "0010,0020": "empty",  # Patient ID
+        "0010,0030": "empty",  # Patient's Birth Date
+        "0010,0040": "empty",  # Patient's Sex
+        "0020,0010": "empty",  # Study ID
+        "0070,0084": "empty",  # Content Creator's Name
+        # Other identifying attributes are removed
+        "0008,0012": "remove",  # Instance Creation Date
+        "0008,0013": "remove",  # Instance Creation Time
+        "0008,0021": "remove",  # Series Date
+        "0008,0022": "remove",  # Acquisition Date
+        "0008,002A": "remove",  # Acquisition DateTime
+        "0008,0031": "remove",  # Series Time
+        "0008,0032": "remove",  # Acquisition Time
+        "0008,0080": "remove",  # Institution Name
+        "0008,0081": "remove",  # Institution Address
+        "0008,0082": "remove",  # Institution Code Sequence
+        "0008,0092": "remove",  # Referring Physician's Address
+        "0008,0094": "remove",  # Referring Physician's Telephone Numbers
+        "0008,0096": "remove",  # Referring Physician Identification Sequence
+        "0008,009C": "remove",  # Consulting Physician's Name
+        "0008,1010": "remove",  # Station Name
+        "0008,1030": "remove",  # Study Description
+        "0008,103E": "remove",  # Series Description
+        "0008,1040": "remove",  # Institutional Department Name
+        "0008,1048": "remove",  # Physician(s) of Record
+        "0008,1049": "remove",  # Physician(s) of Record Identification Sequence
+        "0008,1050": "remove",  # Performing Physicians' Name
+        "0008,1052": "remove",  # Performing Physician Identification Sequence
+        "0008,1060": "remove",  # Name of Physician(s) Reading Study
+        "0008,1062": "remove",  # Physician(s) Reading Study Identification Sequence
+        "0008,1070": "remove",  # Operators' Name
+        "0008,1072": "remove",  # Operator Identification Sequence
+        "0008,1080": "remove",  # Admitting Diagnoses Description
+        "0008,1110": "remove",  # Referenced Study Sequence
+        "0008,1111": "remove",  # Referenced Performed Procedure Step Sequence
+        "0008,1120": "remove",  # Referenced Patient Sequence
+        "0010,0021": "remove",  # Issuer of Patient ID
+        "0010,0032": "remove",  # Patient's Birth Time
+        "0010,0050": "remove",  # Patient's Insurance Plan Code Sequence
+        "0010,1000": "remove",  # Other Patient IDs
+        "0010,1001": "remove",  # Other Patient Names
+        "0010,1002": "remove",  # Other Patient IDs Sequence
+        "0010,1005": "remove",  # Patient's Birth Name
+        "0010,1010": "remove",  # Patient's Age
+        "0010,1020": "remove",  # Patient's Size
+        "0010,1030": "remove",  # Patient's Weight
+        "0010,1040": "remove",  # Patient's Address
+        "0010,1060": "remove",  # Patient's Mother's Birth Name
+        "0010,1080": "remove",  # Military Rank
+        "0010,1081": "remove",  # Branch of Service
+        "0010,1090": "remove",  # Medical Record Locator
+        "0010,2000": "remove",  # Medical Alerts
+        "0010,2110": "remove",  # Allergies
+        "0010,2150": "remove",  # Country of Residence
+        "0010,2152": "remove",  # Region of Residence
+        "0010,2154": "remove",  # Patient's Telephone Numbers
+        "0010,2160": "remove",  # Ethnic Group
+        "0010,2180": "remove",  # Occupation
+        "0010,21A0": "remove",  # Smoking Status
+        "0010,21B0": "remove",  # Additional Patient History
+        "0010,21C0": "remove",  # Pregnancy Status
+        "0010,21D0": "remove",  # Last Menstrual Date
+        "0010,21F0": "remove",  # Patient's Religious Preference
+        "0010,2297": "remove",  # Responsible Person
+        "0010,2299": "remove",  # Responsible Organization
+        "0010,4000": "remove",  # Patient Comments
+        "0018,1000": "remove",  # Device Serial Number
+        "0018,1030": "remove",  # Protocol Name
+        "0032,1032": "remove",  # Requesting Physician
+        "0032,1060": "remove",  # Requested Procedure Description
+        "0038,0010": "remove",  # Admission ID
+        "0038,0500": "remove",  # Patient State
+        "0040,0244": "remove",  # Performed Procedure Step Start Date
+        "0040,0253": "remove",  # Performed Procedure Step ID
+        "0040,0254": "remove",  # Performed Procedure Step Description
+        "0040,0275": "remove",  # Request Attributes Sequence
+        "0400,0561": "remove",  # Original Attributes Sequence
+        "50xx,xxxx": "remove",  # Curve Data
+        "60xx,3000": "remove",  # Overlay Data
+        "60xx,4000": "remove",  # Overlay Comments
+    },
+    private="remove",
+)
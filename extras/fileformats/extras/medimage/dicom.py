@@ -1,8 +1,14 @@
 from pathlib import Path
 import typing as ty
 import os
+import json
+import itertools
+import functools
+import contextlib
 import tempfile
+from concurrent.futures import Executor, ThreadPoolExecutor
 import pydicom
+from pydicom.pixels.utils import iter_pixels
 import numpy
 import numpy.typing
 from fileformats.core import FileSet, extra_implementation, SampleFileGenerator
@@ -11,43 +17,602 @@ from fileformats.medimage import (
     MedicalImage,
     MedicalImagingData,
     DicomImage,
+    DicomMultiframe,
     DicomCollection,
     DicomDir,
     DicomSeries,
 )
-import fileformats.extras.application.medical  # noqa: F401
+from fileformats.extras.application.medical import dicom_read_metadata, TagListType
+from fileformats.medimage import instrumentation
 from fileformats.medimage.base import DataArrayType
+from fileformats.medimage.header_index import file_key, get_header_index
+from fileformats.medimage.dicom import (
+    read_dicom_tags,
+    read_dicom_num_frames,
+    locate_dicom_pixel_data,
+    worker_pool,
+    DicomFrame,
+    DEFLATED_EXPLICIT_VR_LITTLE_ENDIAN,
+    EXPLICIT_VR_BIG_ENDIAN,
+    HEADER_BUFFER_SIZE,
+)
+from fileformats.generic import TypedDirectory
+from .geometry import SliceGeometry, read_slice_geometry
+from .deidentification import (  # noqa: F401
+    DeidentificationProfile,
+    FIELDS_TO_DEIDENTIFY,
+)
 import medimages4tests.dummy.dicom.mri.t1w.siemens.skyra.syngo_d13c
 
+T = ty.TypeVar("T")
+
+
+@extra_implementation(FileSet.read_metadata)
+def dicom_image_read_metadata(
+    dicom: DicomImage,
+    metadata_keys: ty.Optional[TagListType] = None,
+    **kwargs: ty.Any,
+) -> ty.Mapping[str, ty.Any]:
+    # Look the header up in the persistent header index if one is in use. Keys other
+    # than keywords (e.g. tags) are read straight from the file, as they can't be
+    # matched against the keys of the indexed metadata
+    index = get_header_index()
+    if index is None or not _are_keywords(metadata_keys):
+        return _pydicom_read_metadata(dicom, metadata_keys=metadata_keys, **kwargs)
+    metadata = index.get_metadata(dicom.fspath)
+    if metadata is None:
+        metadata = dict(_pydicom_read_metadata(dicom, **kwargs))
+        index.put_metadata(dicom.fspath, metadata)
+    if metadata_keys is not None:
+        # pydicom always reads the SpecificCharacterSet along with specific tags
+        selected = set(metadata_keys) | {"SpecificCharacterSet"}
+        metadata = {k: v for k, v in metadata.items() if k in selected}
+    return metadata
+
+
+def _are_keywords(metadata_keys: ty.Optional[TagListType]) -> bool:
+    """Whether the metadata keys are all DICOM keywords (or None)"""
+    if metadata_keys is None:
+        return True
+    return all(
+        isinstance(k, str) and pydicom.datadict.tag_for_keyword(k) is not None
+        for k in metadata_keys
+    )
+
+
+def _pydicom_read_metadata(
+    dicom: DicomImage, **kwargs: ty.Any
+) -> ty.Mapping[str, ty.Any]:
+    """Parses the header of the DICOM file with pydicom"""
+    with instrumentation.span("pydicom.read_header", path=dicom.fspath):
+        instrumentation.count("file.open")
+        return dicom_read_metadata(dicom, **kwargs)
+
 
 @extra_implementation(MedicalImage.read_array)
 def dicom_read_array(
     collection: DicomCollection,
 ) -> DataArrayType:
-    image_stack = []
-    for dcm_file in collection.contents:
-        image_stack.append(pydicom.dcmread(dcm_file).pixel_array)
-    return numpy.asarray(image_stack)
+    # Only the headers are read to determine the order of the slices, then the first
+    # slice is decoded to determine the shape and data type of the output array,
+    # which is preallocated so the remaining slices can be decoded straight into it
+    # across a pool of threads.
+    dicom_files = _dicom_files(collection)
+    with (
+        instrumentation.span("dicom.read_array", num_files=len(dicom_files)),
+        ThreadPoolExecutor(READ_ARRAY_THREADS) as executor,
+    ):
+        headers = list(executor.map(_read_slice_header, dicom_files))
+        # Single-frame images can also have a NumberOfFrames of 1 (e.g. in CT, NM and
+        # US series), which are ordered by their positions like any other slices
+        if any((h["num_frames"] or 1) > 1 for h in headers):
+            return _read_multiframe_files(dicom_files, headers)
+        order = _slice_order(headers)
+        slopes = numpy.array([h["slope"] for h in headers])[order]
+        intercepts = numpy.array([h["intercept"] for h in headers])[order]
+        rescale = bool(numpy.any(slopes != 1.0) or numpy.any(intercepts != 0.0))
+        first = _decode_pixels(dicom_files[order[0]])
+        dtype = (
+            numpy.result_type(first.dtype, numpy.float32) if rescale else first.dtype
+        )
+        slice_shape = first.shape
+        array = numpy.empty((len(dicom_files),) + slice_shape, dtype=dtype)
+
+        def decode_slice(i: int, pixels: ty.Optional[DataArrayType] = None) -> None:
+            if pixels is None:
+                pixels = _decode_pixels(dicom_files[order[i]])
+            if pixels.shape != slice_shape:
+                raise ValueError(
+                    f"Shape of slice {dicom_files[order[i]]} {pixels.shape}, does not "
+                    f"match the shape of the first slice {slice_shape}"
+                )
+            if rescale:
+                numpy.multiply(pixels, slopes[i], out=array[i], casting="unsafe")
+                array[i] += intercepts[i]
+            else:
+                array[i] = pixels
+
+        decode_slice(0, first)
+        del first
+        for _ in executor.map(decode_slice, range(1, len(dicom_files))):
+            pass
+    return array
+
+
+# Number of threads used to decode DICOM slices in parallel, the default of the
+# ThreadPoolExecutor if None
+READ_ARRAY_THREADS: ty.Optional[int] = None
+
+
+def _dicom_files(collection: DicomCollection) -> ty.List[Path]:
+    """Returns the paths to the DICOM files in the collection without sorting them (and
+    therefore reading their headers)
+
+    The uncached function behind ``TypedDirectory.contents`` is called instead of the
+    property itself, as the property's cache is shared with (and would replace) the
+    sorted ``DicomDir.contents``
+    """
+    if isinstance(collection, DicomDir):
+        contents = TypedDirectory.contents.func(collection)
+        return [d.fspath for d in contents]
+    return sorted(collection.fspaths)
+
+
+def _decode_pixels(fspath: Path) -> DataArrayType:
+    """Reads and decodes the pixel data of a DICOM file with pydicom"""
+    with instrumentation.span("pydicom.decode", path=fspath), open(fspath, "rb") as f:
+        instrumentation.count("file.open")
+        pixels = pydicom.dcmread(f).pixel_array
+        if instrumentation.is_recording():
+            instrumentation.count("file.bytes_read", f.tell())
+    return pixels
+
+
+def _read_slice_header(fspath: Path) -> ty.Dict[str, ty.Any]:
+    """Reads the tags required to order and rescale a slice from its header"""
+    tags = read_dicom_tags(
+        fspath,
+        [
+            "ImagePositionPatient",
+            "ImageOrientationPatient",
+            "InstanceNumber",
+            "RescaleSlope",
+            "RescaleIntercept",
+            "NumberOfFrames",
+        ],
+    )
+    return {
+        "num_frames": _optional(int, tags.get("NumberOfFrames")),
+        "position": _parse_ds(tags.get("ImagePositionPatient")),
+        "orientation": _parse_ds(tags.get("ImageOrientationPatient")),
+        "instance_number": _parse_ds(tags.get("InstanceNumber")),
+        "slope": (_parse_ds(tags.get("RescaleSlope")) or [1.0])[0],
+        "intercept": (_parse_ds(tags.get("RescaleIntercept")) or [0.0])[0],
+    }
+
+
+def _parse_ds(value: ty.Any) -> ty.Optional[ty.List[float]]:
+    """Parses a decimal/integer string value read from a header into a list of floats"""
+    if not value or not isinstance(value, str):
+        return None
+    return [float(v) for v in value.split("\\")]
+
+
+def _slice_order(headers: ty.List[ty.Dict[str, ty.Any]]) -> DataArrayType:
+    """Orders slices by stack and position along the normal to the slice plane (see
+    ``SliceGeometry``), falling back to their instance numbers if the
+    positions/orientations aren't present"""
+    if all(h["position"] and h["orientation"] for h in headers):
+        geometry = SliceGeometry(
+            [h["position"] for h in headers], [h["orientation"] for h in headers]
+        )
+        return geometry.order
+    if all(h["instance_number"] for h in headers):
+        instance_numbers = [h["instance_number"][0] for h in headers]
+        return numpy.argsort(instance_numbers, kind="stable")
+    return numpy.arange(len(headers))
 
 
 @extra_implementation(MedicalImage.vox_sizes)
 def dicom_vox_sizes(collection: DicomCollection) -> ty.Tuple[float, float, float]:
-    return tuple(
-        collection.metadata["PixelSpacing"] + [collection.metadata["SliceThickness"]]
-    )
+    # The spacing between slices is computed from the positions of all the slices
+    # rather than trusting the SliceThickness, which can differ from it (e.g. in
+    # series with overlapping or spaced slices)
+    dicom_files = _dicom_files(collection)
+    first = dicom_files[0]
+    if (read_dicom_num_frames(first) or 1) > 1:
+        return DicomMultiframe(first).vox_sizes()
+    geometry = read_slice_geometry(dicom_files, READ_ARRAY_THREADS)
+    if geometry is not None and geometry.pixel_spacing is not None:
+        return geometry.vox_sizes  # type: ignore[return-value]
+    tags = read_dicom_tags(first, ["PixelSpacing", "SliceThickness"])
+    pixel_spacing = _parse_ds(tags["PixelSpacing"]) or []
+    slice_thickness = _parse_ds(tags["SliceThickness"]) or []
+    return tuple(pixel_spacing + slice_thickness)  # type: ignore[return-value]
 
 
 @extra_implementation(MedicalImage.dims)
 def dicom_dims(collection: DicomCollection) -> ty.Tuple[int, int, int]:
-    return tuple(
-        (
-            collection.metadata["Rows"],
-            collection.metadata["DataColumns"],
-            len(list(collection.contents)),
-        ),
+    dicom_files = _dicom_files(collection)
+    tags = read_dicom_tags(dicom_files[0], ["Rows", "Columns", "NumberOfFrames"])
+    if tags.get("NumberOfFrames"):
+        # Each file holds several slices so the slice count can't be taken from the
+        # number of files
+        if len(dicom_files) == 1:
+            return DicomMultiframe(dicom_files[0]).dims()
+        num_slices = sum(read_dicom_num_frames(f) or 1 for f in dicom_files)
+    else:
+        num_slices = len(dicom_files)
+    return (int(tags["Rows"]), int(tags["Columns"]), num_slices)  # type: ignore[arg-type]
+
+
+def _read_multiframe_files(
+    dicom_files: ty.List[Path], headers: ty.List[ty.Dict[str, ty.Any]]
+) -> DataArrayType:
+    """Reads the frames of a collection of multi-frame files, concatenating the frames
+    of each file in the order of their instance numbers"""
+    if all(h["instance_number"] for h in headers):
+        order = numpy.argsort([h["instance_number"][0] for h in headers], kind="stable")
+    else:
+        order = numpy.arange(len(dicom_files))
+    arrays = [DicomMultiframe(dicom_files[i]).read_array() for i in order]
+    if len(arrays) == 1:
+        return arrays[0]
+    return numpy.concatenate(arrays)
+
+
+# The number of frame indices (and frame layouts) of multi-frame files that are kept in
+# memory
+FRAME_INDEX_CACHE_SIZE = 64
+
+
+@extra_implementation(DicomMultiframe.read_frame_index)
+def dicom_multiframe_read_frame_index(image: DicomMultiframe) -> ty.List[DicomFrame]:
+    # Cached by the path, size and modification time of the file as well as by the
+    # ``frame_index`` property, which doesn't cache the index of recently modified files
+    return list(_read_frame_index(*file_key(image.fspath)))
+
+
+@functools.lru_cache(maxsize=FRAME_INDEX_CACHE_SIZE)
+def _read_frame_index(path: str, size: int, mtime: int) -> ty.Tuple[DicomFrame, ...]:
+    # The functional groups are nested sequences that the header scanner doesn't parse,
+    # so they are parsed with pydicom, stopping before the pixel data
+    with (
+        instrumentation.span("dicom.read_frame_index", path=path),
+        open(path, "rb") as f,
+    ):
+        instrumentation.count("file.open")
+        dcm = pydicom.dcmread(f, stop_before_pixels=True)
+        if instrumentation.is_recording():
+            instrumentation.count("file.bytes_read", f.tell())
+    num_frames = int(dcm.get("NumberOfFrames") or 1)
+    shared_groups = dcm.get("SharedFunctionalGroupsSequence")
+    shared = shared_groups[0] if shared_groups else None
+    per_frame_groups = dcm.get("PerFrameFunctionalGroupsSequence") or []
+    frames = []
+    for i in range(num_frames):
+        per_frame = per_frame_groups[i] if i < len(per_frame_groups) else None
+        lookup = functools.partial(_functional_group_value, per_frame, shared, dcm)
+        stack_id = lookup("FrameContentSequence", "StackID")
+        in_stack_position = lookup("FrameContentSequence", "InStackPositionNumber")
+        temporal_position = lookup("FrameContentSequence", "TemporalPositionIndex")
+        position = lookup("PlanePositionSequence", "ImagePositionPatient")
+        orientation = lookup("PlaneOrientationSequence", "ImageOrientationPatient")
+        pixel_spacing = lookup("PixelMeasuresSequence", "PixelSpacing")
+        slice_thickness = lookup("PixelMeasuresSequence", "SliceThickness")
+        slope = lookup("PixelValueTransformationSequence", "RescaleSlope")
+        intercept = lookup("PixelValueTransformationSequence", "RescaleIntercept")
+        frames.append(
+            DicomFrame(
+                data_index=i,
+                stack_id=str(stack_id) if stack_id is not None else None,
+                in_stack_position=_optional(int, in_stack_position),
+                temporal_position=_optional(int, temporal_position),
+                position=_optional(_float_tuple, position),
+                orientation=_optional(_float_tuple, orientation),
+                pixel_spacing=_optional(_float_tuple, pixel_spacing),
+                slice_thickness=_optional(float, slice_thickness),
+                rescale_slope=float(slope) if slope is not None else 1.0,
+                rescale_intercept=float(intercept) if intercept is not None else 0.0,
+            )
+        )
+    return tuple(frames)
+
+
+def _functional_group_value(
+    per_frame: ty.Optional[pydicom.Dataset],
+    shared: ty.Optional[pydicom.Dataset],
+    dcm: pydicom.Dataset,
+    sequence: str,
+    keyword: str,
+) -> ty.Any:
+    """Looks up the value of an element in the functional groups of a frame, the
+    functional groups listed for the frame taking precedence over the shared ones,
+    which in turn take precedence over top-level elements"""
+    for group in (per_frame, shared):
+        if group is not None:
+            items = group.get(sequence)
+            if items and keyword in items[0]:
+                return items[0][keyword].value
+    return dcm.get(keyword)
+
+
+def _optional(convert: ty.Callable[[ty.Any], T], value: ty.Any) -> ty.Optional[T]:
+    return convert(value) if value is not None and value != "" else None
+
+
+def _float_tuple(value: ty.Any) -> ty.Tuple[float, ...]:
+    return tuple(float(v) for v in value)
+
+
+@extra_implementation(DicomMultiframe.read_frames)
+def dicom_multiframe_read_frames(
+    image: DicomMultiframe, indices: ty.Sequence[int]
+) -> DataArrayType:
+    # Each distinct frame is decoded once, reading it straight from its offset in the
+    # file if the pixel data is stored natively, or otherwise decoding only the
+    # requested frames of the encapsulated pixel data with pydicom
+    layout = _frame_layout(image.fspath)
+    frame_index = image.frame_index
+    requested = numpy.asarray(indices, dtype=numpy.intp).reshape(-1)
+    unique, inverse = numpy.unique(requested, return_inverse=True)
+    if len(unique) and (unique[0] < 0 or unique[-1] >= layout.num_frames):
+        raise IndexError(
+            f"Frame indices {requested} are out of range for {image.fspath}, which has "
+            f"{layout.num_frames} frames"
+        )
+    with instrumentation.span(
+        "dicom.read_frames", path=image.fspath, num_frames=len(unique)
+    ):
+        if layout.offset is not None:
+            raw = _read_native_frames(image.fspath, layout, unique)
+        else:
+            raw = _decode_frames(image.fspath, layout, unique)
+    pixels = raw[inverse]
+    slopes = numpy.array([f.rescale_slope for f in frame_index])
+    intercepts = numpy.array([f.rescale_intercept for f in frame_index])
+    if numpy.any(slopes != 1.0) or numpy.any(intercepts != 0.0):
+        # Rescale if any frame of the image needs it so the data type of the frames
+        # doesn't depend on which ones were requested
+        shape = (-1,) + (1,) * (pixels.ndim - 1)
+        pixels = pixels * slopes[requested].astype(numpy.float32).reshape(shape)
+        pixels += intercepts[requested].astype(numpy.float32).reshape(shape)
+    return pixels
+
+
+class _FrameLayout(ty.NamedTuple):
+    """The layout of the frames in the pixel data of a multi-frame file"""
+
+    num_frames: int
+    frame_shape: ty.Tuple[int, ...]
+    dtype: numpy.dtype[ty.Any]
+    # The offset of the native pixel data from the start of the file, None if it is
+    # encapsulated (or otherwise can't be read directly)
+    offset: ty.Optional[int]
+    transfer_syntax: ty.Optional[str]
+
+
+def _frame_layout(fspath: Path) -> _FrameLayout:
+    """Reads the layout of the frames of a multi-frame file from its header"""
+    return _read_frame_layout(*file_key(fspath))
+
+
+@functools.lru_cache(maxsize=FRAME_INDEX_CACHE_SIZE)
+def _read_frame_layout(path: str, size: int, mtime: int) -> _FrameLayout:
+    with open(path, "rb", buffering=HEADER_BUFFER_SIZE) as f:
+        instrumentation.count("file.open")
+        tags = read_dicom_tags(
+            f,
+            [
+                "TransferSyntaxUID",
+                "SamplesPerPixel",
+                "NumberOfFrames",
+                "Rows",
+                "Columns",
+                "BitsAllocated",
+                "BitsStored",
+                "PixelRepresentation",
+            ],
+        )
+        f.seek(0)
+        location = locate_dicom_pixel_data(f)
+        if instrumentation.is_recording():
+            instrumentation.count(
+                "file.bytes_read", f.raw.tell()  # type: ignore[attr-defined]
+            )
+    num_frames = int(tags.get("NumberOfFrames") or 1)  # type: ignore[arg-type]
+    samples = int(tags.get("SamplesPerPixel") or 1)  # type: ignore[arg-type]
+    frame_shape: ty.Tuple[int, ...] = (int(tags["Rows"]), int(tags["Columns"]))  # type: ignore[arg-type]
+    if samples > 1:
+        frame_shape += (samples,)
+    transfer_syntax = tags.get("TransferSyntaxUID")
+    bits_allocated = int(tags.get("BitsAllocated") or 16)  # type: ignore[arg-type]
+    bits_stored = int(tags.get("BitsStored") or bits_allocated)  # type: ignore[arg-type]
+    signed = bool(tags.get("PixelRepresentation"))
+    dtype = numpy.dtype(f"{'i' if signed else 'u'}{max(bits_allocated // 8, 1)}")
+    offset = None
+    if (
+        location is not None
+        and samples == 1
+        and bits_allocated in (8, 16, 32, 64)
+        # Signed values that don't fill the allocated bits need sign extending
+        and (not signed or bits_stored == bits_allocated)
+        and location[1] >= num_frames * dtype.itemsize * frame_shape[0] * frame_shape[1]
+    ):
+        offset = location[0]
+        if transfer_syntax == EXPLICIT_VR_BIG_ENDIAN:
+            dtype = dtype.newbyteorder(">")
+    return _FrameLayout(
+        num_frames,
+        frame_shape,
+        dtype,
+        offset,
+        str(transfer_syntax) if transfer_syntax else None,
     )
 
 
+def _read_native_frames(
+    fspath: Path, layout: _FrameLayout, indices: DataArrayType
+) -> DataArrayType:
+    """Reads natively stored frames directly from their offsets in the file"""
+    assert layout.offset is not None
+    raw = numpy.empty((len(indices),) + layout.frame_shape, dtype=layout.dtype)
+    frame_size = int(numpy.prod(layout.frame_shape))
+    frame_bytes = raw.reshape(len(indices), frame_size).view(numpy.uint8)
+    frame_length = frame_bytes.shape[1]
+    with open(fspath, "rb", buffering=0) as f:
+        instrumentation.count("file.open")
+        for i, frame in enumerate(indices):
+            f.seek(layout.offset + int(frame) * frame_length)
+            f.readinto(frame_bytes[i])
+        instrumentation.count("file.bytes_read", frame_bytes.size)
+    return raw.astype(layout.dtype.newbyteorder("="), copy=False)
+
+
+def _decode_frames(
+    fspath: Path, layout: _FrameLayout, indices: DataArrayType
+) -> DataArrayType:
+    """Decodes the requested frames of encapsulated pixel data with pydicom"""
+    raw = numpy.empty((len(indices),) + layout.frame_shape, dtype=layout.dtype)
+    if not len(indices):
+        return raw
+    with open(fspath, "rb") as f:
+        instrumentation.count("file.open")
+        if layout.transfer_syntax == DEFLATED_EXPLICIT_VR_LITTLE_ENDIAN:
+            # Deflated data sets can only be read from the start so all the frames
+            # have to be decoded
+            pixels = pydicom.dcmread(f).pixel_array.reshape(
+                (layout.num_frames,) + layout.frame_shape
+            )
+            raw = pixels[indices]
+        else:
+            for i, pixels in enumerate(
+                iter_pixels(f, indices=[int(i) for i in indices])
+            ):
+                if i == 0 and pixels.dtype != raw.dtype:
+                    raw = raw.astype(pixels.dtype)
+                raw[i] = pixels
+        if instrumentation.is_recording():
+            instrumentation.count("file.bytes_read", f.tell())
+    return raw
+
+
+class DicomFrameProxy:
+    """Lazy proxy to the frames of a multi-frame DICOM image, which decodes only the
+    frames that are accessed via slicing. The frames are ordered by stack, time point
+    and their position along the normal to the slice plane, with the time points split
+    out into a leading dimension if the frames of a single stack were acquired at more
+    than one of them, so the proxy has the same shape as the array returned by
+    ``read_array``.
+
+    Parameters
+    ----------
+    image : DicomMultiframe
+        the image to read the frames of
+    """
+
+    def __init__(self, image: DicomMultiframe):
+        self.image = image
+        self.frame_map = _frame_order(image.frame_index)
+        self.layout = _frame_layout(image.fspath)
+
+    @property
+    def shape(self) -> ty.Tuple[int, ...]:
+        frame_map_shape: ty.Tuple[int, ...] = self.frame_map.shape
+        return frame_map_shape + self.layout.frame_shape
+
+    @property
+    def dtype(self) -> numpy.dtype[ty.Any]:
+        dtype: numpy.dtype[ty.Any] = self.image.read_frames([]).dtype
+        return dtype
+
+    @property
+    def ndim(self) -> int:
+        return len(self.shape)
+
+    def __len__(self) -> int:
+        return self.shape[0]
+
+    def __repr__(self) -> str:
+        return f"{type(self).__name__}({str(self.image.fspath)!r}, shape={self.shape})"
+
+    def __getitem__(self, key: ty.Any) -> DataArrayType:
+        if not isinstance(key, tuple):
+            key = (key,)
+        if any(k is Ellipsis for k in key):
+            i = next(i for i, k in enumerate(key) if k is Ellipsis)
+            fill = (slice(None),) * (self.ndim - len(key) + 1)
+            key = key[:i] + fill + key[i + 1 :]
+        num_frame_dims = self.frame_map.ndim
+        frames = self.frame_map[key[:num_frame_dims]]
+        pixels = self.image.read_frames(frames.reshape(-1))
+        pixels = pixels.reshape(frames.shape + pixels.shape[1:])
+        return pixels[(slice(None),) * frames.ndim + key[num_frame_dims:]]
+
+    def __array__(
+        self,
+        dtype: ty.Optional["numpy.typing.DTypeLike"] = None,
+        copy: ty.Optional[bool] = None,
+    ) -> DataArrayType:
+        array = self[...]
+        return array if dtype is None else array.astype(dtype, copy=False)
+
+
+def _frame_order(frames: ty.List[DicomFrame]) -> DataArrayType:
+    """Orders the frames of a multi-frame image by stack, time point and position,
+    returning the indices of the frames in an array with a leading time dimension if
+    there is a single stack acquired at more than one time point"""
+    num_frames = len(frames)
+    stacks = numpy.unique([f.stack_id or "" for f in frames], return_inverse=True)[
+        1
+    ].reshape(-1)
+    temporal = numpy.array([f.temporal_position or 0 for f in frames])
+    if all(f.position and f.orientation for f in frames):
+        orientation = numpy.array(frames[0].orientation).reshape(2, 3)
+        normal = numpy.cross(orientation[0], orientation[1])
+        spatial = numpy.array([f.position for f in frames]) @ normal
+    else:
+        spatial = numpy.array([f.in_stack_position or 0 for f in frames])
+    index = numpy.arange(num_frames)
+    order = numpy.lexsort((index, spatial, temporal, stacks))
+    num_time_points = len(numpy.unique(temporal))
+    if num_time_points > 1 and not stacks.any() and num_frames % num_time_points == 0:
+        return order.reshape(num_time_points, -1)
+    return order
+
+
+@extra_implementation(MedicalImage.read_array_proxy)
+def dicom_multiframe_read_array_proxy(image: DicomMultiframe) -> DicomFrameProxy:
+    return DicomFrameProxy(image)
+
+
+@extra_implementation(MedicalImage.read_array)
+def dicom_multiframe_read_array(image: DicomMultiframe) -> DataArrayType:
+    with instrumentation.span("dicom.read_array", num_files=1):
+        return numpy.asarray(image.data_proxy)
+
+
+@extra_implementation(MedicalImage.vox_sizes)
+def dicom_multiframe_vox_sizes(
+    image: DicomMultiframe,
+) -> ty.Tuple[float, float, float]:
+    # The pixel measures are read from the functional groups of the first frame
+    first = image.frame_index[0]
+    vox_sizes = list(first.pixel_spacing or [])
+    if first.slice_thickness is not None:
+        vox_sizes.append(first.slice_thickness)
+    return tuple(vox_sizes)
+
+
+@extra_implementation(MedicalImage.dims)
+def dicom_multiframe_dims(image: DicomMultiframe) -> ty.Tuple[int, int, int]:
+    # Ordered like the dimensions of the other DICOM images, i.e. rows, columns then
+    # slices (and time points if there is more than one)
+    frame_map_shape = _frame_order(image.frame_index).shape
+    layout = _frame_layout(image.fspath)
+    return layout.frame_shape[:2] + tuple(reversed(frame_map_shape))
+
+
 @extra_implementation(DicomCollection.series_number)
 def dicom_series_number(collection: DicomCollection) -> str:
     return str(collection.metadata["SeriesNumber"])
@@ -63,9 +628,11 @@ def dicom_dir_generate_sample_data(
     dest = generator.generate_fspath(DicomDir)
     dest.mkdir()
     for dcm_file in dcm_dir.iterdir():
-        dcm = pydicom.dcmread(dcm_file)
-        dcm.SeriesNumber = series_number
-        pydicom.dcmwrite(dest / dcm_file.name, dcm)
+        rewrite_dicom_header(
+            dcm_file,
+            dest / dcm_file.name,
+            lambda dcm: setattr(dcm, "SeriesNumber", series_number),
+        )
     return [dest]
 
 
@@ -92,32 +659,13 @@ def dicom_deidentify(
     dicom: DicomImage,
     spec: ty.Any = None,
     out_dir: os.PathLike[str] | None = None,
+    **kwargs: ty.Any,
 ) -> tuple[DicomImage, ty.Mapping[str, ty.Any]]:
     if out_dir is None:
         out_dir = Path(tempfile.mkdtemp())
     Path(out_dir).mkdir(parents=True, exist_ok=True)
-    dcm = dicom.load()
-    reid_metadata = {
-        "PatientName": dcm.PatientName,
-        "PatientBirthDate": dcm.PatientBirthDate,
-    }
-    dcm.PatientBirthDate = dcm.PatientBirthDate[:4] + "0101"
-    dcm.PatientName = "Anonymous^Anonymous"
-    for field in FIELDS_TO_DEIDENTIFY:
-        try:
-            elem = dcm[field]
-        except KeyError:
-            pass
-        else:
-            reid_metadata[
-                (
-                    str(elem.keyword)
-                    if isinstance(elem.keyword, str)
-                    else "{0},{1}".format(*field)
-                )
-            ] = elem.value
-            elem.value = ""
-    return dicom.new(Path(out_dir) / dicom.fspath.name, dcm), reid_metadata
+    deid_fspath, reid_metadata = _deidentify_file(dicom.fspath, Path(out_dir), spec)
+    return type(dicom)(deid_fspath), reid_metadata
 
 
 @extra_implementation(MedicalImagingData.deidentify)
@@ -125,20 +673,46 @@ def dicom_collection_deidentify(
     collection: DicomCollection,
     spec: ty.Any = None,
     out_dir: os.PathLike[str] | None = None,
+    max_workers: ty.Optional[int] = None,
+    pool: ty.Union[str, Executor] = "thread",
+    reid_log: ty.Optional[os.PathLike[str]] = None,
+    **kwargs: ty.Any,
 ) -> tuple[DicomCollection, ty.Mapping[str, ty.Any]]:
+    # The files are deidentified across a pool of workers, in the order of the files
+    # in the collection so that the re-identification metadata can be written to the
+    # log as it is returned without needing to be collated in memory
     if out_dir is None:
         out_dir = Path(tempfile.mkdtemp())
     out_dir = Path(out_dir)
     if isinstance(collection, DicomDir):
         out_dir /= collection.name
     out_dir.mkdir(parents=True, exist_ok=True)
+    dicom_files = _dicom_files(collection)
+    # Compile the profile once instead of in every worker
+    profile = DeidentificationProfile.from_spec(spec)
     deid_fspaths = []
-    reid_mdata_series = []
-    for dicom in collection.contents:
-        deid_image, reid_mdata = dicom.deidentify(out_dir=out_dir, spec=spec)
-        deid_fspaths.append(deid_image.fspath)
-        reid_mdata_series.append(reid_mdata)
-    reid_metadata = collate_metadata_series(reid_mdata_series)
+    reid_mdata_series: ty.List[ty.Mapping[str, ty.Any]] = []
+    with contextlib.ExitStack() as stack:
+        executor = stack.enter_context(worker_pool(pool, max_workers))
+        log = stack.enter_context(open(reid_log, "a")) if reid_log else None
+        for deid_fspath, reid_mdata in executor.map(
+            _deidentify_file,
+            dicom_files,
+            itertools.repeat(out_dir),
+            itertools.repeat(profile),
+            chunksize=DEIDENTIFY_CHUNK_SIZE,
+        ):
+            deid_fspaths.append(deid_fspath)
+            if log is not None:
+                log.write(
+                    json.dumps({"fspath": str(deid_fspath), **reid_mdata}, default=str)
+                    + "\n"
+                )
+            else:
+                reid_mdata_series.append(reid_mdata)
+    reid_metadata = (
+        collate_metadata_series(reid_mdata_series) if reid_log is None else {}
+    )
     type_ = type(collection)
     if isinstance(collection, DicomDir):
         deidentified = type_(Path(out_dir))
@@ -147,74 +721,133 @@ def dicom_collection_deidentify(
     return deidentified, reid_metadata
 
 
-FIELDS_TO_DEIDENTIFY = [
-    ("0008", "0014"),  # Instance Creator UID
-    ("0008", "1111"),  # Referenced Performed Procedure Step SQ
-    ("0008", "1120"),  # Referenced Patient SQ
-    ("0008", "1140"),  # Referenced Image SQ
-    ("0008", "0096"),  # Referring Physician Identification SQ
-    ("0008", "1032"),  # Procedure Code SQ
-    ("0008", "1048"),  # Physician(s) of Record
-    ("0008", "1049"),  # Physician(s) of Record Identification SQ
-    ("0008", "1050"),  # Performing Physicians' Name
-    ("0008", "1052"),  # Performing Physician Identification SQ
-    ("0008", "1060"),  # Name of Physician(s) Reading Study
-    ("0008", "1062"),  # Physician(s) Reading Study Identification SQ
-    ("0008", "1110"),  # Referenced Study SQ
-    ("0008", "1111"),  # Referenced Performed Procedure Step SQ
-    ("0008", "1250"),  # Related Series SQ
-    ("0008", "9092"),  # Referenced Image Evidence SQ
-    ("0008", "0080"),  # Institution Name
-    ("0008", "0081"),  # Institution Address
-    ("0008", "0082"),  # Institution Code Sequence
-    ("0008", "0092"),  # Referring Physician's Address
-    ("0008", "0094"),  # Referring Physician's Telephone Numbers
-    ("0008", "009C"),  # Consulting Physician's Name
-    ("0008", "1070"),  # Operators' Name
-    ("0010", "4000"),  # Patient Comments
-    # ("0010", "0010"),  # Patient's Name
-    ("0010", "0021"),  # Issuer of Patient ID
-    ("0010", "0032"),  # Patient's Birth Time
-    ("0010", "0050"),  # Patient's Insurance Plan Code SQ
-    ("0010", "0101"),  # Patient's Primary Language Code SQ
-    ("0010", "1000"),  # Other Patient IDs
-    ("0010", "1001"),  # Other Patient Names
-    ("0010", "1002"),  # Other Patient IDs SQ
-    ("0010", "1005"),  # Patient's Birth Name
-    ("0010", "1010"),  # Patient's Age
-    ("0010", "1040"),  # Patient's Address
-    ("0010", "1060"),  # Patient's Mother's Birth Name
-    ("0010", "1080"),  # Military Rank
-    ("0010", "1081"),  # Branch of Service
-    ("0010", "1090"),  # Medical Record Locator
-    ("0010", "2000"),  # Medical Alerts
-    ("0010", "2110"),  # Allergies
-    ("0010", "2150"),  # Country of Residence
-    ("0010", "2152"),  # Region of Residence
-    ("0010", "2154"),  # Patient's Telephone Numbers
-    ("0010", "2160"),  # Ethnic Group
-    ("0010", "2180"),  # Occupation
-    ("0010", "21A0"),  # Smoking Status
-    ("0010", "21B0"),  # Additional Patient History
-    ("0010", "21C0"),  # Pregnancy Status
-    ("0010", "21D0"),  # Last Menstrual Date
-    ("0010", "21F0"),  # Patient's Religious Preference
-    ("0010", "2203"),  # Patient's Sex Neutered
-    ("0010", "2297"),  # Responsible Person
-    ("0010", "2298"),  # Responsible Person Role
-    ("0010", "2299"),  # Responsible Organization
-    ("0020", "9221"),  # Dimension Organization SQ
-    ("0020", "9222"),  # Dimension Index SQ
-    ("0038", "0010"),  # Admission ID
-    ("0038", "0011"),  # Issuer of Admission ID
-    ("0038", "0060"),  # Service Episode ID
-    ("0038", "0061"),  # Issuer of Service Episode ID
-    ("0038", "0062"),  # Service Episode Description
-    ("0038", "0500"),  # Patient State
-    ("0038", "0100"),  # Pertinent Documents SQ
-    ("0040", "0260"),  # Performed Protocol Code SQ
-    ("0088", "0130"),  # Storage Media File-Set ID
-    ("0088", "0140"),  # Storage Media File-Set UID
-    ("0400", "0561"),  # Original Attributes Sequence
-    ("5200", "9229"),  # Shared Functional Groups SQ
-]
+# The number of files sent to each worker at a time when deidentifying collections
+# with a process pool (ignored by thread pools)
+DEIDENTIFY_CHUNK_SIZE = 16
+
+
+def _deidentify_file(
+    fspath: Path, out_dir: Path, spec: ty.Any = None
+) -> ty.Tuple[Path, ty.Dict[str, ty.Any]]:
+    """Deidentifies the header of a DICOM file, writing the deidentified file to the
+    output directory and returning its path along with the original values of the
+    deidentified fields. The pixel data is copied across without being decoded"""
+    profile = DeidentificationProfile.from_spec(spec)
+    deid_fspath = out_dir / fspath.name
+    reid_metadata = rewrite_dicom_header(fspath, deid_fspath, profile.apply)
+    return deid_fspath, reid_metadata
+
+
+def rewrite_dicom_header(
+    fspath: Path,
+    out_fspath: Path,
+    modify: ty.Callable[[pydicom.Dataset], T],
+) -> T:
+    """Rewrites the header of a DICOM file without decoding or re-encoding its pixel
+    data. Only the elements before the pixel data are parsed and passed to the
+    ``modify`` callback to be edited in place, then the modified header is written to
+    the output file and the remainder of the original file (the pixel data and any
+    elements after it) is copied after it byte-for-byte, within the kernel where the
+    platform supports it.
+
+    Parameters
+    ----------
+    fspath : Path
+        path to the DICOM file to rewrite
+    out_fspath : Path
+        path to write the rewritten file to
+    modify : Callable[[pydicom.Dataset], T]
+        a function that modifies the header data set in place
+
+    Returns
+    -------
+    T
+        the value returned by the ``modify`` callback
+    """
+    with open(fspath, "rb") as src:
+        dcm = pydicom.dcmread(src, stop_before_pixels=True)
+        # pydicom leaves the file positioned at the start of the pixel data element
+        pixel_data_offset = src.tell()
+        group = src.read(2)
+        deflated = (
+            dcm.file_meta.get("TransferSyntaxUID") == DEFLATED_EXPLICIT_VR_LITTLE_ENDIAN
+        )
+        if deflated or (group and group not in PIXEL_DATA_GROUP_PREFIXES):
+            # Deflated data sets (or files where pydicom stopped somewhere other than
+            # the pixel data) can't be split so fall back to rewriting the whole file
+            dcm = pydicom.dcmread(src.name)
+            result = modify(dcm)
+            pydicom.dcmwrite(out_fspath, dcm)
+            return result
+        result = modify(dcm)
+        with open(out_fspath, "wb") as dst:
+            pydicom.dcmwrite(dst, dcm)
+            copy_file_section(src, dst, pixel_data_offset)
+    return result
+
+
+# The group number of the pixel data elements in little and big endian
+PIXEL_DATA_GROUP_PREFIXES = (b"\xe0\x7f", b"\x7f\xe0")
+
+
+def copy_file_section(
+    src: ty.BinaryIO, dst: ty.BinaryIO, offset: int, length: ty.Optional[int] = None
+) -> None:
+    """Appends a section of the source file to the destination file, using
+    copy_file_range or sendfile where available so the data isn't copied through user
+    space
+
+    Parameters
+    ----------
+    src : BinaryIO
+        the file to copy from
+    dst : BinaryIO
+        the file to append to
+    offset : int
+        the offset of the start of the section in the source file
+    length : int, optional
+        the length of the section, by default to the end of the source file
+    """
+    dst.flush()
+    src_fd, dst_fd = src.fileno(), dst.fileno()
+    src_pos = offset
+    dst_start = dst.tell()
+    end = os.fstat(src_fd).st_size
+    if length is not None:
+        end = min(end, offset + length)
+    copy_file_range = getattr(os, "copy_file_range", None)
+    if copy_file_range is not None:
+        try:
+            while src_pos < end:
+                copied = copy_file_range(
+                    src_fd, dst_fd, end - src_pos, src_pos, dst_start + src_pos - offset
+                )
+                if not copied:
+                    break
+                src_pos += copied
+        except OSError:
+            pass  # e.g. not supported between these file systems
+    os.lseek(dst_fd, dst_start + src_pos - offset, os.SEEK_SET)
+    sendfile = getattr(os, "sendfile", None)
+    if sendfile is not None:
+        try:
+            while src_pos < end:
+                sent = sendfile(dst_fd, src_fd, src_pos, end - src_pos)
+                if not sent:
+                    break
+                src_pos += sent
+        except OSError:
+            pass
+    # Resynchronise the position of the buffered file object with the descriptor
+    dst.seek(dst_start + src_pos - offset)
+    if src_pos < end:
+        src.seek(src_pos)
+        while src_pos < end:
+            chunk = src.read(min(COPY_CHUNK_SIZE, end - src_pos))
+            if not chunk:
+                break
+            dst.write(chunk)
+            src_pos += len(chunk)
+
+
+COPY_CHUNK_SIZE = 1024 * 1024
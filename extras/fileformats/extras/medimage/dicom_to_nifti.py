@@ -0,0 +1,286 @@
+"""In-process conversion of simple DICOM series to NIfTI, which avoids the process
+spawn and temporary directory overheads of running dcm2niix.
+
+Only single-frame, single-volume series with uncompressed little-endian pixel data
+are supported (e.g. structural images and localisers), as the pixel data of each slice
+can then be copied straight from the DICOM files into the NIfTI voxel block without
+decoding it. Series that aren't supported are left to dcm2niix (see
+``ExtendedDcm2niix``).
+"""
+
+import json
+import logging
+import typing as ty
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+import nibabel
+import numpy
+from fileformats.medimage import DicomCollection, instrumentation
+from fileformats.medimage.base import DataArrayType
+from fileformats.medimage.gzip_codec import get_gzip_codec
+from fileformats.medimage.dicom import (
+    read_dicom_tags,
+    locate_dicom_pixel_data,
+    IMPLICIT_VR_LITTLE_ENDIAN,
+    EXPLICIT_VR_LITTLE_ENDIAN,
+)
+from .dicom import _dicom_files, _parse_ds, copy_file_section, READ_ARRAY_THREADS
+from .geometry import SliceGeometry
+
+logger = logging.getLogger("fileformats")
+
+NATIVE_TRANSFER_SYNTAXES = (IMPLICIT_VR_LITTLE_ENDIAN, EXPLICIT_VR_LITTLE_ENDIAN)
+
+# Tags that need to be the same in all slices for them to be stacked into a volume
+GEOMETRY_TAGS = (
+    "TransferSyntaxUID",
+    "SamplesPerPixel",
+    "PhotometricInterpretation",
+    "Rows",
+    "Columns",
+    "PixelSpacing",
+    "BitsAllocated",
+    "BitsStored",
+    "PixelRepresentation",
+    "RescaleIntercept",
+    "RescaleSlope",
+)
+
+
+def _ms_to_s(value: str) -> float:
+    # Round off the error introduced by the conversion, e.g. 2.07 ms -> 0.00207 s
+    return float(f"{float(value) / 1000:.10g}")
+
+
+def _format_time(value: str) -> str:
+    return f"{value[:2]}:{value[2:4]}:{value[4:]}" if ":" not in value else value
+
+
+def _split(value: str) -> ty.List[str]:
+    return value.split("\\")
+
+
+# DICOM keywords mapped onto the fields of the BIDS side-car and functions to convert
+# the values read from the header into the units BIDS expects
+SIDE_CAR_FIELDS: ty.Tuple[ty.Tuple[str, str, ty.Callable[[str], ty.Any]], ...] = (
+    ("Modality", "Modality", str),
+    ("MagneticFieldStrength", "MagneticFieldStrength", float),
+    ("Manufacturer", "Manufacturer", str),
+    ("ManufacturerModelName", "ManufacturersModelName", str),
+    ("SoftwareVersions", "SoftwareVersions", str),
+    ("SeriesDescription", "SeriesDescription", str),
+    ("ProtocolName", "ProtocolName", str),
+    ("ImageType", "ImageType", _split),
+    ("SeriesNumber", "SeriesNumber", int),
+    ("AcquisitionTime", "AcquisitionTime", _format_time),
+    ("AcquisitionNumber", "AcquisitionNumber", int),
+    ("SliceThickness", "SliceThickness", float),
+    ("SpacingBetweenSlices", "SpacingBetweenSlices", float),
+    ("EchoNumbers", "EchoNumber", int),
+    ("EchoTime", "EchoTime", _ms_to_s),
+    ("RepetitionTime", "RepetitionTime", _ms_to_s),
+    ("InversionTime", "InversionTime", _ms_to_s),
+    ("FlipAngle", "FlipAngle", float),
+)
+
+HEADER_TAGS = (
+    GEOMETRY_TAGS
+    + ("NumberOfFrames", "ImagePositionPatient", "ImageOrientationPatient")
+    + tuple(f[0] for f in SIDE_CAR_FIELDS)
+)
+
+
+class _Slice(ty.NamedTuple):
+    fspath: Path
+    tags: ty.Dict[str, ty.Any]
+    pixel_data: ty.Optional[ty.Tuple[int, int]]
+
+
+def supports_native_conversion(collection: DicomCollection) -> bool:
+    """Checks whether a DICOM collection can be converted to NIfTI in-process by
+    ``convert_dicom_to_nifti``
+
+    Parameters
+    ----------
+    collection : DicomCollection
+        the DICOM series to check
+
+    Returns
+    -------
+    bool
+        whether the series can be converted
+    """
+    try:
+        _read_volume(collection)
+    except ValueError as e:
+        logger.debug("Cannot convert %s natively: %s", collection, e)
+        return False
+    return True
+
+
+def convert_dicom_to_nifti(
+    collection: DicomCollection,
+    out_fspath: Path,
+    compress: bool = False,
+) -> ty.Tuple[Path, Path]:
+    """Converts a single-volume DICOM series to NIfTI, copying the pixel data of each
+    slice straight into the voxel block, and writes a BIDS JSON side-car alongside it
+
+    Parameters
+    ----------
+    collection : DicomCollection
+        the DICOM series to convert
+    out_fspath : Path
+        path to write the NIfTI file to, the side-car is written to the same path with
+        a ".json" extension
+    compress : bool, optional
+        whether to gzip the NIfTI file, by default False
+
+    Returns
+    -------
+    nifti : Path
+        path to the NIfTI file
+    side_car : Path
+        path to the JSON side-car
+
+    Raises
+    ------
+    ValueError
+        if the series isn't supported (see ``supports_native_conversion``)
+    """
+    slices, affine, zooms = _read_volume(collection)
+    tags = slices[0].tags
+    bits = int(tags["BitsAllocated"])
+    dtype = numpy.dtype(
+        f"<{'i' if tags.get('PixelRepresentation') else 'u'}{bits // 8}"
+    )
+    rows, columns = int(tags["Rows"]), int(tags["Columns"])
+    header: ty.Any = nibabel.Nifti1Header(  # type: ignore[no-untyped-call]
+        endianness="<"
+    )
+    header.set_data_dtype(dtype)
+    header.set_data_shape((columns, rows, len(slices)))
+    header.set_zooms(zooms)
+    header.set_qform(affine, code=1)
+    header.set_sform(affine, code=1)
+    header.set_xyzt_units("mm", "sec")
+    slope = (_parse_ds(tags.get("RescaleSlope")) or [1.0])[0]
+    intercept = (_parse_ds(tags.get("RescaleIntercept")) or [0.0])[0]
+    if slope != 1.0 or intercept != 0.0:
+        header.set_slope_inter(slope, intercept)
+    # NIfTI voxels are stored with the first index varying fastest, which matches
+    # the row-major order of the DICOM pixel data when the first axis runs along the
+    # rows (i.e. is indexed by column) and the second down the columns
+    slice_size = rows * columns * dtype.itemsize
+    unused_bits = bits - int(tags.get("BitsStored") or bits)
+    out_fspath = Path(out_fspath)
+    with _open_output(out_fspath, compress) as f:
+        header.write_to(f)
+        for slc in slices:
+            assert slc.pixel_data is not None
+            with open(slc.fspath, "rb") as src:
+                instrumentation.count("file.open")
+                instrumentation.count("file.bytes_read", slice_size)
+                if compress or unused_bits:
+                    src.seek(slc.pixel_data[0])
+                    block = src.read(slice_size)
+                    if unused_bits:
+                        block = _clear_unused_bits(block, dtype, unused_bits)
+                    f.write(block)
+                else:
+                    copy_file_section(src, f, slc.pixel_data[0], slice_size)
+    side_car_fspath = out_fspath.parent / (out_fspath.name.split(".")[0] + ".json")
+    with open(side_car_fspath, "w") as side_car_file:
+        json.dump(_side_car(tags), side_car_file, indent=2)
+    return out_fspath, side_car_fspath
+
+
+def _open_output(fspath: Path, compress: bool) -> ty.BinaryIO:
+    if compress:
+        return get_gzip_codec().open(fspath, "wb", compresslevel=GZIP_COMPRESS_LEVEL)
+    return open(fspath, "wb")
+
+
+# Use a fast compression level, as the conversion would otherwise be dominated by it
+GZIP_COMPRESS_LEVEL = 1
+
+
+def _read_volume(
+    collection: DicomCollection,
+) -> ty.Tuple[ty.List[_Slice], DataArrayType, ty.Tuple[float, float, float]]:
+    """Reads the headers of the slices and checks they can be stacked into a single
+    volume, returning them in order along with the affine and voxel sizes"""
+    with ThreadPoolExecutor(READ_ARRAY_THREADS) as executor:
+        slices = list(executor.map(_read_slice, _dicom_files(collection)))
+    if not slices:
+        raise ValueError("no DICOM files found")
+    first = slices[0].tags
+    for slc in slices:
+        tags = slc.tags
+        if tags.get("TransferSyntaxUID") not in NATIVE_TRANSFER_SYNTAXES:
+            raise ValueError(
+                f"unsupported transfer syntax {tags.get('TransferSyntaxUID')}"
+            )
+        if int(tags.get("NumberOfFrames") or 1) != 1:
+            raise ValueError("multi-frame images aren't supported")
+        if int(tags.get("SamplesPerPixel") or 1) != 1:
+            raise ValueError("only single-channel images are supported")
+        if tags.get("BitsAllocated") not in (8, 16, 32):
+            raise ValueError(f"unsupported bits allocated {tags.get('BitsAllocated')}")
+        if any(tags.get(k) != first.get(k) for k in GEOMETRY_TAGS):
+            raise ValueError("slices have different dimensions or data types")
+        expected = int(tags["Rows"]) * int(tags["Columns"]) * tags["BitsAllocated"] // 8
+        if slc.pixel_data is None or slc.pixel_data[1] < expected:
+            raise ValueError("native pixel data not found")
+    geometry = SliceGeometry.from_tags([s.tags for s in slices])
+    if geometry is None:
+        raise ValueError("missing image orientation/position")
+    if geometry.num_stacks > 1:
+        raise ValueError("slices aren't parallel")
+    if geometry.pixel_spacing is None:
+        raise ValueError("missing pixel spacing")
+    if len(geometry.duplicates):
+        raise ValueError("multiple slices at the same position (e.g. 4D series)")
+    if not geometry.is_regular:
+        raise ValueError("slices aren't evenly spaced")
+    order = geometry.order
+    affine = geometry.affine()
+    pixel_spacing = geometry.pixel_spacing
+    zooms = (
+        pixel_spacing[1],
+        pixel_spacing[0],
+        float(numpy.linalg.norm(geometry.slice_vector)),
+    )
+    return [slices[i] for i in order], affine, zooms
+
+
+def _clear_unused_bits(block: bytes, dtype: numpy.dtype[ty.Any], unused: int) -> bytes:
+    """Clears the bits above the stored ones, which can contain other data (e.g.
+    overlays), extending the sign bit of signed data into them"""
+    values = numpy.frombuffer(block, dtype=dtype)
+    return ((values << unused) >> unused).tobytes()
+
+
+def _read_slice(fspath: Path) -> _Slice:
+    with open(fspath, "rb") as f:
+        instrumentation.count("file.open")
+        tags = read_dicom_tags(f, HEADER_TAGS)
+        f.seek(0)
+        pixel_data = locate_dicom_pixel_data(f)
+        if instrumentation.is_recording():
+            instrumentation.count("file.bytes_read", f.raw.tell())
+    return _Slice(fspath, tags, pixel_data)  # type: ignore[arg-type]
+
+
+def _side_car(tags: ty.Mapping[str, ty.Any]) -> ty.Dict[str, ty.Any]:
+    side_car: ty.Dict[str, ty.Any] = {}
+    for keyword, field, convert in SIDE_CAR_FIELDS:
+        value = tags.get(keyword)
+        if value is None or value == "":
+            continue
+        try:
+            side_car[field] = convert(value)
+        except ValueError:
+            logger.debug("Could not convert %s value %r for side-car", keyword, value)
+    side_car["ConversionSoftware"] = "fileformats-medimage-extras"
+    return side_car
@@ -9,19 +9,45 @@ from fileformats.medimage.diffusion import EncodingArrayType
 
 @extra_implementation(Bval.read_array)
 def bval_read_array(bval: Bval) -> EncodingArrayType:
-    return np.asarray([float(ln) for ln in bval.read_contents().split()])
+    return parse_b_table(bval.read_contents()).ravel()
 
 
 @extra_implementation(DwiEncoding.read_encodings)
 def bvec_read_array(bvec: Bvec) -> EncodingArrayType:
     bvals = bvec.b_values_file.read_array()
-    directions = np.asarray(
-        [[float(x) for x in ln.split()] for ln in bvec.read_contents().splitlines()],
-        dtype=float,
-    ).T
+    directions = parse_b_table(bvec.read_contents()).T
+    if len(bvals) != len(directions):
+        raise ValueError(
+            f"The number of b-values ({len(bvals)}) does not match the number of "
+            f"directions {len(directions)}"
+        )
     return np.concatenate((directions, bvals.reshape((-1, 1))), axis=1)
 
 
+def parse_b_table(contents: ty.Union[str, bytes]) -> EncodingArrayType:
+    """Parses the whitespace-separated rows of values in a b-value/vector file into a
+    2-D array, converting all the values in a single call instead of one at a time
+
+    Parameters
+    ----------
+    contents : str or bytes
+        the contents of the file
+
+    Returns
+    -------
+    numpy.ndarray
+        the values with one row per non-blank line of the file
+    """
+    rows = [ln for ln in contents.splitlines() if ln.strip()]
+    row_lengths = set(len(ln.split()) for ln in rows)
+    if len(row_lengths) > 1:
+        raise ValueError(
+            f"Rows of b-table have different lengths ({sorted(row_lengths)})"
+        )
+    values = np.asarray(contents.split(), dtype=float)
+    return values.reshape((len(rows), -1)) if rows else values.reshape((0, 0))
+
+
 @extra_implementation(FileSet.generate_sample_data)
 def bval_generate_sample_data(
     bval: Bval, generator: SampleFileGenerator
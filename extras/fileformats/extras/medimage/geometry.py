@@ -0,0 +1,325 @@
+"""Computation of the geometry of a series of DICOM slices from the positions and
+orientations in their headers, e.g. the order of the slices along the normal to the
+slice plane, the spacing between them and the affine mapping voxel indices to patient
+coordinates. The positions and orientations of the whole series are collected into
+arrays so that the geometry is computed in a handful of vectorised operations rather
+than slice by slice.
+"""
+
+import typing as ty
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+import numpy
+import numpy.typing
+from fileformats.medimage import instrumentation
+from fileformats.medimage.base import DataArrayType
+from fileformats.medimage.dicom import read_dicom_tags
+
+# The distance (in mm) within which slice positions and spacings are considered the
+# same, and the difference within which direction cosines are considered parallel
+POSITION_TOLERANCE = 1e-2
+ORIENTATION_TOLERANCE = 1e-4
+
+# The header elements the geometry is computed from
+GEOMETRY_KEYWORDS = (
+    "ImagePositionPatient",
+    "ImageOrientationPatient",
+    "PixelSpacing",
+    "SliceThickness",
+    "SpacingBetweenSlices",
+)
+
+
+class SliceGeometry:
+    """The geometry of a series of DICOM slices
+
+    Slices with the same orientation are grouped into stacks, and the slices of each
+    stack are ordered by the projection of their positions onto the normal to the slice
+    plane. The spacing, tilt and affine are those of the first stack.
+
+    Parameters
+    ----------
+    positions : array-like, shape (n, 3)
+        the ImagePositionPatient of each slice
+    orientations : array-like, shape (n, 6)
+        the ImageOrientationPatient of each slice
+    pixel_spacing : tuple[float, float], optional
+        the spacing between the centres of the rows and the columns of the slices
+    slice_thickness : float, optional
+        the spacing to use for series with a single slice position, i.e. the
+        SpacingBetweenSlices or SliceThickness of the slices
+    tolerance : float, optional
+        the distance within which positions and spacings are considered the same, by
+        default ``POSITION_TOLERANCE``
+    orientation_tolerance : float, optional
+        the difference within which direction cosines are considered parallel, by
+        default ``ORIENTATION_TOLERANCE``
+    """
+
+    def __init__(
+        self,
+        positions: "numpy.typing.ArrayLike",
+        orientations: "numpy.typing.ArrayLike",
+        pixel_spacing: ty.Optional[ty.Sequence[float]] = None,
+        slice_thickness: ty.Optional[float] = None,
+        tolerance: float = POSITION_TOLERANCE,
+        orientation_tolerance: float = ORIENTATION_TOLERANCE,
+    ):
+        self.positions = numpy.asarray(positions, dtype=float).reshape(-1, 3)
+        self.orientations = numpy.asarray(orientations, dtype=float).reshape(-1, 6)
+        if len(self.positions) != len(self.orientations):
+            raise ValueError(
+                f"Number of positions ({len(self.positions)}) doesn't match the "
+                f"number of orientations ({len(self.orientations)})"
+            )
+        if not len(self.positions):
+            raise ValueError("No slices to compute the geometry of")
+        self.pixel_spacing = tuple(pixel_spacing) if pixel_spacing else None
+        self.slice_thickness = slice_thickness
+        self.tolerance = tolerance
+        # Group the slices into stacks of the same orientation, numbered in the order
+        # they first appear
+        _, first, inverse = numpy.unique(
+            numpy.round(self.orientations / orientation_tolerance),
+            axis=0,
+            return_index=True,
+            return_inverse=True,
+        )
+        self.stacks = numpy.argsort(numpy.argsort(first))[inverse.reshape(-1)]
+        normals = numpy.cross(self.orientations[:, :3], self.orientations[:, 3:])
+        self.distances = numpy.einsum("ij,ij->i", self.positions, normals)
+        self.order = numpy.lexsort((self.distances, self.stacks))
+
+    @property
+    def num_slices(self) -> int:
+        return len(self.positions)
+
+    @property
+    def num_stacks(self) -> int:
+        """The number of stacks of slices with different orientations"""
+        return int(self.stacks.max()) + 1
+
+    @property
+    def row_cosine(self) -> DataArrayType:
+        return self.orientations[self.order[0], :3]
+
+    @property
+    def column_cosine(self) -> DataArrayType:
+        return self.orientations[self.order[0], 3:]
+
+    @property
+    def normal(self) -> DataArrayType:
+        """The normal to the slice plane of the first stack"""
+        return numpy.cross(self.row_cosine, self.column_cosine)
+
+    @property
+    def stack_order(self) -> DataArrayType:
+        """The indices of the slices of the first stack in order along the normal"""
+        return self.order[self.stacks[self.order] == 0]
+
+    @property
+    def duplicates(self) -> DataArrayType:
+        """The indices of slices at the same position as another slice of their stack,
+        e.g. the additional echoes or time points of multi-echo or 4D series"""
+        sorted_stacks = self.stacks[self.order]
+        sorted_distances = self.distances[self.order]
+        same = (numpy.diff(sorted_stacks) == 0) & (
+            numpy.abs(numpy.diff(sorted_distances)) < self.tolerance
+        )
+        return self.order[1:][same]
+
+    @property
+    def slice_positions(self) -> DataArrayType:
+        """The distinct positions of the slices of the first stack, in order along the
+        normal"""
+        order = self.stack_order
+        distances = self.distances[order]
+        distinct = numpy.ones(len(order), dtype=bool)
+        distinct[1:] = numpy.diff(distances) >= self.tolerance
+        return self.positions[order[distinct]]
+
+    @property
+    def gaps(self) -> DataArrayType:
+        """The distances between consecutive slice positions along the normal"""
+        return numpy.diff(self.slice_positions @ self.normal)
+
+    @property
+    def spacing(self) -> ty.Optional[float]:
+        """The spacing between the slice planes, i.e. the median distance between
+        consecutive slice positions, falling back to the slice thickness if there is
+        only one position"""
+        gaps = self.gaps
+        if not len(gaps):
+            return self.slice_thickness
+        return float(numpy.median(gaps))
+
+    @property
+    def is_regular(self) -> bool:
+        """Whether the slice positions are evenly spaced"""
+        gaps = self.gaps
+        return not len(gaps) or bool(gaps.max() - gaps.min() <= self.tolerance)
+
+    @property
+    def num_missing(self) -> int:
+        """The number of slice positions missing from gaps in the stack, assuming the
+        slices are otherwise evenly spaced"""
+        spacing = self.spacing
+        if not spacing or not len(self.gaps):
+            return 0
+        return int(numpy.sum(numpy.maximum(numpy.rint(self.gaps / spacing) - 1, 0)))
+
+    @property
+    def slice_vector(self) -> DataArrayType:
+        """The displacement between consecutive slice positions, which isn't parallel
+        to the normal if the stack is tilted (e.g. by a CT gantry tilt)"""
+        positions = self.slice_positions
+        if len(positions) > 1:
+            # Scaled so its projection onto the normal is the spacing, so it isn't
+            # affected by any gaps in the stack
+            extent = positions[-1] - positions[0]
+            vector: DataArrayType = extent * (self.spacing / (extent @ self.normal))
+            return vector
+        return self.normal * (self.slice_thickness or 1.0)
+
+    @property
+    def tilt(self) -> float:
+        """The angle (in degrees) between the slice vector and the normal"""
+        vector = self.slice_vector
+        cosine = abs(vector @ self.normal) / numpy.linalg.norm(vector)
+        return float(numpy.degrees(numpy.arccos(numpy.clip(cosine, -1.0, 1.0))))
+
+    @property
+    def vox_sizes(self) -> ty.Tuple[float, ...]:
+        """The pixel spacing followed by the spacing between slices"""
+        vox_sizes = list(self.pixel_spacing or ())
+        if self.spacing is not None:
+            vox_sizes.append(self.spacing)
+        return tuple(vox_sizes)
+
+    def affine(self, ras: bool = True) -> DataArrayType:
+        """The affine mapping the (column, row, slice) voxel indices of the first stack
+        to patient coordinates
+
+        Parameters
+        ----------
+        ras : bool, optional
+            whether to return the affine in the RAS+ coordinate system used by NIfTI
+            instead of the LPS+ system used by DICOM, by default True
+
+        Returns
+        -------
+        numpy.ndarray
+            the 4x4 affine
+        """
+        if self.pixel_spacing is None:
+            raise ValueError("Pixel spacing is required to compute the affine")
+        affine = numpy.eye(4)
+        affine[:3, 0] = self.row_cosine * self.pixel_spacing[1]
+        affine[:3, 1] = self.column_cosine * self.pixel_spacing[0]
+        affine[:3, 2] = self.slice_vector
+        affine[:3, 3] = self.slice_positions[0]
+        if ras:
+            affine = numpy.diag([-1.0, -1.0, 1.0, 1.0]) @ affine
+        return affine
+
+    @classmethod
+    def from_tags(
+        cls,
+        tags: ty.Sequence[ty.Mapping[ty.Any, ty.Any]],
+        **kwargs: ty.Any,
+    ) -> ty.Optional["SliceGeometry"]:
+        """Computes the geometry of slices from the values read from their headers
+
+        Parameters
+        ----------
+        tags : Sequence[Mapping[str, Any]]
+            the values of the ``GEOMETRY_KEYWORDS`` read from the header of each slice
+            (see ``read_dicom_tags``)
+        **kwargs : Any
+            the tolerances to pass to the constructor
+
+        Returns
+        -------
+        SliceGeometry or None
+            the geometry of the slices, None if any of them are missing their
+            positions or orientations
+        """
+        positions = parse_ds_array([t.get("ImagePositionPatient") for t in tags], 3)
+        orientations = parse_ds_array(
+            [t.get("ImageOrientationPatient") for t in tags], 6
+        )
+        if positions is None or orientations is None:
+            return None
+        first = tags[0]
+        pixel_spacing = parse_ds_array([first.get("PixelSpacing")], 2)
+        thickness = parse_ds_array(
+            [first.get("SpacingBetweenSlices") or first.get("SliceThickness")], 1
+        )
+        return cls(
+            positions,
+            orientations,
+            pixel_spacing=(
+                tuple(pixel_spacing[0]) if pixel_spacing is not None else None
+            ),
+            slice_thickness=float(thickness[0, 0]) if thickness is not None else None,
+            **kwargs,
+        )
+
+
+def read_slice_geometry(
+    fspaths: ty.Sequence[Path], max_workers: ty.Optional[int] = None
+) -> ty.Optional[SliceGeometry]:
+    """Reads the geometry of a series of DICOM slices from their headers, which are
+    scanned across a pool of threads
+
+    Parameters
+    ----------
+    fspaths : Sequence[Path]
+        the paths to the slices
+    max_workers : int, optional
+        the number of threads to read the headers with
+
+    Returns
+    -------
+    SliceGeometry or None
+        the geometry of the slices, None if any of them are missing their positions or
+        orientations
+    """
+    with (
+        instrumentation.span("dicom.read_geometry", num_files=len(fspaths)),
+        ThreadPoolExecutor(max_workers) as executor,
+    ):
+        tags = list(
+            executor.map(lambda p: read_dicom_tags(p, GEOMETRY_KEYWORDS), fspaths)
+        )
+    return SliceGeometry.from_tags(tags)
+
+
+def parse_ds_array(
+    values: ty.Sequence[ty.Any], width: int
+) -> ty.Optional[DataArrayType]:
+    """Parses the decimal string values of a header element read from several files
+    into an array in a single operation
+
+    Parameters
+    ----------
+    values : Sequence[Any]
+        the backslash separated values read from each file
+    width : int
+        the number of values the element is expected to have
+
+    Returns
+    -------
+    numpy.ndarray or None
+        the values with shape (len(values), width), None if any of them are missing or
+        don't have the expected number of values
+    """
+    if not values or not all(v and isinstance(v, str) for v in values):
+        return None
+    try:
+        array = numpy.array("\\".join(values).split("\\"), dtype=float)
+    except ValueError:
+        return None
+    if array.size != len(values) * width:
+        return None
+    return array.reshape(len(values), width)
@@ -0,0 +1,151 @@
+"""Persistent seek-point indices for gzipped images, which allow random access into the
+compressed data without decompressing everything up to the point of interest.
+
+Indices are built with `indexed_gzip <https://github.com/pauldmccarthy/indexed_gzip>`_
+(if installed) the first time a gzipped file is accessed and saved in a cache
+directory, so they only need to be built once per version of the file. The cache
+directory defaults to ``$XDG_CACHE_HOME/fileformats-medimage/gzip-index`` and can be
+changed by setting the ``FILEFORMATS_MEDIMAGE_GZIP_INDEX_DIR`` environment variable or
+calling ``set_gzip_index_dir``.
+"""
+
+import os
+import hashlib
+import logging
+import tempfile
+import typing as ty
+from pathlib import Path
+
+try:
+    import indexed_gzip
+except ImportError:
+    indexed_gzip = None
+
+logger = logging.getLogger("fileformats")
+
+GZIP_INDEX_DIR_ENV_VAR = "FILEFORMATS_MEDIMAGE_GZIP_INDEX_DIR"
+
+# The number of bytes of uncompressed data between seek points. Each seek point stores
+# a 32 KiB window, so an index is ~1% of the size of the uncompressed data
+GZIP_INDEX_SPACING = 4 * 1024 * 1024
+
+
+def open_indexed_gzip(
+    fspath: ty.Union[str, os.PathLike[str]],
+) -> ty.Optional[ty.IO[bytes]]:
+    """Opens a gzipped file for random access using a seek-point index, loading the
+    index from the cache directory if it has already been built for the current version
+    of the file, otherwise building and saving it
+
+    Parameters
+    ----------
+    fspath : str or os.PathLike
+        path to the gzipped file
+
+    Returns
+    -------
+    IO[bytes] or None
+        a seekable file object for the uncompressed data, or None if indexed_gzip isn't
+        installed
+    """
+    if indexed_gzip is None:
+        return None
+    index_path = gzip_index_path(fspath)
+    if index_path.exists():
+        return indexed_gzip.IndexedGzipFile(  # type: ignore[no-any-return]
+            str(fspath), spacing=GZIP_INDEX_SPACING, index_file=str(index_path)
+        )
+    gzip_file = indexed_gzip.IndexedGzipFile(str(fspath), spacing=GZIP_INDEX_SPACING)
+    gzip_file.build_full_index()
+    try:
+        _save_index(gzip_file, index_path)
+    except OSError as e:
+        logger.warning("Could not save gzip index for %s: %s", fspath, e)
+    return gzip_file  # type: ignore[no-any-return]
+
+
+def gzip_index_path(fspath: ty.Union[str, os.PathLike[str]]) -> Path:
+    """The path the index of the current version of the file is saved at, which includes
+    the size and modification time of the file so that the index is invalidated when the
+    file is changed
+
+    Parameters
+    ----------
+    fspath : str or os.PathLike
+        path to the gzipped file
+
+    Returns
+    -------
+    Path
+        path to the index file in the cache directory
+    """
+    stat = os.stat(fspath)
+    return get_gzip_index_dir() / (
+        f"{_path_hash(fspath)}-{stat.st_size}-{stat.st_mtime_ns}.gzidx"
+    )
+
+
+def get_gzip_index_dir() -> Path:
+    """Returns the directory that gzip indices are saved in
+
+    Returns
+    -------
+    Path
+        the directory set by ``set_gzip_index_dir`` or, if it hasn't been called, the
+        one in the ``FILEFORMATS_MEDIMAGE_GZIP_INDEX_DIR`` environment variable or the
+        default cache directory
+    """
+    if _gzip_index_dir is not None:
+        return _gzip_index_dir
+    path = os.environ.get(GZIP_INDEX_DIR_ENV_VAR)
+    if path:
+        return Path(path)
+    cache_home = os.environ.get("XDG_CACHE_HOME", Path("~", ".cache").expanduser())
+    return Path(cache_home) / "fileformats-medimage" / "gzip-index"
+
+
+def set_gzip_index_dir(
+    path: ty.Union[str, os.PathLike[str], None],
+) -> ty.Optional[Path]:
+    """Sets the directory to save gzip indices in, overriding the one set in the
+    environment
+
+    Parameters
+    ----------
+    path : str or os.PathLike or None
+        the directory to save the indices in, or None to revert to the default
+
+    Returns
+    -------
+    Path or None
+        the directory previously set by ``set_gzip_index_dir``
+    """
+    global _gzip_index_dir
+    previous = _gzip_index_dir
+    _gzip_index_dir = Path(path) if path is not None else None
+    return previous
+
+
+def _save_index(gzip_file: ty.Any, index_path: Path) -> None:
+    index_path.parent.mkdir(parents=True, exist_ok=True)
+    # Write to a temporary file first so that concurrent readers never see a partial
+    # index, then remove indices of previous versions of the file
+    fd, tmp_path = tempfile.mkstemp(dir=index_path.parent, suffix=".tmp")
+    os.close(fd)
+    try:
+        gzip_file.export_index(tmp_path)
+        os.replace(tmp_path, index_path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.unlink(tmp_path)
+    prefix = index_path.name.split("-")[0]
+    for stale in index_path.parent.glob(prefix + "-*.gzidx"):
+        if stale != index_path:
+            stale.unlink(missing_ok=True)
+
+
+def _path_hash(fspath: ty.Union[str, os.PathLike[str]]) -> str:
+    return hashlib.sha1(os.path.abspath(fspath).encode()).hexdigest()
+
+
+_gzip_index_dir: ty.Optional[Path] = None
@@ -1,7 +1,9 @@
 from pathlib import Path
 import typing as ty
 import nibabel
+from nibabel.volumeutils import apply_read_scaling
 import typing  # noqa: F401
+import numpy
 import numpy.typing  # noqa: F401
 from fileformats.core import FileSet, SampleFileGenerator, extra_implementation
 from fileformats.medimage import (
@@ -18,37 +20,240 @@ from fileformats.medimage import (
     Dmri,
     Brain,
 )
+from fileformats.medimage import instrumentation
 from fileformats.medimage.base import DataArrayType
+from fileformats.medimage.nifti import NiftiWithDataFile, NIFTI2_HEADER_SIZE
+from fileformats.medimage.gzip_codec import get_gzip_codec
+from .gzip_index import open_indexed_gzip
 import medimages4tests.dummy.nifti
 import medimages4tests.mri.neuro.t1w
 import medimages4tests.mri.neuro.dwi
 import medimages4tests.mri.neuro.bold
 
 
-@extra_implementation(FileSet.read_metadata)
-def nifti_read_metadata(nifti: Nifti, **kwargs: ty.Any) -> ty.Mapping[str, ty.Any]:
-    metadata = dict(nibabel.load(nifti.fspath).header)  # type: ignore[call-overload]
-    return metadata  # type: ignore[no-any-return]
-
-
 @extra_implementation(MedicalImage.read_array)
 def nifti_data_array(nifti: Nifti) -> DataArrayType:  # noqa
-    return nibabel.load(nifti.fspath).get_data()  # type: ignore[attr-defined]
+    with instrumentation.span("nibabel.read_array", path=nifti.fspath):
+        _count_whole_file_read(nifti)
+        return numpy.asanyarray(nibabel.load(nifti.fspath).dataobj)  # type: ignore[attr-defined]
 
 
-@extra_implementation(MedicalImage.vox_sizes)
-def nifti_vox_sizes(nifti: Nifti) -> ty.Tuple[float, float, float]:
-    ndims = len(nifti_dims(nifti))
-    return tuple(float(d) for d in nifti.metadata["pixdim"][1 : ndims + 1])  # type: ignore[return-value]
-
+@extra_implementation(MedicalImage.read_array)
+def nifti_gz_read_array(nifti: NiftiGz) -> DataArrayType:
+    # Decompress with the configured gzip codec, which decompresses images written by
+    # it in parallel
+    with (
+        instrumentation.span("nibabel.read_array", path=nifti.fspath),
+        get_gzip_codec().open(nifti.fspath) as f,
+    ):
+        _count_whole_file_read(nifti)
+        image = _image_class(nifti).from_stream(f)  # type: ignore[arg-type]
+        return numpy.asanyarray(image.dataobj)
+
+
+def _count_whole_file_read(nifti: Nifti) -> None:
+    """Records the opening and reading of all the files of the image"""
+    if instrumentation.is_recording():
+        for fspath in nifti.fspaths:
+            instrumentation.count("file.open")
+            instrumentation.count("file.bytes_read", fspath.stat().st_size)
+
+
+@extra_implementation(MedicalImage.read_array_proxy)
+def nifti_read_array_proxy(nifti: Nifti) -> DataArrayType:
+    dataobj = nibabel.load(nifti.fspath).dataobj  # type: ignore[attr-defined]
+    data_fspath = (
+        nifti.data_file.fspath  # type: ignore[attr-defined]
+        if isinstance(nifti, NiftiWithDataFile)
+        else nifti.fspath
+    )
+    return NiftiArrayProxy(
+        data_fspath,
+        shape=dataobj.shape,
+        dtype=dataobj.dtype,
+        offset=dataobj.offset,
+        slope=dataobj.slope,
+        inter=dataobj.inter,
+    )
+
+
+@extra_implementation(MedicalImage.read_array_proxy)
+def nifti_gz_read_array_proxy(nifti: NiftiGz) -> DataArrayType:
+    # Compressed images can't be memory-mapped, so if indexed_gzip is installed, seek
+    # into the compressed data using a persistent seek-point index. Otherwise fall back
+    # to nibabel's array proxy, which decompresses the image up to the end of the
+    # requested slice
+    gzip_file = open_indexed_gzip(nifti.fspath)
+    if gzip_file is None:
+        return nibabel.load(nifti.fspath).dataobj  # type: ignore[attr-defined]
+    try:
+        dataobj = _image_class(nifti).from_stream(gzip_file).dataobj  # type: ignore[arg-type]
+    except BaseException:
+        gzip_file.close()
+        raise
+    return IndexedGzipArrayProxy(dataobj, gzip_file)
+
+
+def _image_class(
+    nifti: Nifti,
+) -> ty.Type[ty.Union[nibabel.Nifti1Image, nibabel.Nifti2Image]]:
+    if nifti.metadata["sizeof_hdr"] == NIFTI2_HEADER_SIZE:
+        return nibabel.Nifti2Image
+    return nibabel.Nifti1Image
+
+
+class IndexedGzipArrayProxy:
+    """Lazy proxy to the voxel data of a gzipped NIfTI image read through an indexed
+    gzip file, which owns the file so that it is closed when the proxy is closed or
+    garbage collected
+
+    Parameters
+    ----------
+    dataobj : nibabel.arrayproxy.ArrayProxy
+        nibabel's proxy to the voxel data, reading from the indexed gzip file
+    gzip_file : IO[bytes]
+        the indexed gzip file
+    """
+
+    def __init__(self, dataobj: ty.Any, gzip_file: ty.IO[bytes]):
+        self.dataobj = dataobj
+        self.gzip_file = gzip_file
+
+    @property
+    def shape(self) -> ty.Tuple[int, ...]:
+        return tuple(self.dataobj.shape)
+
+    @property
+    def dtype(self) -> numpy.dtype[ty.Any]:
+        dtype: numpy.dtype[ty.Any] = numpy.dtype(self.dataobj.dtype)
+        return dtype
+
+    @property
+    def ndim(self) -> int:
+        return len(self.shape)
+
+    def __len__(self) -> int:
+        return self.shape[0]
+
+    def __repr__(self) -> str:
+        return f"{type(self).__name__}(shape={self.shape}, dtype={self.dtype})"
+
+    def __getitem__(self, key: ty.Any) -> DataArrayType:
+        return self.dataobj[key]
+
+    def __array__(
+        self,
+        dtype: ty.Optional["numpy.typing.DTypeLike"] = None,
+        copy: ty.Optional[bool] = None,
+    ) -> DataArrayType:
+        array = numpy.asarray(self.dataobj)
+        return array if dtype is None else array.astype(dtype, copy=False)
+
+    def close(self) -> None:
+        """Closes the indexed gzip file"""
+        self.gzip_file.close()
+
+    def __enter__(self) -> "IndexedGzipArrayProxy":
+        return self
+
+    def __exit__(self, *exc_info: ty.Any) -> None:
+        self.close()
+
+    def __del__(self) -> None:
+        gzip_file = getattr(self, "gzip_file", None)
+        if gzip_file is not None:
+            gzip_file.close()
+
+
+class NiftiArrayProxy:
+    """Lazy proxy to the voxel data of an uncompressed NIfTI image, which memory-maps
+    the voxel block of the file so that only the voxels that are accessed via slicing
+    are read from disk. Any scaling of the voxel values in the header is applied to the
+    returned slices.
+
+    Parameters
+    ----------
+    fspath : Path
+        path to the file containing the voxel block
+    shape : tuple[int, ...]
+        the shape of the image
+    dtype : numpy.dtype
+        the data type of the stored voxels (including the byte order)
+    offset : int
+        the offset of the voxel block from the start of the file
+    slope : float, optional
+        the slope that the stored values are scaled by, by default 1.0
+    inter : float, optional
+        the intercept added to the scaled values, by default 0.0
+    """
+
+    def __init__(
+        self,
+        fspath: Path,
+        shape: ty.Tuple[int, ...],
+        dtype: "numpy.typing.DTypeLike",
+        offset: int,
+        slope: float = 1.0,
+        inter: float = 0.0,
+    ):
+        self.fspath = fspath
+        self.shape = tuple(shape)
+        self.raw_dtype = numpy.dtype(dtype)
+        self.offset = offset
+        self.slope = slope
+        self.inter = inter
+        self._memmap: ty.Optional[numpy.memmap[ty.Any, ty.Any]] = None
+
+    @property
+    def is_scaled(self) -> bool:
+        return self.slope != 1.0 or self.inter != 0.0
+
+    @property
+    def dtype(self) -> numpy.dtype[ty.Any]:
+        # Use the same output types as nibabel for scaled values
+        dtype: numpy.dtype[ty.Any] = self[(slice(0, 0),) * self.ndim].dtype
+        return dtype
+
+    @property
+    def ndim(self) -> int:
+        return len(self.shape)
+
+    def __len__(self) -> int:
+        return self.shape[0]
+
+    def __repr__(self) -> str:
+        return (
+            f"{type(self).__name__}({str(self.fspath)!r}, shape={self.shape}, "
+            f"dtype={self.dtype})"
+        )
 
-@extra_implementation(MedicalImage.dims)
-def nifti_dims(nifti: Nifti) -> ty.Tuple[int, int, int]:
-    dim_array = [int(d) for d in nifti.metadata["dim"]]
-    for i in range(1, len(dim_array)):
-        if all(d == 1 for d in dim_array[i:]):
-            break  # Stop when the remaining dimensions are singletons
-    return tuple(dim_array[1:i])  # type: ignore[return-value]
+    @property
+    def memmap(self) -> "numpy.memmap[ty.Any, ty.Any]":
+        """The unscaled voxel block mapped into memory"""
+        if self._memmap is None:
+            self._memmap = numpy.memmap(
+                self.fspath,
+                dtype=self.raw_dtype,
+                mode="r",
+                offset=self.offset,
+                shape=self.shape,
+                order="F",
+            )
+        return self._memmap
+
+    def __getitem__(self, key: ty.Any) -> DataArrayType:
+        raw = numpy.array(self.memmap[key])
+        if self.is_scaled:
+            return apply_read_scaling(raw, self.slope, self.inter)
+        return raw
+
+    def __array__(
+        self,
+        dtype: ty.Optional["numpy.typing.DTypeLike"] = None,
+        copy: ty.Optional[bool] = None,
+    ) -> DataArrayType:
+        array = self[...]
+        return array if dtype is None else array.astype(dtype, copy=False)
 
 
 @extra_implementation(FileSet.generate_sample_data)
@@ -191,16 +396,40 @@ def dmri_nifti_x_generate_sample_data(
 def _get_t1w_nifti_gz_x(generator: SampleFileGenerator) -> ty.List[Path]:
     sample = generator.seed if generator.seed else "ds002014-01"
     fspaths = medimages4tests.mri.neuro.t1w.get_image(sample=sample)
-    return list(NiftiGzX(fspaths).copy(generator.dest_dir, mode=NiftiGzX.CopyMode.link_or_copy, new_stem=generator.fname_stem).fspaths)
+    return list(
+        NiftiGzX(fspaths)
+        .copy(
+            generator.dest_dir,
+            mode=NiftiGzX.CopyMode.link_or_copy,
+            new_stem=generator.fname_stem,
+        )
+        .fspaths
+    )
 
 
 def _get_fmri_nifti_gz_x(generator: SampleFileGenerator) -> ty.List[Path]:
     sample = generator.seed if generator.seed else "ds002014-01"
     fspaths = medimages4tests.mri.neuro.bold.get_image(sample=sample)
-    return list(NiftiGzX(fspaths).copy(generator.dest_dir, mode=NiftiGzX.CopyMode.link_or_copy, new_stem=generator.fname_stem).fspaths)
+    return list(
+        NiftiGzX(fspaths)
+        .copy(
+            generator.dest_dir,
+            mode=NiftiGzX.CopyMode.link_or_copy,
+            new_stem=generator.fname_stem,
+        )
+        .fspaths
+    )
 
 
 def _get_dmri_nifti_gz_x(generator: SampleFileGenerator) -> ty.List[Path]:
     sample = generator.seed if generator.seed else "ds004024-CON031"
     fspaths = medimages4tests.mri.neuro.dwi.get_image(sample=sample)
-    return list(NiftiGzX(fspaths).copy(generator.dest_dir, mode=NiftiGzX.CopyMode.link_or_copy, new_stem=generator.fname_stem).fspaths)
+    return list(
+        NiftiGzX(fspaths)
+        .copy(
+            generator.dest_dir,
+            mode=NiftiGzX.CopyMode.link_or_copy,
+            new_stem=generator.fname_stem,
+        )
+        .fspaths
+    )
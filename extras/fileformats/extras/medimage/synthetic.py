@@ -0,0 +1,322 @@
+"""Generation of synthetic DICOM series and NIfTI images of configurable size and
+layout, so that ingest, grouping and conversion can be load-tested at realistic scales
+without real (and potentially identifiable) data.
+
+The generated files are deterministic given the seed of the ``SampleFileGenerator``
+they are generated with, including when they are written in parallel.
+"""
+
+import typing as ty
+from pathlib import Path
+import nibabel
+import numpy
+import numpy.typing
+from pydicom.dataset import Dataset, FileMetaDataset
+from pydicom.sequence import Sequence
+from pydicom.uid import UID, generate_uid, RLELossless
+from fileformats.core import SampleFileGenerator
+from fileformats.medimage.dicom import (
+    worker_pool,
+    IMPLICIT_VR_LITTLE_ENDIAN,
+    EXPLICIT_VR_LITTLE_ENDIAN,
+    DEFLATED_EXPLICIT_VR_LITTLE_ENDIAN,
+)
+
+# SOP classes of the generated images for each modality, single-frame then multi-frame
+SOP_CLASSES = {
+    "MR": ("1.2.840.10008.5.1.4.1.1.4", "1.2.840.10008.5.1.4.1.1.4.1"),
+    "CT": ("1.2.840.10008.5.1.4.1.1.2", "1.2.840.10008.5.1.4.1.1.2.1"),
+    "PT": ("1.2.840.10008.5.1.4.1.1.128", "1.2.840.10008.5.1.4.1.1.130"),
+}
+# Secondary capture SOP classes used for other modalities
+DEFAULT_SOP_CLASSES = ("1.2.840.10008.5.1.4.1.1.7", "1.2.840.10008.5.1.4.1.1.7.3")
+
+SYNTHETIC_TRANSFER_SYNTAXES = (
+    IMPLICIT_VR_LITTLE_ENDIAN,
+    EXPLICIT_VR_LITTLE_ENDIAN,
+    DEFLATED_EXPLICIT_VR_LITTLE_ENDIAN,
+    RLELossless,
+)
+
+# Pixel values are drawn from [0, 2^BITS_STORED)
+BITS_STORED = 12
+
+
+class _SeriesSpec(ty.NamedTuple):
+    series_dir: Path
+    study_uid: str
+    series_number: int
+    seed: int
+    num_slices: int
+    matrix_size: ty.Tuple[int, int]
+    modality: str
+    transfer_syntax: str
+    multiframe: bool
+
+
+class _NiftiSpec(ty.NamedTuple):
+    fspath: Path
+    seed: int
+    shape: ty.Tuple[int, ...]
+    voxel_sizes: ty.Tuple[float, ...]
+    dtype: str
+
+
+def generate_dicom_series(
+    generator: SampleFileGenerator,
+    num_series: int = 1,
+    num_slices: int = 16,
+    matrix_size: ty.Tuple[int, int] = (64, 64),
+    modality: str = "MR",
+    transfer_syntax: str = EXPLICIT_VR_LITTLE_ENDIAN,
+    multiframe: bool = False,
+    max_workers: int = 1,
+    pool: str = "process",
+) -> ty.List[ty.List[Path]]:
+    """Generates synthetic DICOM series of random pixel data, each in its own
+    sub-directory of the generator's destination directory. All series belong to the
+    same study and are numbered from 1.
+
+    Parameters
+    ----------
+    generator : SampleFileGenerator
+        the generator providing the destination directory, file-name stem and seed
+    num_series : int, optional
+        the number of series to generate, by default 1
+    num_slices : int, optional
+        the number of slices in each series, by default 16
+    matrix_size : tuple[int, int], optional
+        the number of rows and columns of each slice, by default (64, 64)
+    modality : str, optional
+        the DICOM modality code of the series, by default "MR"
+    transfer_syntax : str, optional
+        the UID of the transfer syntax to encode the files with, one of
+        ``SYNTHETIC_TRANSFER_SYNTAXES``, by default explicit VR little endian
+    multiframe : bool, optional
+        whether to store each series in a single (enhanced) multi-frame file instead of
+        a file per slice, by default False
+    max_workers : int, optional
+        the number of workers to write the series across in parallel, by default 1,
+        in which case they are written in the current process
+    pool : str, optional
+        the type of worker pool to use if max_workers > 1, "process" or "thread", by
+        default "process"
+
+    Returns
+    -------
+    list[list[Path]]
+        the paths to the files of each series
+
+    Raises
+    ------
+    ValueError
+        if the transfer syntax isn't supported
+    """
+    if transfer_syntax not in SYNTHETIC_TRANSFER_SYNTAXES:
+        raise ValueError(
+            f"Unsupported transfer syntax {transfer_syntax!r}, should be one of "
+            f"{SYNTHETIC_TRANSFER_SYNTAXES}"
+        )
+    study_uid = generate_uid(entropy_srcs=[str(generator.seed), generator.fname_stem])
+    # Draw the seeds of all the series up front so the output doesn't depend on the
+    # order the series are written in
+    specs = [
+        _SeriesSpec(
+            series_dir=generator.dest_dir / f"{generator.fname_stem}-{i}",
+            study_uid=study_uid,
+            series_number=i,
+            seed=generator.rng.getrandbits(64),
+            num_slices=num_slices,
+            matrix_size=(int(matrix_size[0]), int(matrix_size[1])),
+            modality=modality,
+            transfer_syntax=transfer_syntax,
+            multiframe=multiframe,
+        )
+        for i in range(1, num_series + 1)
+    ]
+    return _write_all(_write_series, specs, max_workers, pool)
+
+
+def generate_nifti_images(
+    generator: SampleFileGenerator,
+    num_images: int = 1,
+    shape: ty.Tuple[int, ...] = (64, 64, 16),
+    voxel_sizes: ty.Optional[ty.Tuple[float, ...]] = None,
+    dtype: str = "int16",
+    compressed: bool = True,
+    max_workers: int = 1,
+    pool: str = "process",
+) -> ty.List[Path]:
+    """Generates synthetic NIfTI-1 images of random voxel data in the generator's
+    destination directory
+
+    Parameters
+    ----------
+    generator : SampleFileGenerator
+        the generator providing the destination directory, file-name stem and seed
+    num_images : int, optional
+        the number of images to generate, by default 1
+    shape : tuple[int, ...], optional
+        the shape of each image, by default (64, 64, 16)
+    voxel_sizes : tuple[float, ...], optional
+        the sizes of the voxels along each axis, by default 1.0 along each
+    dtype : str, optional
+        the data type of the voxels, by default "int16"
+    compressed : bool, optional
+        whether to gzip the images, by default True
+    max_workers : int, optional
+        the number of workers to write the images across in parallel, by default 1,
+        in which case they are written in the current process
+    pool : str, optional
+        the type of worker pool to use if max_workers > 1, "process" or "thread", by
+        default "process"
+
+    Returns
+    -------
+    list[Path]
+        the paths to the images
+    """
+    ext = ".nii.gz" if compressed else ".nii"
+    specs = [
+        _NiftiSpec(
+            fspath=generator.dest_dir / f"{generator.fname_stem}-{i}{ext}",
+            seed=generator.rng.getrandbits(64),
+            shape=tuple(shape),
+            voxel_sizes=tuple(voxel_sizes) if voxel_sizes else (1.0,) * len(shape),
+            dtype=dtype,
+        )
+        for i in range(1, num_images + 1)
+    ]
+    return _write_all(_write_nifti, specs, max_workers, pool)
+
+
+T = ty.TypeVar("T")
+S = ty.TypeVar("S")
+
+
+def _write_all(
+    write: ty.Callable[[S], T], specs: ty.List[S], max_workers: int, pool: str
+) -> ty.List[T]:
+    if max_workers == 1:
+        return [write(s) for s in specs]
+    with worker_pool(pool, max_workers) as executor:
+        return list(executor.map(write, specs))
+
+
+def _write_series(spec: _SeriesSpec) -> ty.List[Path]:
+    """Writes the files of a synthetic series"""
+    rng = numpy.random.default_rng(spec.seed)
+    rows, columns = spec.matrix_size
+    pixels = rng.integers(
+        0, 2**BITS_STORED, size=(spec.num_slices, rows, columns), dtype=numpy.uint16
+    )
+    series_uid = generate_uid(entropy_srcs=[spec.study_uid, str(spec.series_number)])
+    spec.series_dir.mkdir(parents=True, exist_ok=True)
+    if spec.multiframe:
+        dcm = _image_dataset(spec, series_uid, 1)
+        dcm.NumberOfFrames = spec.num_slices
+        dcm.SharedFunctionalGroupsSequence = Sequence(
+            [
+                _item(
+                    PixelMeasuresSequence=Sequence(
+                        [_item(PixelSpacing=[1.0, 1.0], SliceThickness=1.0)]
+                    ),
+                    PlaneOrientationSequence=Sequence(
+                        [_item(ImageOrientationPatient=[1, 0, 0, 0, 1, 0])]
+                    ),
+                )
+            ]
+        )
+        dcm.PerFrameFunctionalGroupsSequence = Sequence(
+            [
+                _item(
+                    PlanePositionSequence=Sequence(
+                        [_item(ImagePositionPatient=[0.0, 0.0, float(i)])]
+                    ),
+                    FrameContentSequence=Sequence([_item(InStackPositionNumber=i + 1)]),
+                )
+                for i in range(spec.num_slices)
+            ]
+        )
+        fspath = spec.series_dir / "000001.dcm"
+        _save(dcm, pixels, spec.transfer_syntax, fspath)
+        return [fspath]
+    fspaths = []
+    for i in range(spec.num_slices):
+        dcm = _image_dataset(spec, series_uid, i + 1)
+        dcm.ImagePositionPatient = [0.0, 0.0, float(i)]
+        dcm.ImageOrientationPatient = [1, 0, 0, 0, 1, 0]
+        dcm.SliceLocation = float(i)
+        dcm.PixelSpacing = [1.0, 1.0]
+        dcm.SliceThickness = 1.0
+        fspath = spec.series_dir / f"{i + 1:06d}.dcm"
+        _save(dcm, pixels[i], spec.transfer_syntax, fspath)
+        fspaths.append(fspath)
+    return fspaths
+
+
+def _item(**elements: ty.Any) -> Dataset:
+    """Creates a sequence item containing the given elements, keyed by keyword"""
+    item = Dataset()
+    for keyword, value in elements.items():
+        setattr(item, keyword, value)
+    return item
+
+
+def _image_dataset(spec: _SeriesSpec, series_uid: str, instance_number: int) -> Dataset:
+    """Creates the elements of a synthetic image that aren't specific to its layout"""
+    single_frame, multi_frame = SOP_CLASSES.get(spec.modality, DEFAULT_SOP_CLASSES)
+    dcm = Dataset()
+    dcm.SOPClassUID = multi_frame if spec.multiframe else single_frame
+    dcm.SOPInstanceUID = generate_uid(entropy_srcs=[series_uid, str(instance_number)])
+    dcm.StudyDate = "20000101"
+    dcm.Modality = spec.modality
+    dcm.PatientName = "Synthetic^Subject"
+    dcm.PatientID = "SYNTHETIC"
+    dcm.StudyInstanceUID = spec.study_uid
+    dcm.SeriesInstanceUID = series_uid
+    dcm.StudyID = "1"
+    dcm.SeriesNumber = spec.series_number
+    dcm.InstanceNumber = instance_number
+    dcm.FrameOfReferenceUID = generate_uid(entropy_srcs=[spec.study_uid, "frame"])
+    dcm.SamplesPerPixel = 1
+    dcm.PhotometricInterpretation = "MONOCHROME2"
+    dcm.Rows, dcm.Columns = spec.matrix_size
+    dcm.BitsAllocated = 16
+    dcm.BitsStored = BITS_STORED
+    dcm.HighBit = BITS_STORED - 1
+    dcm.PixelRepresentation = 0
+    return dcm
+
+
+def _save(
+    dcm: Dataset,
+    pixels: numpy.typing.NDArray[ty.Any],
+    transfer_syntax: str,
+    fspath: Path,
+) -> None:
+    dcm.file_meta = FileMetaDataset()
+    dcm.file_meta.MediaStorageSOPClassUID = dcm.SOPClassUID
+    dcm.file_meta.MediaStorageSOPInstanceUID = dcm.SOPInstanceUID
+    if transfer_syntax == RLELossless:
+        dcm.file_meta.TransferSyntaxUID = UID(EXPLICIT_VR_LITTLE_ENDIAN)
+        dcm.compress(RLELossless, pixels, generate_instance_uid=False)
+    else:
+        dcm.file_meta.TransferSyntaxUID = UID(transfer_syntax)
+        dcm.PixelData = pixels.tobytes()
+        dcm["PixelData"].VR = "OW"
+    dcm.save_as(fspath, enforce_file_format=True)
+
+
+def _write_nifti(spec: _NiftiSpec) -> Path:
+    """Writes a synthetic NIfTI image"""
+    rng = numpy.random.default_rng(spec.seed)
+    data = rng.integers(0, 2**BITS_STORED, size=spec.shape).astype(spec.dtype)
+    affine = numpy.eye(4)
+    spatial = spec.voxel_sizes[:3]
+    affine[range(len(spatial)), range(len(spatial))] = spatial
+    image = nibabel.Nifti1Image(data, affine)  # type: ignore[no-untyped-call]
+    image.header.set_zooms(spec.voxel_sizes)  # type: ignore[no-untyped-call]
+    image.header.set_xyzt_units("mm", "sec")  # type: ignore[no-untyped-call]
+    nibabel.save(image, spec.fspath)
+    return spec.fspath
@@ -0,0 +1,61 @@
+import os
+import shutil
+from concurrent.futures import ThreadPoolExecutor
+import pytest
+from fileformats.medimage import NiftiGzX
+from fileformats.medimage.dicom import DicomDir
+from fileformats.extras.medimage.batch import (
+    convert_dicom_collections,
+    read_manifest,
+)
+
+
+def test_batch_convert_resume(dummy_t1w_dicom: DicomDir, tmp_path) -> None:
+
+    collections = []
+    for name in ("session1", "session2"):
+        dicom_dir = tmp_path / name
+        shutil.copytree(dummy_t1w_dicom.fspath, dicom_dir)
+        collections.append(DicomDir(dicom_dir))
+    out_dir = tmp_path / "out"
+
+    results = list(convert_dicom_collections(collections, out_dir, max_workers=2))
+    assert [r.collection for r in results] == collections
+    assert not any(r.skipped for r in results)
+    for result in results:
+        assert isinstance(result.out_file, NiftiGzX)
+        assert result.out_file.fspath.parent == out_dir
+        assert result.out_file.metadata["json"]["EchoTime"] == 0.00207
+    assert len(read_manifest(out_dir / "conversions.jsonl")) == 2
+
+    # Unchanged collections are skipped when the batch is rerun
+    rerun = list(convert_dicom_collections(collections, out_dir))
+    assert all(r.skipped for r in rerun)
+    assert [r.out_file for r in rerun] == [r.out_file for r in results]
+
+    # Only the modified collection is converted again
+    modified = next((tmp_path / "session2").iterdir())
+    stat = modified.stat()
+    os.utime(modified, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+    rerun = list(convert_dicom_collections(collections, out_dir))
+    assert [r.skipped for r in rerun] == [True, False]
+    assert rerun[1].out_file == results[1].out_file
+
+    # Collections are converted again if the arguments to the converter change
+    rerun = list(convert_dicom_collections(collections, out_dir, to_4d=False))
+    assert not any(r.skipped for r in rerun)
+    rerun = list(convert_dicom_collections(collections, out_dir, to_4d=False))
+    assert all(r.skipped for r in rerun)
+
+
+def test_batch_convert_thread_pool(tmp_path) -> None:
+    # Converters change the working directory, so can't run concurrently in threads
+    with pytest.raises(ValueError, match="single worker"):
+        next(convert_dicom_collections([], tmp_path, pool="thread", max_workers=2))
+    with ThreadPoolExecutor(2) as executor:
+        with pytest.raises(ValueError, match="single worker"):
+            next(convert_dicom_collections([], tmp_path, pool=executor))
+    assert (
+        list(convert_dicom_collections([], tmp_path, pool="thread", max_workers=1))
+        == []
+    )
@@ -0,0 +1,64 @@
+import os
+import json
+import shutil
+from fileformats.generic import File
+from fileformats.medimage import NiftiGzX, NiftiX
+from fileformats.medimage.dicom import DicomDir
+from fileformats.extras.medimage.conversion_cache import (
+    ConversionCache,
+    conversion_key,
+    CONVERSION_CACHE_ENV_VAR,
+    MANIFEST_NAME,
+)
+
+
+def test_conversion_cache_lru(tmp_path) -> None:
+
+    cache = ConversionCache(tmp_path / "cache", max_size=2500)
+    filesets = []
+    for i in range(3):
+        fspath = tmp_path / f"file{i}.txt"
+        fspath.write_bytes(bytes([i]) * 1000)
+        filesets.append(File(fspath))
+    keys = [conversion_key("test", f, {"option": 1}) for f in filesets]
+    assert len(set(keys)) == 3
+    assert conversion_key("test", filesets[0], {"option": 2}) != keys[0]
+
+    cache.put(keys[0], filesets[0])
+    cache.put(keys[1], filesets[1])
+    os.utime(cache._entry_dir(keys[0]), (1_000_000_000, 1_000_000_000))
+    os.utime(cache._entry_dir(keys[1]), (1_000_000_001, 1_000_000_001))
+    # Accessing the first entry makes the second the least recently used
+    dest_dir = tmp_path / "dest"
+    dest_dir.mkdir()
+    restored = cache.get(keys[0], dest_dir)
+    assert isinstance(restored, File)
+    assert restored.fspath.read_bytes() == filesets[0].fspath.read_bytes()
+    cache.put(keys[2], filesets[2])
+    assert keys[0] in cache
+    assert keys[1] not in cache
+    assert keys[2] in cache
+
+
+def test_conversion_cache_dcm2niix(
+    dummy_t1w_dicom: DicomDir, tmp_path, monkeypatch
+) -> None:
+
+    monkeypatch.setenv(CONVERSION_CACHE_ENV_VAR, str(tmp_path / "cache"))
+    converted = NiftiGzX.convert(dummy_t1w_dicom)
+    (cached_json,) = (
+        p for p in (tmp_path / "cache").glob("??/*/*.json") if p.name != MANIFEST_NAME
+    )
+    side_car = json.loads(cached_json.read_text())
+    assert side_car == converted.metadata["json"]
+    # Mark the cached side-car to check that it is restored instead of converting again
+    cached_json.write_text(json.dumps({**side_car, "Cached": True}))
+    # Copies of the same files in another location share the cached conversion
+    copied = tmp_path / "copy"
+    shutil.copytree(dummy_t1w_dicom.fspath, copied)
+    restored = NiftiGzX.convert(DicomDir(copied))
+    assert restored.metadata["json"]["Cached"]
+    assert restored.metadata["json"]["EchoTime"] == 0.00207
+    # Different options are cached separately
+    uncompressed = NiftiX.convert(DicomDir(copied))
+    assert "Cached" not in uncompressed.metadata["json"]
@@ -1,7 +1,21 @@
+import copy
+import json
 import pytest
+import pydicom
+from pydicom.dataset import Dataset, FileMetaDataset
+from pydicom.uid import (
+    ExplicitVRLittleEndian,
+    DeflatedExplicitVRLittleEndian,
+    generate_uid,
+)
 from fileformats.core.exceptions import FileFormatsExtrasError
 from fileformats.medimage import DicomImage, DicomDir, DicomSeries, Nifti1
 
+from fileformats.extras.medimage.dicom import rewrite_dicom_header
+from fileformats.extras.medimage.deidentification import (
+    DeidentificationProfile,
+    BASIC_PROFILE,
+)
 from medimages4tests.dummy.dicom.mri.t1w.siemens.skyra.syngo_d13c import (
     get_image as get_dicom_image,
 )
@@ -35,3 +49,143 @@ def test_nifti_deidentify():
     nifti = Nifti1.sample()
     with pytest.raises(FileFormatsExtrasError):
         nifti.deidentify()
+
+
+@pytest.mark.parametrize("pool", ["thread", "process"])
+def test_deidentify_dicom_series_log(tmp_path, pool):
+    dicom_dir = get_dicom_image(first_name="John", last_name="Doe")
+    series = DicomSeries(p for p in dicom_dir.iterdir() if p.suffix == ".dcm")
+    reid_log = tmp_path / "reid.jsonl"
+
+    deidentified, reid = series.deidentify(
+        out_dir=tmp_path / "out", max_workers=2, pool=pool, reid_log=reid_log
+    )
+
+    assert not reid
+    assert str(deidentified.metadata["PatientName"]) == "Anonymous^Anonymous"
+    entries = [json.loads(line) for line in reid_log.read_text().splitlines()]
+    assert sorted(e["fspath"] for e in entries) == sorted(
+        str(p) for p in deidentified.fspaths
+    )
+    assert all(e["PatientName"] == "Doe^John" for e in entries)
+    assert all(e["InstitutionName"] == "An institute" for e in entries)
+
+
+@pytest.mark.parametrize(
+    "transfer_syntax", [ExplicitVRLittleEndian, DeflatedExplicitVRLittleEndian]
+)
+def test_rewrite_dicom_header(tmp_path, transfer_syntax):
+    ds = Dataset()
+    ds.file_meta = FileMetaDataset()
+    ds.file_meta.TransferSyntaxUID = transfer_syntax
+    ds.file_meta.MediaStorageSOPClassUID = "1.2.840.10008.5.1.4.1.1.4"
+    ds.file_meta.MediaStorageSOPInstanceUID = generate_uid()
+    ds.SOPInstanceUID = ds.file_meta.MediaStorageSOPInstanceUID
+    ds.PatientName = "Doe^John"
+    ds.Rows = ds.Columns = 4
+    ds.BitsAllocated = 16
+    ds.PixelData = bytes(range(32))
+    ds.DataSetTrailingPadding = b"\0" * 8
+    ds.preamble = b"\0" * 128
+    src = tmp_path / "src.dcm"
+    ds.save_as(src, enforce_file_format=True)
+
+    def modify(dcm):
+        assert (
+            "PixelData" not in dcm or transfer_syntax == DeflatedExplicitVRLittleEndian
+        )
+        original = str(dcm.PatientName)
+        dcm.PatientName = "Anonymous^Anonymous"
+        return original
+
+    dest = tmp_path / "dest.dcm"
+    assert rewrite_dicom_header(src, dest, modify) == "Doe^John"
+    rewritten = pydicom.dcmread(dest)
+    assert rewritten.PatientName == "Anonymous^Anonymous"
+    assert rewritten.PixelData == ds.PixelData
+    assert rewritten.DataSetTrailingPadding == ds.DataSetTrailingPadding
+    assert rewritten.file_meta.TransferSyntaxUID == transfer_syntax
+
+
+def test_deidentification_profile():
+    ds = Dataset()
+    ds.PatientName = "Doe^John"
+    ds.PatientID = "12345"
+    ds.StudyInstanceUID = "1.2.3.4"
+    ds.OperatorsName = "Smith^Jane"
+    ds.InstitutionName = "An institute"
+    ds.Modality = "MR"
+    ds.add_new(0x60000022, "LO", "An overlay")
+    ds.add_new(0x60003000, "OW", b"\0\0")
+    ds.add_new(0x00090010, "LO", "A private creator")
+    ds.add_new(0x00091001, "LO", "A private value")
+    item = Dataset()
+    item.PatientName = "Doe^Jane"
+    ds.ReferencedImageSequence = [item]
+    private_item = Dataset()
+    private_item.OperatorsName = "Smith^John"
+    ds.add_new(0x00111010, "LO", "Another private creator")
+    ds.add_new(0x00111001, "SQ", [private_item])
+    profile = DeidentificationProfile(
+        {
+            "(0010,0020)": "remove",
+            "0020,000D": "uid",
+            "60xx,xxxx": "remove",
+            "6000,0022": "keep",
+            0x00080080: "dummy",
+        },
+        private="remove",
+        vrs={"PN": "empty"},
+    )
+    keep_private = DeidentificationProfile(
+        profile.actions, private="keep", vrs=profile.vrs
+    )
+
+    reid_kept = keep_private.apply(copy.deepcopy(ds))
+    reid = profile.apply(ds)
+
+    assert "PatientID" not in ds
+    assert ds.PatientName == ""
+    assert ds.OperatorsName == ""
+    assert ds.ReferencedImageSequence[0].PatientName == ""
+    assert ds.InstitutionName == "ANONYMOUS"
+    assert ds.Modality == "MR"
+    assert ds[0x60000022].value == "An overlay"
+    assert 0x60003000 not in ds
+    assert 0x00090010 not in ds and 0x00091001 not in ds
+    assert ds.StudyInstanceUID != "1.2.3.4"
+    uid = ds.StudyInstanceUID
+    other = Dataset()
+    other.StudyInstanceUID = "1.2.3.4"
+    profile.apply(other)
+    assert other.StudyInstanceUID == uid
+    assert reid["PatientID"] == "12345"
+    assert reid["PatientName"] == "Doe^John"
+    assert reid["ReferencedImageSequence[0].PatientName"] == "Doe^Jane"
+    assert reid["6000,3000"] == b"\0\0"
+    # Private sequences that are kept are deidentified too
+    assert reid_kept["0011,1001[0].OperatorsName"] == "Smith^John"
+
+
+def test_deidentify_dicom_basic_profile(tmp_path):
+    dicom_dir = get_dicom_image(first_name="John", last_name="Doe")
+    dicom = DicomImage(next(p for p in dicom_dir.iterdir() if p.suffix == ".dcm"))
+    original = dicom.load()
+
+    deidentified, reid = dicom.deidentify(spec=BASIC_PROFILE, out_dir=tmp_path)
+
+    dcm = deidentified.load()
+    assert dcm.PatientName == ""
+    assert "InstitutionName" not in dcm
+    assert dcm.SOPInstanceUID != original.SOPInstanceUID
+    assert dcm.file_meta.MediaStorageSOPInstanceUID == dcm.SOPInstanceUID
+    assert not any(elem.tag.is_private for elem in dcm)
+    assert dcm.PixelData == original.PixelData
+    assert reid["PatientName"] == "Doe^John"
+
+
+def test_deidentification_profile_invalid():
+    with pytest.raises(ValueError, match="Invalid tag pattern"):
+        DeidentificationProfile({"0010,00y0": "remove"})
+    with pytest.raises(ValueError, match="Unrecognised deidentification action"):
+        DeidentificationProfile({"0010,0010": "scramble"})
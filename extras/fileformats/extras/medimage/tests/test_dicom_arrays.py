@@ -0,0 +1,142 @@
+import numpy
+import pydicom
+import pytest
+from pydicom.dataset import Dataset
+from pydicom.sequence import Sequence
+from pydicom.uid import RLELossless
+from fileformats.core import SampleFileGenerator
+from fileformats.core.exceptions import FormatMismatchError
+from fileformats.medimage import DicomDir, DicomSeries, DicomMultiframe
+from fileformats.medimage.dicom import EXPLICIT_VR_LITTLE_ENDIAN, dicom_sort_key
+from fileformats.medimage.instrumentation import record_io
+from fileformats.extras.medimage.synthetic import generate_dicom_series
+
+
+def test_dicom_read_array(dummy_t1w_dicom: DicomDir) -> None:
+    dcms = [pydicom.dcmread(p) for p in dummy_t1w_dicom.fspath.iterdir()]
+    normal = numpy.cross(
+        dcms[0].ImageOrientationPatient[:3], dcms[0].ImageOrientationPatient[3:]
+    )
+    dcms.sort(key=lambda d: numpy.dot(d.ImagePositionPatient, normal))
+    expected = numpy.asarray([d.pixel_array for d in dcms])
+    # A new instance so the cache of its contents isn't already populated
+    dicom_dir = DicomDir(dummy_t1w_dicom.fspath)
+
+    array = dicom_dir.read_array()
+
+    assert array.shape == expected.shape
+    assert array.dtype == expected.dtype
+    assert numpy.array_equal(array, expected)
+    # Reading the array doesn't populate the cache of the contents of the directory
+    # with the unsorted files
+    assert [d.fspath for d in dicom_dir.contents] == [
+        d.fspath for d in sorted(dicom_dir.contents, key=dicom_sort_key)
+    ]
+
+
+def test_dicom_read_array_single_frame_count(tmp_path, dummy_t1w_dicom: DicomDir):
+    # Single-frame images with NumberOfFrames=1 are ordered by their positions, not
+    # their instance numbers, which are reversed here
+    dcms = [pydicom.dcmread(p) for p in sorted(dummy_t1w_dicom.fspath.iterdir())[:4]]
+    normal = numpy.cross(
+        dcms[0].ImageOrientationPatient[:3], dcms[0].ImageOrientationPatient[3:]
+    )
+    dcms.sort(key=lambda d: numpy.dot(d.ImagePositionPatient, normal))
+    fspaths = []
+    for i, dcm in enumerate(dcms):
+        dcm.NumberOfFrames = 1
+        dcm.InstanceNumber = len(dcms) - i
+        fspaths.append(tmp_path / f"{i}.dcm")
+        dcm.save_as(fspaths[-1])
+    expected = numpy.asarray([d.pixel_array for d in dcms])
+
+    series = DicomSeries(fspaths)
+
+    assert numpy.array_equal(series.read_array(), expected)
+    assert series.vox_sizes()[2] == pytest.approx(
+        abs(
+            numpy.dot(dcms[1].ImagePositionPatient, normal)
+            - numpy.dot(dcms[0].ImagePositionPatient, normal)
+        )
+    )
+
+
+def test_dicom_read_array_rescaled(tmp_path, dummy_t1w_dicom: DicomDir) -> None:
+    fspaths = []
+    for i, fspath in enumerate(sorted(dummy_t1w_dicom.fspath.iterdir())[:4]):
+        dcm = pydicom.dcmread(fspath)
+        dcm.RescaleSlope = 2
+        dcm.RescaleIntercept = -1024 + i
+        fspaths.append(tmp_path / fspath.name)
+        dcm.save_as(fspaths[-1])
+    series = DicomSeries(fspaths)
+
+    array = series.read_array()
+
+    assert array.dtype == numpy.float32
+    for dcm_path in fspaths:
+        dcm = pydicom.dcmread(dcm_path)
+        expected = dcm.pixel_array * 2.0 + float(dcm.RescaleIntercept)
+        assert any(numpy.array_equal(a, expected) for a in array)
+
+
+def test_dicom_read_array_instrumented(dummy_t1w_dicom: DicomDir) -> None:
+    num_files = len(list(dummy_t1w_dicom.fspath.iterdir()))
+
+    with record_io() as recording:
+        dummy_t1w_dicom.read_array()
+
+    counters = recording.as_dict()["counters"]
+    assert counters["dicom.read_array"] == 1
+    assert counters["dicom.read_header"] == num_files
+    assert counters["pydicom.decode"] == num_files
+    assert counters["file.open"] == 2 * num_files
+    assert counters["file.bytes_read"] >= sum(
+        p.stat().st_size for p in dummy_t1w_dicom.fspath.iterdir()
+    )
+
+
+@pytest.mark.parametrize("transfer_syntax", [EXPLICIT_VR_LITTLE_ENDIAN, RLELossless])
+def test_dicom_multiframe_read_frames(tmp_path, transfer_syntax: str) -> None:
+    generator = SampleFileGenerator(tmp_path, seed=1)
+    ((fspath,),) = generate_dicom_series(
+        generator,
+        num_slices=6,
+        matrix_size=(8, 12),
+        multiframe=True,
+        transfer_syntax=transfer_syntax,
+    )
+    # Store the frames in the reverse order of their positions and rescale them
+    dcm = pydicom.dcmread(fspath)
+    for i, frame in enumerate(dcm.PerFrameFunctionalGroupsSequence):
+        frame.PlanePositionSequence[0].ImagePositionPatient = [0.0, 0.0, float(-i)]
+    transformation = Dataset()
+    transformation.RescaleSlope = 2
+    transformation.RescaleIntercept = -10
+    dcm.SharedFunctionalGroupsSequence[0].PixelValueTransformationSequence = Sequence(
+        [transformation]
+    )
+    dcm.save_as(fspath)
+    expected = dcm.pixel_array[::-1] * 2.0 - 10
+
+    image = DicomMultiframe(fspath)
+    assert image.num_frames == 6
+    assert len(image.frame_index) == 6
+    assert image.dims() == (8, 12, 6)
+    assert image.vox_sizes() == (1.0, 1.0, 1.0)
+    with record_io(keep_spans=True) as recording:
+        frames = image.data_proxy[1:3, 2]
+    assert numpy.array_equal(frames, expected[1:3, 2])
+    # Only the requested frames are decoded and the frame index isn't parsed again
+    (span,) = [s for s in recording.as_spans() if s["name"] == "dicom.read_frames"]
+    assert span["attributes"]["num_frames"] == "2"
+    assert "dicom.read_frame_index" not in recording.as_dict()["counters"]
+    assert numpy.array_equal(image.read_array(), expected)
+
+    dicom_dir = DicomDir(fspath.parent)
+    assert dicom_dir.dims() == (8, 12, 6)
+    assert numpy.array_equal(dicom_dir.read_array(), expected)
+
+    ((single_frame, *_),) = generate_dicom_series(generator, num_slices=2)
+    with pytest.raises(FormatMismatchError):
+        DicomMultiframe(single_frame)
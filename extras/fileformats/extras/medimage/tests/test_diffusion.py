@@ -0,0 +1,39 @@
+import os
+import numpy as np
+import pytest
+from fileformats.medimage import Bval, Bvec
+
+
+def write_b_table(fspath, bvecs, bvals, mtime=1_000_000_000):
+    np.savetxt(fspath, np.asarray(bvecs, dtype=float).T)
+    bval_fspath = fspath.with_suffix(".bval")
+    bval_fspath.write_text(" ".join(str(b) for b in bvals) + "\n")
+    # Backdate the files so that cached values can be reused straight away
+    for path in (fspath, bval_fspath):
+        os.utime(path, ns=(mtime, mtime))
+
+
+def test_bvec_encodings(tmp_path):
+    bvecs = [[0, 0, 0], [1, 0, 0], [0, 1, 0], [0, 0, 1], [0.6, 0.8, 0]]
+    bvals = [5, 1000, 995, 2000, 2010]
+    fspath = tmp_path / "dwi.bvec"
+    write_b_table(fspath, bvecs, bvals)
+    bvec = Bvec(fspath)
+    assert bvec.num_encodings == 5
+    assert np.array_equal(bvec.directions, bvecs)
+    assert np.array_equal(bvec.b_values, bvals)
+    assert np.array_equal(Bval(fspath.with_suffix(".bval")).read_array(), bvals)
+    assert np.allclose(bvec.shells, [5, 997.5, 2005])
+    assert list(bvec.shell_indices) == [0, 1, 1, 2, 2]
+    # Cached until the files are modified
+    assert bvec.encodings_array is bvec.encodings_array
+    write_b_table(fspath, bvecs[:2], [0, 3000], mtime=2_000_000_000)
+    assert np.array_equal(bvec.b_values, [0, 3000])
+    assert np.array_equal(bvec.shells, [0, 3000])
+
+
+def test_bvec_mismatch(tmp_path):
+    fspath = tmp_path / "dwi.bvec"
+    write_b_table(fspath, [[1, 0, 0], [0, 1, 0]], [1000, 1000, 1000])
+    with pytest.raises(ValueError, match="does not match the number of directions"):
+        Bvec(fspath).encodings_array
@@ -0,0 +1,54 @@
+import numpy
+import pytest
+from fileformats.core import SampleFileGenerator
+from fileformats.medimage import DicomSeries
+from fileformats.extras.medimage.geometry import SliceGeometry, read_slice_geometry
+from fileformats.extras.medimage.synthetic import generate_dicom_series
+
+AXIAL = [1.0, 0.0, 0.0, 0.0, 1.0, 0.0]
+CORONAL = [1.0, 0.0, 0.0, 0.0, 0.0, -1.0]
+
+
+def test_slice_geometry_order_and_spacing() -> None:
+    # Slices 2 mm apart in a shuffled order, with a missing slice and a repeated one
+    locations = numpy.array([6.0, 0.0, 10.0, 2.0, 4.0, 2.0])
+    positions = numpy.stack([numpy.zeros(6), numpy.zeros(6), locations], axis=1)
+    geometry = SliceGeometry(
+        positions, [AXIAL] * 6, pixel_spacing=(0.5, 0.75), slice_thickness=3.0
+    )
+    assert geometry.num_stacks == 1
+    assert locations[geometry.order].tolist() == [0.0, 2.0, 2.0, 4.0, 6.0, 10.0]
+    assert geometry.duplicates.tolist() == [5]
+    assert geometry.spacing == 2.0
+    assert geometry.vox_sizes == (0.5, 0.75, 2.0)
+    assert not geometry.is_regular
+    assert geometry.num_missing == 1
+    assert geometry.tilt == pytest.approx(0.0)
+    numpy.testing.assert_allclose(
+        geometry.affine(),
+        [[-0.75, 0, 0, 0], [0, -0.5, 0, 0], [0, 0, 2, 0], [0, 0, 0, 1]],
+    )
+    numpy.testing.assert_allclose(geometry.affine(ras=False)[:3, 3], [0, 0, 0])
+
+
+def test_slice_geometry_tilt_and_stacks() -> None:
+    # A stack tilted by 45 degrees along y, followed by a coronal localiser
+    positions = [[0.0, float(i), float(i)] for i in range(4)] + [[0.0, 0.0, 0.0]]
+    geometry = SliceGeometry(positions, [AXIAL] * 4 + [CORONAL])
+    assert geometry.num_stacks == 2
+    assert geometry.stacks.tolist() == [0, 0, 0, 0, 1]
+    assert geometry.order[-1] == 4
+    assert geometry.spacing == pytest.approx(1.0)
+    assert geometry.tilt == pytest.approx(45.0)
+    numpy.testing.assert_allclose(geometry.slice_vector, [0.0, 1.0, 1.0])
+
+
+def test_read_slice_geometry(tmp_path) -> None:
+    (fspaths,) = generate_dicom_series(
+        SampleFileGenerator(tmp_path, seed=1), num_slices=5, matrix_size=(8, 8)
+    )
+    geometry = read_slice_geometry(fspaths[::-1])
+    assert geometry is not None
+    assert geometry.order.tolist() == [4, 3, 2, 1, 0]
+    assert geometry.vox_sizes == (1.0, 1.0, 1.0)
+    assert DicomSeries(fspaths).vox_sizes() == (1.0, 1.0, 1.0)
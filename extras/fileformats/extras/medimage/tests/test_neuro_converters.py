@@ -1,3 +1,5 @@
+import numpy as np
+import nibabel
 import pytest
 from fileformats.medimage import (
     NiftiGzX,
@@ -7,6 +9,7 @@ from fileformats.medimage import (
 from logging import getLogger
 
 from fileformats.medimage.dicom import DicomDir
+from fileformats.extras.medimage.dicom_to_nifti import supports_native_conversion
 
 
 logger = getLogger("fileformats")
@@ -18,6 +21,28 @@ def test_dicom_to_nifti(dummy_t1w_dicom: DicomDir) -> None:
     assert nifti_gz_x.metadata["json"]["EchoTime"] == 0.00207
 
 
+def test_dicom_to_nifti_native(dummy_t1w_dicom: DicomDir) -> None:
+
+    assert supports_native_conversion(dummy_t1w_dicom)
+    native = NiftiGzX.convert(dummy_t1w_dicom)
+    reference = NiftiGzX.convert(dummy_t1w_dicom, native=False)
+    assert native.metadata["json"]["ConversionSoftware"] != "dcm2niix"
+    # dcm2niix reorders the axes, so compare the images in the same orientation
+    native_img = nibabel.as_closest_canonical(nibabel.load(native.fspath))
+    reference_img = nibabel.as_closest_canonical(nibabel.load(reference.fspath))
+    assert np.allclose(native_img.affine, reference_img.affine, atol=1e-3)
+    assert np.array_equal(
+        np.asarray(native_img.dataobj), np.asarray(reference_img.dataobj)
+    )
+    for key in ("EchoTime", "RepetitionTime", "FlipAngle", "SeriesDescription"):
+        assert native.metadata["json"][key] == reference.metadata["json"][key]
+
+
+def test_dicom_to_nifti_native_unsupported(dummy_dwi_dicom: DicomDir) -> None:
+
+    assert not supports_native_conversion(dummy_dwi_dicom)
+
+
 def test_dicom_to_nifti_select_echo(dummy_magfmap_dicom: DicomDir) -> None:
 
     nifti_gz_x_e1 = NiftiGzX.convert(dummy_magfmap_dicom, file_postfix="_e1")
@@ -0,0 +1,108 @@
+import gzip
+import nibabel
+import numpy
+import pytest
+from fileformats.medimage import Nifti1, NiftiGz, Mgh, MghGz
+from fileformats.medimage.gzip_codec import GZIP_THREADS_ENV_VAR
+from fileformats.extras.medimage.gzip_index import (
+    GZIP_INDEX_DIR_ENV_VAR,
+    gzip_index_path,
+)
+
+
+@pytest.fixture
+def nifti_4d(tmp_path):
+    data = numpy.arange(6 * 5 * 4 * 3, dtype=numpy.int16).reshape((6, 5, 4, 3))
+    img = nibabel.Nifti1Image(data, numpy.eye(4))
+    img.header.set_slope_inter(0.5, 10.0)
+    fspath = tmp_path / "image.nii"
+    nibabel.save(img, fspath)
+    return fspath
+
+
+@pytest.fixture
+def gzip_index_dir(tmp_path, monkeypatch):
+    index_dir = tmp_path / "gzip-index"
+    monkeypatch.setenv(GZIP_INDEX_DIR_ENV_VAR, str(index_dir))
+    return index_dir
+
+
+def test_nifti_array_proxy(nifti_4d):
+    nifti = Nifti1(nifti_4d)
+    expected = numpy.asanyarray(nibabel.load(nifti_4d).dataobj)
+
+    proxy = nifti.data_proxy
+
+    assert proxy.shape == expected.shape
+    assert proxy.dtype == expected.dtype
+    assert numpy.array_equal(proxy[..., 1], expected[..., 1])
+    assert numpy.array_equal(proxy[2, :, 1:3, 0], expected[2, :, 1:3, 0])
+    assert numpy.array_equal(numpy.asarray(proxy), expected)
+    assert numpy.array_equal(nifti.read_array(), expected)
+
+
+def test_nifti_gz_array_proxy(tmp_path, nifti_4d, gzip_index_dir):
+    fspath = tmp_path / "image.nii.gz"
+    with gzip.open(fspath, "wb") as f:
+        f.write(nifti_4d.read_bytes())
+    expected = numpy.asanyarray(nibabel.load(nifti_4d).dataobj)
+
+    proxy = NiftiGz(fspath).data_proxy
+
+    assert proxy.shape == expected.shape
+    assert numpy.array_equal(proxy[..., 2], expected[..., 2])
+
+
+def test_nifti_gz_index(tmp_path, nifti_4d, gzip_index_dir):
+    pytest.importorskip("indexed_gzip")
+    fspath = tmp_path / "image.nii.gz"
+    with gzip.open(fspath, "wb") as f:
+        f.write(nifti_4d.read_bytes())
+    expected = numpy.asanyarray(nibabel.load(nifti_4d).dataobj)
+
+    assert numpy.array_equal(NiftiGz(fspath).data_proxy[..., 1], expected[..., 1])
+    index_path = gzip_index_path(fspath)
+    assert index_path.exists()
+    built = index_path.stat().st_mtime_ns
+
+    # The saved index is reused by new instances
+    assert numpy.array_equal(NiftiGz(fspath).data_proxy[..., 0], expected[..., 0])
+    assert index_path.stat().st_mtime_ns == built
+
+    # Changing the file invalidates the index
+    with gzip.open(fspath, "wb") as f:
+        f.write(nifti_4d.read_bytes())
+    assert numpy.array_equal(NiftiGz(fspath).data_proxy[..., 2], expected[..., 2])
+    assert gzip_index_path(fspath) != index_path
+    assert list(gzip_index_dir.iterdir()) == [gzip_index_path(fspath)]
+
+    # The indexed gzip file is closed along with the proxy
+    proxy = NiftiGz(fspath).read_array_proxy()
+    assert numpy.array_equal(numpy.asarray(proxy), expected)
+    gzip_file = proxy.gzip_file
+    proxy.close()
+    assert gzip_file.closed
+
+
+def test_nifti_gz_convert(nifti_4d, monkeypatch):
+    monkeypatch.setenv(GZIP_THREADS_ENV_VAR, "3")
+    expected = numpy.asanyarray(nibabel.load(nifti_4d).dataobj)
+
+    nifti_gz = NiftiGz.convert(Nifti1(nifti_4d), threads=2)
+
+    assert numpy.array_equal(nifti_gz.read_array(), expected)
+    assert numpy.array_equal(nibabel.load(nifti_gz.fspath).get_fdata(), expected)
+    nifti = Nifti1.convert(nifti_gz)
+    assert nifti.fspath.read_bytes() == nifti_4d.read_bytes()
+
+
+def test_mgh_gz_convert(tmp_path):
+    data = numpy.arange(4 * 3 * 2, dtype=numpy.float32).reshape((4, 3, 2))
+    fspath = tmp_path / "image.mgh"
+    nibabel.save(nibabel.MGHImage(data, numpy.eye(4)), fspath)
+
+    mgh_gz = MghGz.convert(Mgh(fspath))
+
+    with gzip.open(mgh_gz.fspath) as f:
+        assert f.read() == fspath.read_bytes()
+    assert Mgh.convert(mgh_gz).fspath.read_bytes() == fspath.read_bytes()
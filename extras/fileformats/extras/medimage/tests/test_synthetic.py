@@ -0,0 +1,73 @@
+import pydicom
+import pytest
+from fileformats.core import SampleFileGenerator
+from fileformats.medimage import DicomSeries, NiftiGz
+from fileformats.medimage.dicom import DEFLATED_EXPLICIT_VR_LITTLE_ENDIAN
+from fileformats.extras.medimage.synthetic import (
+    generate_dicom_series,
+    generate_nifti_images,
+)
+
+
+def test_generate_dicom_series(tmp_path) -> None:
+    series = generate_dicom_series(
+        SampleFileGenerator(tmp_path / "serial", seed=1),
+        num_series=3,
+        num_slices=4,
+        matrix_size=(8, 12),
+        modality="CT",
+        transfer_syntax=DEFLATED_EXPLICIT_VR_LITTLE_ENDIAN,
+    )
+    assert [len(s) for s in series] == [4, 4, 4]
+    detected, remaining = DicomSeries.from_paths(
+        [p for s in series for p in s], classify_modality=True
+    )
+    assert not remaining
+    assert len(detected) == 3
+    for dicom_series in detected:
+        assert dicom_series.modality == "CT"
+        assert dicom_series.read_array().shape == (4, 8, 12)
+
+    # Files written in parallel are identical to those written serially
+    parallel = generate_dicom_series(
+        SampleFileGenerator(tmp_path / "parallel", seed=1),
+        num_series=3,
+        num_slices=4,
+        matrix_size=(8, 12),
+        modality="CT",
+        transfer_syntax=DEFLATED_EXPLICIT_VR_LITTLE_ENDIAN,
+        max_workers=2,
+        pool="thread",
+    )
+    for serial_paths, parallel_paths in zip(series, parallel):
+        assert [p.read_bytes() for p in serial_paths] == [
+            p.read_bytes() for p in parallel_paths
+        ]
+
+    with pytest.raises(ValueError, match="Unsupported transfer syntax"):
+        generate_dicom_series(
+            SampleFileGenerator(tmp_path, seed=1), transfer_syntax="1"
+        )
+
+
+def test_generate_multiframe_dicom_series(tmp_path) -> None:
+    ((fspath,),) = generate_dicom_series(
+        SampleFileGenerator(tmp_path, seed=1), num_slices=5, multiframe=True
+    )
+    dcm = pydicom.dcmread(fspath)
+    assert dcm.NumberOfFrames == 5
+    assert dcm.pixel_array.shape == (5, 64, 64)
+    assert len(dcm.PerFrameFunctionalGroupsSequence) == 5
+
+
+def test_generate_nifti_images(tmp_path) -> None:
+    fspaths = generate_nifti_images(
+        SampleFileGenerator(tmp_path, seed=1),
+        num_images=2,
+        shape=(6, 7, 8, 3),
+        voxel_sizes=(1.0, 1.5, 2.0, 0.5),
+    )
+    assert len(fspaths) == 2
+    nifti = NiftiGz(fspaths[0])
+    assert nifti.dims() == (6, 7, 8, 3)
+    assert nifti.vox_sizes() == (1.0, 1.5, 2.0, 0.5)
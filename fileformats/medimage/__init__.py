@@ -1,131 +1,300 @@
+"""Medical imaging file formats.
+
+The formats and classifiers are imported lazily when they are first accessed (see PEP
+562), so that importing a format only costs the import of the module it is defined in
+(and its dependencies) rather than every format in the package. The classifier registry
+is only partly lazy though, as the modality and anatomical entity classifiers
+(``contents.imaging.modality`` and ``contents.anatomical_entity``) are loaded along with
+any format by ``base``, which needs their base classes for the exclusive categories of
+``MedicalImage``.
+"""
+
+import importlib
+import typing as ty
 from ._version import __version__
-from .base import MedicalImagingData, MedicalImage
 
+if ty.TYPE_CHECKING:
+    from .base import MedicalImagingData, MedicalImage
+    from .misc import (
+        Analyze,
+        Mgh,
+        MghGz,
+    )
+    from .nifti import (
+        Nifti,
+        Nifti1,
+        Nifti2,
+        NiftiGz,
+        NiftiX,
+        NiftiGzX,
+        NiftiWithDataFile,
+    )
+    from .diffusion import (
+        DwiEncoding,
+        Bvec,
+        Bval,
+        NiftiBvec,
+        NiftiGzBvec,
+        NiftiXBvec,
+        NiftiGzXBvec,
+    )
+    from .dicom import (
+        DicomImage,
+        DicomMultiframe,
+        DicomCollection,
+        DicomDir,
+        DicomSeries,
+        # Vnd_Siemens_Vision,
+        # Vnd_Siemens_VisionDir,
+    )
+    from .raw import (
+        Kspace,
+        Rda,
+        PetRawData,
+        PetListMode,
+        PetSinogram,
+        PetCountRate,
+        PetNormalisation,
+    )
+    from .surface import Gifti
+    from .contents.imaging.modality import (
+        ImagingModality,
+        CombinedModalities,
+        DualEnergyXrayAbsorptiometry,
+        Fluoroscopy,
+        MrFluoroscopy,
+        RadioFluoroscopy,
+        MagneticResonanceImaging,
+        DiffusionTensorImaging,
+        DynamicContrast,
+        EnhancedMagneticResonanceImaging,
+        FunctionalMagneticResonanceImaging,
+        MagneticResonanceAngiography,
+        MagneticResonanceSpectroscopy,
+        NuclearMedicineImaging,
+        PositronEmissionTomography,
+        PanographicRadiograph,
+        ProjectionRadiography,
+        ComputedRadiography,
+        DigitalRadiography,
+        DualEnergySubtractionRadiograpgy,
+        Mammography,
+        ScreenFilmRadiography,
+        Stereoscopy,
+        StereotacticRadiography,
+        Spectroscopy,
+        Tomography,
+        ComputedTomography,
+        Ultrasound,
+        Mri,
+        Pet,
+        Dti,
+        Dmri,
+        Fmri,
+        Cr,
+        Ct,
+        Dx,
+        Mg,
+        Mr,
+        Nm,
+        Pt,
+        Px,
+        Rf,
+        Rg,
+        Us,
+    )
+    from .contents.imaging.derivatives import Derivative, Mask
+    from .contents.anatomical_entity.material_anatomical_entity.anatomical_structure import (
+        Brain,
+        SpinalCord,
+    )
+    from .contents.property.imaging_procedure.cross_sectional_procedure.mr_procedure.tissue_contrast import (
+        T1w,
+        T2w,
+        T2sw,
+        T1T2w,
+        Flair,
+        Dwi,
+        T2Weighted,
+        T1Weighted,
+        T2StarWeighted,
+        T1T2Weighted,
+        DiffusionWeighted,
+        FluidAttenuatedInversionRecovery,
+        IntermediateWeighted,
+    )
+    from .itk import (
+        GDCM,
+        GIPL,
+        VTK,
+        PGM,
+        MetaImage,
+        Nrrd,
+        NrrdGz,
+        ItkImage,
+        ItkAll,
+    )
 
-from .misc import (
-    Analyze,
-    Mgh,
-    MghGz,
-)
-from .nifti import (
-    Nifti,
-    Nifti1,
-    Nifti2,
-    NiftiGz,
-    NiftiX,
-    NiftiGzX,
-)
-from .diffusion import (
-    DwiEncoding,
-    Bvec,
-    Bval,
-    NiftiBvec,
-    NiftiGzBvec,
-    NiftiXBvec,
-    NiftiGzXBvec,
-)
-from .dicom import (
-    DicomImage,
-    DicomCollection,
-    DicomDir,
-    DicomSeries,
-    # Vnd_Siemens_Vision,
-    # Vnd_Siemens_VisionDir,
-)
-from .raw import (
-    Kspace,
-    Rda,
-    PetRawData,
-    PetListMode,
-    PetSinogram,
-    PetCountRate,
-    PetNormalisation,
-)
-from .surface import Gifti
-from .contents.imaging.modality import (
-    ImagingModality,
-    CombinedModalities,
-    DualEnergyXrayAbsorptiometry,
-    Fluoroscopy,
-    MrFluoroscopy,
-    RadioFluoroscopy,
-    MagneticResonanceImaging,
-    DiffusionTensorImaging,
-    DynamicContrast,
-    EnhancedMagneticResonanceImaging,
-    FunctionalMagneticResonanceImaging,
-    MagneticResonanceAngiography,
-    MagneticResonanceSpectroscopy,
-    NuclearMedicineImaging,
-    PositronEmissionTomography,
-    PanographicRadiograph,
-    ProjectionRadiography,
-    ComputedRadiography,
-    DigitalRadiography,
-    DualEnergySubtractionRadiograpgy,
-    Mammography,
-    ScreenFilmRadiography,
-    Stereoscopy,
-    StereotacticRadiography,
-    Spectroscopy,
-    Tomography,
-    ComputedTomography,
-    Ultrasound,
-    Mri,
-    Pet,
-    Dti,
-    Dmri,
-    Fmri,
-    Cr,
-    Ct,
-    Dx,
-    Mg,
-    Mr,
-    Nm,
-    Pt,
-    Px,
-    Rf,
-    Rg,
-    Us,
-)
-from .contents.imaging.derivatives import Derivative, Mask
-from .contents.anatomical_entity.material_anatomical_entity.anatomical_structure import (
-    Brain,
-    SpinalCord,
-)
-from .contents.property.imaging_procedure.cross_sectional_procedure.mr_procedure.tissue_contrast import (
-    T1w,
-    T2w,
-    T2sw,
-    T1T2w,
-    Flair,
-    Dwi,
-    T2Weighted,
-    T1Weighted,
-    T2StarWeighted,
-    T1T2Weighted,
-    DiffusionWeighted,
-    FluidAttenuatedInversionRecovery,
-    IntermediateWeighted,
-)
-from .itk import (
-    GDCM,
-    GIPL,
-    VTK,
-    PGM,
-    MetaImage,
-    Nrrd,
-    NrrdGz,
-    ItkImage,
-    ItkAll,
+# The modules that each of the lazily imported names are defined in
+_LAZY_IMPORTS: ty.Dict[str, ty.Tuple[str, ...]] = {
+    ".base": ("MedicalImagingData", "MedicalImage"),
+    ".misc": ("Analyze", "Mgh", "MghGz"),
+    ".nifti": (
+        "Nifti",
+        "Nifti1",
+        "Nifti2",
+        "NiftiGz",
+        "NiftiX",
+        "NiftiGzX",
+        "NiftiWithDataFile",
+    ),
+    ".diffusion": (
+        "DwiEncoding",
+        "Bvec",
+        "Bval",
+        "NiftiBvec",
+        "NiftiGzBvec",
+        "NiftiXBvec",
+        "NiftiGzXBvec",
+    ),
+    ".dicom": (
+        "DicomImage",
+        "DicomMultiframe",
+        "DicomCollection",
+        "DicomDir",
+        "DicomSeries",
+    ),
+    ".raw": (
+        "Kspace",
+        "Rda",
+        "PetRawData",
+        "PetListMode",
+        "PetSinogram",
+        "PetCountRate",
+        "PetNormalisation",
+    ),
+    ".surface": ("Gifti",),
+    ".contents.imaging.modality": (
+        "ImagingModality",
+        "CombinedModalities",
+        "DualEnergyXrayAbsorptiometry",
+        "Fluoroscopy",
+        "MrFluoroscopy",
+        "RadioFluoroscopy",
+        "MagneticResonanceImaging",
+        "DiffusionTensorImaging",
+        "DynamicContrast",
+        "EnhancedMagneticResonanceImaging",
+        "FunctionalMagneticResonanceImaging",
+        "MagneticResonanceAngiography",
+        "MagneticResonanceSpectroscopy",
+        "NuclearMedicineImaging",
+        "PositronEmissionTomography",
+        "PanographicRadiograph",
+        "ProjectionRadiography",
+        "ComputedRadiography",
+        "DigitalRadiography",
+        "DualEnergySubtractionRadiograpgy",
+        "Mammography",
+        "ScreenFilmRadiography",
+        "Stereoscopy",
+        "StereotacticRadiography",
+        "Spectroscopy",
+        "Tomography",
+        "ComputedTomography",
+        "Ultrasound",
+        "Mri",
+        "Pet",
+        "Dti",
+        "Dmri",
+        "Fmri",
+        "Cr",
+        "Ct",
+        "Dx",
+        "Mg",
+        "Mr",
+        "Nm",
+        "Pt",
+        "Px",
+        "Rf",
+        "Rg",
+        "Us",
+    ),
+    ".contents.imaging.derivatives": ("Derivative", "Mask"),
+    ".contents.anatomical_entity.material_anatomical_entity.anatomical_structure": (
+        "Brain",
+        "SpinalCord",
+    ),
+    ".contents.property.imaging_procedure.cross_sectional_procedure.mr_procedure.tissue_contrast": (
+        "T1w",
+        "T2w",
+        "T2sw",
+        "T1T2w",
+        "Flair",
+        "Dwi",
+        "T2Weighted",
+        "T1Weighted",
+        "T2StarWeighted",
+        "T1T2Weighted",
+        "DiffusionWeighted",
+        "FluidAttenuatedInversionRecovery",
+        "IntermediateWeighted",
+    ),
+    ".itk": (
+        "GDCM",
+        "GIPL",
+        "VTK",
+        "PGM",
+        "MetaImage",
+        "Nrrd",
+        "NrrdGz",
+        "ItkImage",
+        "ItkAll",
+    ),
+}
+
+_LAZY_MODULES = {
+    name: module for module, names in _LAZY_IMPORTS.items() for name in names
+}
+
+# Submodules that were imported along with the package before imports were made lazy
+_SUBMODULES = (
+    "base",
+    "contents",
+    "dicom",
+    "diffusion",
+    "header_index",
+    "itk",
+    "misc",
+    "nifti",
+    "raw",
+    "surface",
 )
 
 
+def __getattr__(name: str) -> ty.Any:
+    try:
+        module_name = _LAZY_MODULES[name]
+    except KeyError:
+        if name in _SUBMODULES:
+            return importlib.import_module("." + name, __name__)
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}") from None
+    value = getattr(importlib.import_module(module_name, __name__), name)
+    # Cache the value so the module-level __getattr__ isn't called again for it
+    globals()[name] = value
+    return value
+
+
+def __dir__() -> ty.List[str]:
+    return sorted(set(globals()) | set(_LAZY_MODULES) | set(_SUBMODULES))
+
+
 __all__ = [
     "__version__",
     "MedicalImagingData",
     "MedicalImage",
     "DicomImage",
+    "DicomMultiframe",
     "Analyze",
     "Mgh",
     "MghGz",
@@ -135,6 +304,7 @@ __all__ = [
     "NiftiGz",
     "NiftiX",
     "NiftiGzX",
+    "NiftiWithDataFile",
     "DwiEncoding",
     "Bvec",
     "Bval",
@@ -2,12 +2,19 @@ import os
 import sys
 import typing as ty
 import logging
-from fileformats.core import extra, FileSet, mtime_cached_property
+import functools
+from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor
+from fileformats.core import extra, FileSet, DataType, Classifier, mtime_cached_property
 from fileformats.core.mixin import WithClassifiers
+from fileformats.core.exceptions import FormatDefinitionError
+from fileformats.core.utils import get_optional_type
 from .contents import ContentsClassifier
+from .contents.ontology import get_contents_ontology
 from .contents.imaging.modality import ImagingModality
 from .contents.imaging.derivatives import Derivative
 from .contents.anatomical_entity import AnatomicalEntity
+from .sniffing import WithSniffedContents
 
 logger = logging.getLogger("fileformats")
 
@@ -21,6 +28,7 @@ else:
     from typing_extensions import Self
 
 if ty.TYPE_CHECKING:
+    import numpy  # noqa: F401
     import numpy.typing  # noqa: F401
 
 
@@ -44,6 +52,7 @@ class MedicalImagingData(FileSet):
         self,
         spec: ty.Any = None,
         out_dir: os.PathLike[str] | None = None,
+        **kwargs: ty.Any,
     ) -> tuple[Self, ty.Mapping[str, ty.Any]]:
         """
         Deidentifies the image by stripping any subject-identifying information from the
@@ -62,6 +71,9 @@ class MedicalImagingData(FileSet):
         out_dir: PathLike[str], optional
             An optional directory where the deidentified image should be saved. If not
             provided, the deidentified image may be saved in a temporary directory
+        **kwargs: Any
+            any format-specific keyword arguments to pass to the deidentification
+            process, e.g. options to control parallelisation
 
         Returns
         -------
@@ -75,7 +87,7 @@ class MedicalImagingData(FileSet):
         raise NotImplementedError
 
 
-class MedicalImage(WithClassifiers, MedicalImagingData):
+class MedicalImage(WithSniffedContents, WithClassifiers, MedicalImagingData):
 
     INCLUDE_HDR_KEYS: ty.Optional[ty.Tuple[str, ...]] = None
     IGNORE_HDR_KEYS: ty.Optional[ty.Tuple[str, ...]] = None
@@ -85,6 +97,20 @@ class MedicalImage(WithClassifiers, MedicalImagingData):
     allowed_classifiers = (ContentsClassifier,)
     exclusive_classifiers = (ImagingModality, AnatomicalEntity, Derivative)
 
+    @classmethod
+    def __class_getitem__(
+        cls,
+        classifiers: ty.Union[ty.Collection[ty.Type[Classifier]], ty.Type[Classifier]],
+    ) -> ty.Type[DataType]:
+        """Looks up previously classified types by the classifiers exactly as they were
+        passed, so that repeatedly creating the same classified type (e.g. in a loop)
+        skips the validation and sorting of the classifiers"""
+        if isinstance(classifiers, ty.Iterable):
+            classifiers = tuple(classifiers)
+        else:
+            classifiers = (classifiers,)
+        return _classified_type(cls, classifiers)
+
     @extra
     def read_array(self) -> DataArrayType:
         """
@@ -95,6 +121,18 @@ class MedicalImage(WithClassifiers, MedicalImagingData):
     def data_array(self) -> DataArrayType:
         return self.read_array()
 
+    @extra
+    def read_array_proxy(self) -> DataArrayType:
+        """
+        Returns a lazy proxy to the binary data of the image, which can be sliced like a
+        numpy array in order to read only the requested parts of the image
+        """
+        raise NotImplementedError
+
+    @mtime_cached_property
+    def data_proxy(self) -> DataArrayType:
+        return self.read_array_proxy()
+
     @extra
     def vox_sizes(self) -> ty.Tuple[float, float, float]:
         """The length of the voxels along each dimension"""
@@ -104,3 +142,143 @@ class MedicalImage(WithClassifiers, MedicalImagingData):
     def dims(self) -> ty.Tuple[int, int, int]:
         """The dimensions of the image"""
         raise NotImplementedError
+
+    @classmethod
+    def read_batch(
+        cls,
+        images: ty.Iterable[
+            ty.Union[FileSet, str, Path, ty.Iterable[ty.Union[str, Path]]]
+        ],
+        metadata_keys: ty.Sequence[str] = (),
+        max_workers: ty.Optional[int] = None,
+        ignore_errors: bool = False,
+    ) -> ty.Dict[str, "numpy.ndarray[ty.Any, ty.Any]"]:
+        """Reads the dimensions, voxel sizes and selected metadata of a batch of images
+        concurrently and returns them as columns of numpy arrays, e.g. for generating
+        quality control reports across a whole dataset
+
+        Parameters
+        ----------
+        images : Iterable[FileSet or str or Path or Iterable[str or Path]]
+            the images to read, either file-sets or the path(s) of images of this class
+        metadata_keys : Sequence[str], optional
+            metadata fields to return along with the dimensions and voxel sizes
+        max_workers : int, optional
+            the maximum number of threads used to read the headers, by default the
+            default of the ThreadPoolExecutor
+        ignore_errors : bool, optional
+            whether to record errors reading images in the "error" column instead of
+            raising them, in which case dims of the failed images are set to 0 and
+            voxel sizes to NaN, by default False
+
+        Returns
+        -------
+        dict[str, numpy.ndarray]
+            columns of values for each image: "fspath" (the primary path of each
+            image), "ndim", "dims" and "vox_sizes" (2-D arrays padded to the largest
+            number of dimensions with 1s and NaNs, respectively), "error" (None for
+            images that were read successfully) and one for each of the metadata keys
+            (None where the key is missing). Metadata columns are object arrays if the
+            values can't be combined into a regular numpy array.
+        """
+        import numpy
+
+        def read_image(
+            image: ty.Union[FileSet, str, Path, ty.Iterable[ty.Union[str, Path]]],
+        ) -> ty.Tuple[ty.Any, ...]:
+            fspath = image if isinstance(image, (str, Path)) else None
+            try:
+                if not isinstance(image, FileSet):
+                    image = cls(image)
+                fspath = getattr(image, "fspath", None) or sorted(image.fspaths)[0]
+                assert isinstance(image, MedicalImage)
+                dims = tuple(image.dims())
+                vox_sizes = tuple(image.vox_sizes())
+                metadata = image.metadata
+                values = tuple(metadata.get(k) for k in metadata_keys)
+            except Exception as e:
+                if not ignore_errors:
+                    raise
+                error_fspath = str(fspath) if fspath is not None else None
+                return error_fspath, (), (), (None,) * len(metadata_keys), str(e)
+            return str(fspath), dims, vox_sizes, values, None
+
+        with ThreadPoolExecutor(max_workers) as executor:
+            rows = list(executor.map(read_image, images))
+
+        max_ndim = max((len(r[1]) for r in rows), default=0)
+        dims = numpy.ones((len(rows), max_ndim), dtype=int)
+        vox_sizes = numpy.full((len(rows), max_ndim), numpy.nan)
+        for i, (_, row_dims, row_vox_sizes, _, error) in enumerate(rows):
+            if error is not None:
+                dims[i] = 0
+            dims[i, : len(row_dims)] = row_dims
+            vox_sizes[i, : len(row_vox_sizes)] = row_vox_sizes
+        columns = {
+            "fspath": _to_column([r[0] for r in rows]),
+            "ndim": numpy.array([len(r[1]) for r in rows], dtype=int),
+            "dims": dims,
+            "vox_sizes": vox_sizes,
+            "error": _to_column([r[4] for r in rows]),
+        }
+        for i, key in enumerate(metadata_keys):
+            columns[key] = _to_column([r[3][i] for r in rows])
+        return columns
+
+
+def _to_column(values: ty.List[ty.Any]) -> "numpy.ndarray[ty.Any, ty.Any]":
+    """Converts a list of values to a numpy array, falling back to a 1-D object array if
+    they don't form a regular array or contain missing values"""
+    import numpy
+
+    if all(v is not None for v in values):
+        try:
+            return numpy.array(values)
+        except ValueError:
+            pass
+    column = numpy.empty(len(values), dtype=object)
+    for i, value in enumerate(values):
+        column[i] = value
+    return column
+
+
+# The maximum number of classified types memoised by the classifiers exactly as they were
+# passed (i.e. including the different orders they can be passed in). Evicted types are
+# still looked up in ``_classified_subtypes`` of the unclassified class, which is keyed
+# by the sorted classifiers so only grows with the distinct types created
+CLASSIFIED_TYPES_CACHE_SIZE = 4096
+
+
+@functools.lru_cache(maxsize=CLASSIFIED_TYPES_CACHE_SIZE)
+def _classified_type(
+    klass: ty.Type[MedicalImage], classifiers: ty.Tuple[ty.Any, ...]
+) -> ty.Type[DataType]:
+    """Checks the classifiers against the exclusive categories in the contents ontology
+    index before creating the classified type (errors aren't cached so invalid
+    combinations are rejected every time)"""
+    if (
+        klass.multiple_classifiers
+        and not klass.ordered_classifiers
+        and len(classifiers) > 1
+    ):
+        to_check = [
+            get_optional_type(c, klass.allow_optional_classifiers) for c in classifiers
+        ]
+        # Leave classifiers that aren't allowed to be reported by the base class
+        if all(
+            isinstance(c, type) and issubclass(c, ContentsClassifier) for c in to_check
+        ):
+            conflicts = get_contents_ontology().conflicts(
+                to_check, klass.exclusive_classifiers
+            )
+            if conflicts:
+                raise FormatDefinitionError(
+                    "Cannot have more than one occurrence of a classifier or subclasses "
+                    f"for {klass} class when {klass.__name__}.ordered_classifiers is "
+                    "false:\n"
+                    + "\n".join(
+                        f"{k!r}: " + ", ".join(repr(x) for x in v)
+                        for k, v in conflicts.items()
+                    )
+                )
+    return super(MedicalImage, klass).__class_getitem__(classifiers)
@@ -1,6 +1,14 @@
+import sys
 import typing as ty
 from fileformats.core import Classifier
 
 
 class ContentsClassifier(Classifier):
     description: ty.Optional[str] = None
+
+    def __init_subclass__(cls, **kwargs: ty.Any) -> None:
+        super().__init_subclass__(**kwargs)
+        # Discard the index of the ontology if it has already been built
+        ontology = sys.modules.get(__name__ + ".ontology")
+        if ontology is not None:
+            ontology.invalidate_contents_ontology()
@@ -44,6 +44,7 @@ class MrFluoroscopy(Fluoroscopy):
 
 class RadioFluoroscopy(Fluoroscopy):
     ontology_link = "http://www.radlex.org/RID/RID45709"
+    dicom_modality = "RF"
     description = (
         "Production of an image when x-rays strike a fluorescent screen. [MeSH]"
     )
@@ -150,7 +151,7 @@ class ComputedRadiography(ProjectionRadiography):
 
 class DigitalRadiography(ProjectionRadiography):
     ontology_link = "http://www.radlex.org/RID/RID10351"
-    dicom_modality = "DR"
+    dicom_modality = "DX"
     description = None
 
 
@@ -161,6 +162,7 @@ class DualEnergySubtractionRadiograpgy(ProjectionRadiography):
 
 class Mammography(ProjectionRadiography):
     ontology_link = "http://www.radlex.org/RID/RID10357"
+    dicom_modality = "MG"
     description = None
 
 
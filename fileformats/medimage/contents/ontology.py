@@ -0,0 +1,170 @@
+"""A precomputed index of the contents classifier ontology, so that the relationships
+between classifiers (e.g. whether one is a sub-type of another or which exclusive
+category it belongs to) and the classifiers corresponding to DICOM modality codes and
+ontology links can be looked up without walking the class hierarchy.
+
+The index is built on first use and rebuilt if new classifiers are defined after that.
+"""
+
+import typing as ty
+import importlib
+import pkgutil
+from . import ContentsClassifier
+
+ClassifierType = ty.Type[ContentsClassifier]
+
+
+class ContentsOntology:
+    """Lookup tables for a set of contents classifiers
+
+    Parameters
+    ----------
+    classifiers : Iterable[type[ContentsClassifier]]
+        the classifiers to index
+    """
+
+    def __init__(self, classifiers: ty.Iterable[ClassifierType]):
+        # Sort from the most general to the most specific so that classifiers that
+        # inherit a DICOM modality or ontology link don't shadow the ones defining it
+        self.classifiers = tuple(
+            sorted(
+                set(classifiers),
+                key=lambda c: (len(c.__mro__), c.__module__, c.__qualname__),
+            )
+        )
+        self._ancestors: ty.Dict[type, ty.FrozenSet[type]] = {}
+        self.by_dicom_modality: ty.Dict[str, ClassifierType] = {}
+        self.by_ontology_link: ty.Dict[str, ClassifierType] = {}
+        for classifier in self.classifiers:
+            self.ancestors(classifier)
+            dicom_modality = classifier.__dict__.get("dicom_modality")
+            if dicom_modality:
+                self.by_dicom_modality.setdefault(dicom_modality, classifier)
+            ontology_link = classifier.__dict__.get("ontology_link")
+            if ontology_link:
+                self.by_ontology_link.setdefault(ontology_link, classifier)
+        self._categories: ty.Dict[
+            ty.Tuple[type, ty.Tuple[type, ...]], ty.Optional[type]
+        ] = {}
+
+    def ancestors(self, classifier: type) -> ty.FrozenSet[type]:
+        """The classifier and all the classifiers it inherits from
+
+        Parameters
+        ----------
+        classifier : type
+            the classifier to return the ancestors of
+
+        Returns
+        -------
+        frozenset[type]
+            the classifier and its base classes that are contents classifiers
+        """
+        try:
+            return self._ancestors[classifier]
+        except KeyError:
+            ancestors = frozenset(
+                c
+                for c in classifier.__mro__
+                if isinstance(c, type) and issubclass(c, ContentsClassifier)
+            )
+            self._ancestors[classifier] = ancestors
+            return ancestors
+
+    def is_subclass(self, classifier: type, base: type) -> bool:
+        """Whether the classifier is, or is a sub-type of, the base classifier"""
+        return base in self.ancestors(classifier)
+
+    def exclusive_category(
+        self, classifier: type, exclusive_classifiers: ty.Tuple[type, ...]
+    ) -> ty.Optional[type]:
+        """The first of the exclusive classifiers that the classifier is a sub-type of
+
+        Parameters
+        ----------
+        classifier : type
+            the classifier to find the category of
+        exclusive_classifiers : tuple[type, ...]
+            the exclusive classifiers, e.g. ``MedicalImage.exclusive_classifiers``
+
+        Returns
+        -------
+        type or None
+            the exclusive classifier the classifier belongs to, if any
+        """
+        key = (classifier, exclusive_classifiers)
+        try:
+            return self._categories[key]
+        except KeyError:
+            ancestors = self.ancestors(classifier)
+            category = next((c for c in exclusive_classifiers if c in ancestors), None)
+            self._categories[key] = category
+            return category
+
+    def conflicts(
+        self,
+        classifiers: ty.Iterable[type],
+        exclusive_classifiers: ty.Tuple[type, ...] = (),
+    ) -> ty.Dict[type, ty.List[type]]:
+        """Finds the classifiers that can't be combined in the same classified type,
+        either because they belong to the same exclusive category or because one of
+        them is a sub-type of another
+
+        Parameters
+        ----------
+        classifiers : Iterable[type]
+            the classifiers to check
+        exclusive_classifiers : tuple[type, ...], optional
+            the exclusive classifiers, e.g. ``MedicalImage.exclusive_classifiers``
+
+        Returns
+        -------
+        dict[type, list[type]]
+            the conflicting classifiers, keyed by the category or classifier they share
+        """
+        classifiers = list(classifiers)
+        members: ty.Dict[type, ty.List[type]] = {}
+        for classifier in classifiers:
+            shared = set(self.ancestors(classifier)).intersection(classifiers)
+            category = self.exclusive_category(classifier, exclusive_classifiers)
+            if category is not None:
+                shared.add(category)
+            for key in shared:
+                members.setdefault(key, []).append(classifier)
+        return {k: v for k, v in members.items() if len(v) > 1}
+
+
+def get_contents_ontology() -> ContentsOntology:
+    """Returns the index of all contents classifiers, building it if the first time it
+    is called or if classifiers have been defined since it was built
+
+    Returns
+    -------
+    ContentsOntology
+        the index of the contents classifier ontology
+    """
+    global _ontology
+    if _ontology is None:
+        # Make sure all classifiers in the package have been defined
+        package = importlib.import_module(__package__)
+        for module_info in pkgutil.walk_packages(
+            package.__path__, prefix=__package__ + "."
+        ):
+            importlib.import_module(module_info.name)
+        classifiers: ty.List[ClassifierType] = []
+        stack = [ContentsClassifier]
+        while stack:
+            classifier = stack.pop()
+            classifiers.append(classifier)
+            stack.extend(classifier.__subclasses__())
+        _ontology = ContentsOntology(classifiers)
+    return _ontology
+
+
+def invalidate_contents_ontology() -> None:
+    """Discards the index so it is rebuilt the next time it is requested"""
+    global _ontology
+    _ontology = None
+
+
+_ontology: ty.Optional[ContentsOntology] = None
@@ -1,15 +1,29 @@
 import sys
 import os
+import io
+import struct
+import logging
+import zlib
+import itertools
+import functools
+import concurrent.futures
 import typing as ty
-from collections import defaultdict
+from collections import defaultdict, deque
+from contextlib import contextmanager
 from pathlib import Path
 from fileformats.core.decorators import mtime_cached_property
-from fileformats.core import extra, FileSet, extra_implementation
+from fileformats.core import extra, FileSet, extra_implementation, validated_property
+from fileformats.core.exceptions import FormatMismatchError
 from fileformats.core.utils import collate_metadata_series
 from fileformats.core.collection import TypedCollection
 from fileformats.generic import TypedDirectory, TypedSet
 from fileformats.application import Dicom
-from .base import MedicalImage
+from . import instrumentation
+from .base import MedicalImage, DataArrayType
+from .contents import ContentsClassifier
+from .contents.imaging.modality import ImagingModality
+from .contents.ontology import get_contents_ontology
+from .header_index import HeaderIndex, file_key, get_header_index
 
 if sys.version_info >= (3, 9):
     from typing import TypeAlias
@@ -20,6 +34,13 @@ if sys.version_info >= (3, 11):
 else:
     from typing_extensions import Self
 
+logger = logging.getLogger("fileformats")
+
+DicomTagType: TypeAlias = ty.Union[ty.Tuple[int, int], ty.Tuple[str, str], str]
+DicomValueType: TypeAlias = ty.Union[
+    str, bytes, int, float, ty.Tuple[ty.Any, ...], None
+]
+
 if ty.TYPE_CHECKING:
     import pydicom.tag
 
@@ -34,18 +55,223 @@ if ty.TYPE_CHECKING:
 # =====================================================================
 
 
-class DicomImage(MedicalImage, Dicom):
+class DicomModalityMixin:
+    """Infers the imaging modality classifier (e.g. Mri or Ct) of DICOM images from the
+    Modality tag in their headers, which is read without parsing the whole file (see
+    ``read_dicom_modality``)"""
+
+    @property
+    def modality(self) -> ty.Optional[str]:
+        """The DICOM modality code read from the header, e.g. "MR" or "CT"."""
+        return read_dicom_modality(self._modality_fspath)
+
+    @property
+    def modality_classifier(self) -> ty.Optional[ty.Type[ContentsClassifier]]:
+        """The imaging modality classifier corresponding to the modality in the header,
+        None if the modality is missing or doesn't correspond to a classifier"""
+        return dicom_modality_classifier(self.modality)
+
+    def classify_modality(self) -> Self:
+        """Returns the same files as an instance of the type classified by its imaging
+        modality, e.g. ``DicomSeries[Mri]``, so they can be routed to modality specific
+        pipelines. The files are returned as is if the modality isn't recognised or the
+        type is already classified by modality
+
+        Returns
+        -------
+        Self
+            the file-set classified by its imaging modality
+        """
+        fileset = ty.cast(MedicalImage, self)
+        klass = _modality_classified_type(type(fileset), self.modality_classifier)
+        if klass is type(fileset):
+            return self
+        return klass(fileset.fspaths)  # type: ignore[return-value]
+
+    @property
+    def _modality_fspath(self) -> Path:
+        raise NotImplementedError
+
+
+class DicomImage(DicomModalityMixin, MedicalImage, Dicom):
     """A DICOM file that contains image data. Derives from the generic Dicom class in
     the `application` namespace as well as medical image base class"""
 
+    @property
+    def _modality_fspath(self) -> Path:
+        return self.fspath
+
+
+class DicomFrame(ty.NamedTuple):
+    """The location of a frame of a multi-frame DICOM image within the image it is part
+    of, as listed in the per-frame (or shared) functional groups of its header
+
+    Parameters
+    ----------
+    data_index : int
+        the index of the frame within the pixel data of the file
+    stack_id : str, optional
+        the ID of the stack the frame belongs to
+    in_stack_position : int, optional
+        the position of the frame within its stack
+    temporal_position : int, optional
+        the index of the time point the frame was acquired at
+    position : tuple[float, float, float], optional
+        the position of the first voxel of the frame in patient coordinates
+    orientation : tuple[float, ...], optional
+        the direction cosines of the rows and columns of the frame
+    pixel_spacing : tuple[float, float], optional
+        the spacing between the centres of the rows and columns of the frame
+    slice_thickness : float, optional
+        the thickness of the slice the frame images
+    rescale_slope : float
+        the slope the stored values of the frame are scaled by
+    rescale_intercept : float
+        the intercept added to the scaled values of the frame
+    """
+
+    data_index: int
+    stack_id: ty.Optional[str] = None
+    in_stack_position: ty.Optional[int] = None
+    temporal_position: ty.Optional[int] = None
+    position: ty.Optional[ty.Tuple[float, ...]] = None
+    orientation: ty.Optional[ty.Tuple[float, ...]] = None
+    pixel_spacing: ty.Optional[ty.Tuple[float, ...]] = None
+    slice_thickness: ty.Optional[float] = None
+    rescale_slope: float = 1.0
+    rescale_intercept: float = 0.0
+
+
+class DicomMultiframe(DicomImage):
+    """A multi-frame DICOM image (e.g. an Enhanced MR or CT image), which stores a
+    whole volume, or time-series of volumes, as the frames of a single file. The
+    positions of the frames are listed in the functional groups of the header, which
+    are parsed once into a frame index (see ``frame_index``) so that individual frames
+    can be located and decoded on demand (see ``read_frames`` and ``data_proxy``)
+    """
+
+    @validated_property
+    def _has_number_of_frames(self) -> None:
+        if self.num_frames is None:
+            raise FormatMismatchError(
+                f"{self.fspath} is not a multi-frame image as it doesn't have a "
+                "NumberOfFrames element"
+            )
+
+    @property
+    def num_frames(self) -> ty.Optional[int]:
+        """The number of frames stored in the file, read from its header"""
+        return read_dicom_num_frames(self.fspath)
+
+    @extra
+    def read_frame_index(self) -> ty.List[DicomFrame]:
+        """Parses the functional groups of the header to locate each frame within the
+        image
+
+        Returns
+        -------
+        list[DicomFrame]
+            the location of each frame, in the order they are stored in the file
+        """
+        raise NotImplementedError
+
+    @mtime_cached_property
+    def frame_index(self) -> ty.List[DicomFrame]:
+        return self.read_frame_index()
+
+    @extra
+    def read_frames(self, indices: ty.Sequence[int]) -> DataArrayType:
+        """Decodes only the requested frames of the image
+
+        Parameters
+        ----------
+        indices : Sequence[int]
+            the indices of the frames to decode, in the order they are stored in the
+            file
+
+        Returns
+        -------
+        numpy.ndarray
+            the decoded (and rescaled) frames stacked along the first axis
+        """
+        raise NotImplementedError
+
+
+def read_dicom_num_frames(
+    fspath: ty.Union[str, os.PathLike[str]],
+) -> ty.Optional[int]:
+    """Reads the number of frames stored in a DICOM file from its header
+
+    Parameters
+    ----------
+    fspath : str or os.PathLike
+        the path to the DICOM file
+
+    Returns
+    -------
+    int or None
+        the number of frames, None if the file doesn't have a NumberOfFrames element
+        (i.e. it is a single-frame image)
+    """
+    value = read_dicom_tags(fspath, ["NumberOfFrames"]).get("NumberOfFrames")
+    if value is None or value == "":
+        return None
+    return int(value)  # type: ignore[arg-type]
+
+
+def dicom_sort_key(dicom: Dicom) -> ty.Tuple[float, int, str]:
+    """Sorts DICOM images spatially, by the projection of their position onto the
+    normal to the slice plane, then by their instance number and SOPInstanceUID so that
+    images without positions, or at the same position (e.g. the echoes of multi-echo
+    series), are still sorted deterministically"""
+    index = get_header_index()
+    if index is not None:
+        tags = read_indexed_dicom_tags(dicom.fspath, SORT_KEYWORDS, index)
+    else:
+        tags = read_dicom_tags(dicom.fspath, SORT_KEYWORDS)  # type: ignore[assignment]
+    return (
+        slice_location(
+            tags.get("ImagePositionPatient"), tags.get("ImageOrientationPatient")
+        ),
+        _instance_number(tags.get("InstanceNumber")),
+        str(tags.get("SOPInstanceUID") or ""),
+    )
 
-def dicom_sort_key(dicom: Dicom) -> str:
-    """Sorts DICOM objects by SOPInstanceUID"""
-    assert isinstance(dicom.metadata, dict)
-    return dicom.metadata["SOPInstanceUID"]  # type: ignore[no-any-return]
 
+SORT_KEYWORDS = [
+    "ImagePositionPatient",
+    "ImageOrientationPatient",
+    "InstanceNumber",
+    "SOPInstanceUID",
+]
 
-class DicomCollection(MedicalImage, TypedCollection):
+
+def slice_location(position: DicomValueType, orientation: DicomValueType) -> float:
+    """The projection of the position of a slice onto the normal to its plane, i.e. its
+    location along the axis the slices of a series are stacked along
+
+    Parameters
+    ----------
+    position : str
+        the ImagePositionPatient of the slice as read from the header
+    orientation : str
+        the ImageOrientationPatient of the slice as read from the header
+
+    Returns
+    -------
+    float
+        the location of the slice, 0.0 if its position or orientation is missing or
+        invalid
+    """
+    try:
+        x, y, z = (float(v) for v in str(position).split("\\"))
+        r1, r2, r3, c1, c2, c3 = (float(v) for v in str(orientation).split("\\"))
+    except ValueError:
+        return 0.0
+    return x * (r2 * c3 - r3 * c2) + y * (r3 * c1 - r1 * c3) + z * (r1 * c2 - r2 * c1)
+
+
+class DicomCollection(DicomModalityMixin, MedicalImage, TypedCollection):
     """Base class for collections of DICOM files, which can either be stored within a
     directory (DicomDir) or presented as a flat list (DicomSeries)
     """
@@ -55,11 +281,45 @@ class DicomCollection(MedicalImage, TypedCollection):
     def __len__(self) -> int:
         return len(self.contents)
 
+    @property
+    def _modality_fspath(self) -> Path:
+        # All images in a series share the same modality so only the first file found
+        # needs to be read, avoiding sorting the contents by their headers
+        fspaths = sorted(self.fspaths)
+        if len(fspaths) == 1 and fspaths[0].is_dir():
+            fspaths = sorted(
+                p for p in fspaths[0].iterdir() if not p.name.startswith(".")
+            )
+        return fspaths[0]
+
     @extra
     def series_number(self) -> str:
         raise NotImplementedError
 
 
+class DicomInstanceRecord:
+    """A compact record of a DICOM file that has been assigned to a series, used to
+    keep track of the files of series that haven't been yielded yet by
+    ``DicomSeries.iter_from_paths``
+
+    Parameters
+    ----------
+    fspath : str
+        the path to the file
+    instance_number : int
+        the instance number of the image in the series, 0 if it isn't present
+    """
+
+    __slots__ = ("fspath", "instance_number")
+
+    def __init__(self, fspath: str, instance_number: int):
+        self.fspath = fspath
+        self.instance_number = instance_number
+
+    def __repr__(self) -> str:
+        return f"{type(self).__name__}({self.fspath!r}, {self.instance_number})"
+
+
 class DicomDir(TypedDirectory, DicomCollection):
     content_types = (DicomImage,)
 
@@ -76,6 +336,9 @@ class DicomSeries(TypedSet, DicomCollection):
         cls,
         fspaths: ty.Iterable[Path],
         common_ok: bool = False,
+        max_workers: ty.Optional[int] = None,
+        pool: ty.Union[str, concurrent.futures.Executor] = "thread",
+        classify_modality: bool = False,
         **kwargs: ty.Any,
     ) -> ty.Tuple[ty.Set[Self], ty.Set[Path]]:
         """Separates a list of DICOM files into separate series from the file-system
@@ -88,25 +351,248 @@ class DicomSeries(TypedSet, DicomCollection):
         common_ok : bool, optional
             included to match the signature of the overridden method, but ignored as each
             dicom should belong to only one series.
-        specific_tags : ty.Optional[TagListType], optional
-            the DICOM tags to read from the files. If None, the default tags will be
-            read
+        max_workers : int, optional
+            the maximum number of workers used to read the file headers, by default
+            the default of the executor type
+        pool : str or concurrent.futures.Executor, optional
+            the type of worker pool to read the headers with, either "thread" or
+            "process", or an existing executor to submit the reads to, by default
+            "thread"
+        classify_modality : bool, optional
+            whether to read the Modality tag along with the series IDs and return each
+            series as the type classified by its imaging modality (e.g.
+            ``DicomSeries[Mri]``, see ``classify_modality``), by default False
         **kwargs : ty.Any
-            additional keyword arguments to passed through to the DicomImage constructor
+            additional keyword arguments to passed through to the DicomSeries constructor
 
         Returns
         -------
         tuple[set[DicomSeries], set[Path]]
             the found dicom series objects and any unrecognised file paths
         """
-        dicoms, remaining = DicomImage.from_paths(
-            fspaths, common_ok=common_ok, **kwargs
-        )
+        id_keys: ty.Tuple[str, ...] = cls.ID_KEYS
+        if classify_modality:
+            # Images in the same series share the same modality so it can be included
+            # in the IDs the files are grouped by
+            id_keys += ("Modality",)
         series_dict = defaultdict(list)
-        for dicom in dicoms:
-            metadata = dicom.read_metadata(metadata_keys=cls.ID_KEYS)
-            series_dict[tuple(metadata[k] for k in cls.ID_KEYS)].append(dicom)
-        return set([cls(d.fspath for d in s) for s in series_dict.values()]), remaining
+        remaining = set()
+        for fspath, ids in cls.scan_series_ids(
+            fspaths, max_workers=max_workers, pool=pool, id_keys=id_keys
+        ):
+            if ids is None:
+                remaining.add(fspath)
+            else:
+                series_dict[ids].append(fspath)
+        series = set()
+        for ids, series_fspaths in series_dict.items():
+            klass = cls._modality_type(ids[-1]) if classify_modality else cls
+            series.add(klass(series_fspaths, **kwargs))
+        return series, remaining
+
+    @classmethod
+    def iter_from_paths(
+        cls,
+        fspaths: ty.Iterable[Path],
+        scope: ty.Optional[str] = None,
+        series_complete: ty.Optional[
+            ty.Callable[[ty.Tuple[DicomValueType, ...], int], bool]
+        ] = None,
+        max_workers: ty.Optional[int] = None,
+        pool: ty.Union[str, concurrent.futures.Executor] = "thread",
+        chunk_size: int = 256,
+        classify_modality: bool = False,
+        on_unrecognised: ty.Optional[ty.Callable[[Path], None]] = None,
+        **kwargs: ty.Any,
+    ) -> ty.Iterator[Self]:
+        """Separates a stream of DICOM files into series like ``from_paths``, but
+        consumes the paths in chunks and yields each series as soon as it is complete,
+        so arbitrarily long (e.g. continuously ingested) lists of files can be split
+        in bounded memory.
+
+        Until a series is yielded, only the path and instance number of each of its
+        files is held (see ``DicomInstanceRecord``). A series is complete when either
+
+        * ``series_complete`` returns True for it after a chunk containing its files
+          has been read
+        * the scope is "directory" and a file in another directory is encountered,
+          i.e. series are assumed not to span directories and files are expected to
+          be listed directory by directory (e.g. by ``os.walk``)
+        * the end of the paths is reached
+
+        Files belonging to a series that has already been yielded start a new one.
+
+        Parameters
+        ----------
+        fspaths : ty.Iterable[Path]
+            the fspaths pointing to the DICOM files
+        scope : str, optional
+            the scope series are grouped within, either None to group across all the
+            paths or "directory" to only group files within the same directory, by
+            default None
+        series_complete : Callable[[tuple[Any, ...], int], bool], optional
+            called with the values of the ID keys (see ``ID_KEYS``) of each series
+            files were added to and the number of files the series has, which returns
+            whether the series is complete, e.g. when the expected number of images
+            have been received
+        max_workers : int, optional
+            the maximum number of workers used to read the file headers, by default
+            the default of the executor type
+        pool : str or concurrent.futures.Executor, optional
+            the type of worker pool to read the headers with, either "thread" or
+            "process", or an existing executor to submit the reads to, by default
+            "thread"
+        chunk_size : int, optional
+            the number of files read by each job submitted to the pool, by default 256
+        classify_modality : bool, optional
+            whether to yield each series as the type classified by its imaging
+            modality (see ``from_paths``), by default False
+        on_unrecognised : Callable[[Path], None], optional
+            called with the paths that aren't DICOM files, which are otherwise ignored
+        **kwargs : ty.Any
+            additional keyword arguments to passed through to the DicomSeries constructor
+
+        Yields
+        ------
+        DicomSeries
+            the series, with their files sorted by instance number
+
+        Raises
+        ------
+        ValueError
+            if the scope isn't recognised
+        """
+        if scope not in (None, "directory"):
+            raise ValueError(
+                f"Unrecognised scope {scope!r}, should be None or 'directory'"
+            )
+        num_ids = len(cls.ID_KEYS)
+        keys: ty.Tuple[str, ...] = cls.ID_KEYS + ("InstanceNumber",)
+        if classify_modality:
+            keys += ("Modality",)
+        series_dict: ty.Dict[
+            ty.Tuple[DicomValueType, ...], ty.List[DicomInstanceRecord]
+        ] = {}
+        current_dir: ty.Optional[Path] = None
+
+        def make_series(
+            ids: ty.Tuple[DicomValueType, ...], records: ty.List[DicomInstanceRecord]
+        ) -> ty.Any:
+            klass = cls._modality_type(ids[-1]) if classify_modality else cls
+            records.sort(key=lambda r: (r.instance_number, r.fspath))
+            return klass([r.fspath for r in records], **kwargs)
+
+        def add_chunk(
+            scanned: ty.List[
+                ty.Tuple[Path, ty.Optional[ty.Tuple[DicomValueType, ...]]]
+            ],
+        ) -> ty.Iterator[ty.Any]:
+            nonlocal current_dir
+            updated: ty.Set[ty.Tuple[DicomValueType, ...]] = set()
+            for fspath, values in scanned:
+                if scope == "directory" and fspath.parent != current_dir:
+                    # Leaving the directory completes all the series found in it
+                    for ids in sorted(series_dict, key=str):
+                        yield make_series(ids, series_dict.pop(ids))
+                    updated.clear()
+                    current_dir = fspath.parent
+                if values is None:
+                    if on_unrecognised is not None:
+                        on_unrecognised(fspath)
+                    continue
+                ids = values[:num_ids] + values[num_ids + 1 :]
+                record = DicomInstanceRecord(
+                    str(fspath), _instance_number(values[num_ids])
+                )
+                series_dict.setdefault(ids, []).append(record)
+                updated.add(ids)
+            if series_complete is not None:
+                for ids in sorted(updated, key=str):
+                    if series_complete(ids[:num_ids], len(series_dict[ids])):
+                        yield make_series(ids, series_dict.pop(ids))
+
+        index = get_header_index()
+        chunks = _chunked((Path(p) for p in fspaths), chunk_size)
+        # Results are processed in the order the paths were provided in so that the
+        # end of each directory can be detected, with the number of pending jobs
+        # bounded so the paths are consumed lazily
+        max_pending = 4 * (max_workers or os.cpu_count() or 1)
+        with worker_pool(pool, max_workers) as executor:
+            pending: ty.Deque[
+                concurrent.futures.Future[
+                    ty.List[ty.Tuple[Path, ty.Optional[ty.Tuple[DicomValueType, ...]]]]
+                ]
+            ] = deque()
+            for chunk in chunks:
+                pending.append(executor.submit(_read_series_ids, chunk, keys, index))
+                if len(pending) >= max_pending:
+                    yield from add_chunk(pending.popleft().result())
+            while pending:
+                yield from add_chunk(pending.popleft().result())
+        for ids in sorted(series_dict, key=str):
+            yield make_series(ids, series_dict.pop(ids))
+
+    @classmethod
+    def _modality_type(cls, modality: DicomValueType) -> ty.Type[Self]:
+        """The type classified by the imaging modality corresponding to the code"""
+        classifier = dicom_modality_classifier(str(modality) if modality else None)
+        return _modality_classified_type(cls, classifier)  # type: ignore[return-value]
+
+    @classmethod
+    def scan_series_ids(
+        cls,
+        fspaths: ty.Iterable[Path],
+        max_workers: ty.Optional[int] = None,
+        pool: ty.Union[str, concurrent.futures.Executor] = "thread",
+        chunk_size: int = 256,
+        id_keys: ty.Optional[ty.Tuple[str, ...]] = None,
+    ) -> ty.Iterator[ty.Tuple[Path, ty.Optional[ty.Tuple[DicomValueType, ...]]]]:
+        """Reads the values of the series ID keys (see ``ID_KEYS``) from the headers of
+        the given files across a pool of workers, yielding them as they are read
+
+        Parameters
+        ----------
+        fspaths : ty.Iterable[Path]
+            the fspaths pointing to the DICOM files
+        max_workers : int, optional
+            the maximum number of workers used to read the file headers, by default
+            the default of the executor type
+        pool : str or concurrent.futures.Executor, optional
+            the type of worker pool to read the headers with, either "thread" or
+            "process", or an existing executor to submit the reads to, by default
+            "thread"
+        chunk_size : int, optional
+            the number of files read by each job submitted to the pool, by default 256
+        id_keys : tuple[str, ...], optional
+            the keywords of the tags to read, by default ``ID_KEYS``
+
+        Yields
+        ------
+        Path
+            the path to the file
+        tuple[Any, ...] or None
+            the values of the ID keys read from the file header, or None if it isn't
+            a DICOM file. Files are yielded in the order that their jobs complete,
+            which is not necessarily the order they were provided in
+        """
+        if id_keys is None:
+            id_keys = cls.ID_KEYS
+        chunks = _chunked((Path(p) for p in fspaths), chunk_size)
+        index = get_header_index()
+        # Bound the number of pending jobs so that the paths are consumed lazily
+        max_pending = 4 * (max_workers or os.cpu_count() or 1)
+        with worker_pool(pool, max_workers) as executor:
+            futures = set()
+            for chunk in chunks:
+                futures.add(executor.submit(_read_series_ids, chunk, id_keys, index))
+                if len(futures) >= max_pending:
+                    done, futures = concurrent.futures.wait(
+                        futures, return_when=concurrent.futures.FIRST_COMPLETED
+                    )
+                    for future in done:
+                        yield from future.result()
+            for future in concurrent.futures.as_completed(futures):
+                yield from future.result()
 
     @mtime_cached_property
     def contents(self) -> ty.List[DicomImage]:
@@ -121,19 +607,20 @@ def dicom_collection_read_metadata(
 ) -> ty.Mapping[str, ty.Any]:
     # We use the "contents" property implementation in TypeSet instead of the overload
     # in DicomCollection because we don't want the metadata to be read ahead of the
-    # the `select_metadata` call below
+    # the `select_metadata` call below. Its uncached function is called so the unsorted
+    # contents don't replace the sorted ones in the cache the two properties share
     base_class: ty.Union[ty.Type[TypedSet], ty.Type[TypedDirectory]] = (
         TypedSet if isinstance(collection, DicomSeries) else TypedDirectory
     )
     return collate_metadata_series(
-        [d.metadata for d in base_class.contents.__get__(collection)]
+        [d.metadata for d in base_class.contents.func(collection)]
     )
 
 
 def get_dicom_tag(
     file: ty.Union[str, os.PathLike[ty.Any], ty.BinaryIO],
     target_tag: ty.Tuple[int, int],
-) -> ty.Union[str, bytes, None]:
+) -> DicomValueType:
     """A basic function to read a DICOM file and extract the value of a specific tag.
     This is a low-level function that does not use any external libraries.
     It is not a replacement for pydicom, but can be used to extract specific tags
@@ -149,57 +636,576 @@ def get_dicom_tag(
 
     Returns
     -------
-    str or bytes or None
+    str or bytes or int or float or tuple or None
         The value of the specified DICOM tag, decoded as a string if possible.
         If the tag is not found or cannot be decoded, returns None.
     """
+    return read_dicom_tags(file, [target_tag]).get(target_tag)
+
+
+def read_dicom_tags(
+    file: ty.Union[str, os.PathLike[ty.Any], ty.BinaryIO],
+    tags: ty.Iterable[DicomTagType],
+) -> ty.Dict[DicomTagType, DicomValueType]:
+    """Reads the values of several DICOM tags in a single pass through the header of a
+    DICOM file, without using any external libraries.
+
+    Values of elements that aren't requested are skipped over rather than read, and
+    the scan stops as soon as all the requested tags have been found, a tag greater
+    than the largest requested one is encountered or the pixel data group (7FE0) is
+    reached, so the pixel data is never read. Both explicit and implicit VR, and little
+    and big endian, transfer syntaxes are supported (as well as deflated ones).
+
+    Parameters
+    ----------
+    file : str or os.PathLike or BinaryIO
+        The path to the DICOM file or a binary stream positioned at its start
+    tags : Iterable[tuple[int, int] or tuple[str, str] or str]
+        The tags to read, either as (group, element) tuples of ints or hex strings
+        (e.g. ``("0020", "0011")``) or as keywords (e.g. ``"SeriesNumber"``) for the
+        commonly used tags listed in ``DICOM_KEYWORDS``.
+
+    Returns
+    -------
+    dict[tuple[int, int] or tuple[str, str] or str, Any]
+        The decoded values of the tags that were found, keyed by the tags as they were
+        requested. Text values are decoded to strings (with multiple values separated by
+        backslashes), binary numeric values to ints/floats (tuples if multi-valued) and
+        any other values are returned as bytes.
+
+    Raises
+    ------
+    TypeError
+        If file is not a path or a binary stream
+    KeyError
+        If a keyword is not found in ``DICOM_KEYWORDS``
+    """
+    requested: ty.Dict[ty.Tuple[int, int], DicomTagType] = {}
+    for tag in tags:
+        requested[_parse_dicom_tag(tag)] = tag
+    if not requested:
+        return {}
+    max_tag = max(requested)
+    found: ty.Dict[DicomTagType, DicomValueType] = {}
+    with instrumentation.span("dicom.read_header"), _open_dicom_stream(file) as stream:
+        for elem in _iter_dicom_elements(stream):
+            if elem.tag > max_tag:
+                break
+            try:
+                key = requested[elem.tag]
+            except KeyError:
+                continue
+            if elem.length == UNDEFINED_LENGTH:
+                value: DicomValueType = None
+            else:
+                value = _decode_dicom_value(
+                    elem.read_value(),
+                    elem.vr,
+                    elem.little_endian,
+                )
+            found[key] = value
+            if len(found) == len(requested):
+                break
+    return found
+
+
+# Keywords, tags and VRs of commonly used attributes, which can be referred to by
+# keyword in `read_dicom_tags` and whose VRs are used to decode values stored in
+# implicit VR transfer syntaxes
+DICOM_KEYWORDS: ty.Dict[str, ty.Tuple[ty.Tuple[int, int], str]] = {
+    "TransferSyntaxUID": ((0x0002, 0x0010), "UI"),
+    "SOPClassUID": ((0x0008, 0x0016), "UI"),
+    "ImageType": ((0x0008, 0x0008), "CS"),
+    "SOPInstanceUID": ((0x0008, 0x0018), "UI"),
+    "StudyDate": ((0x0008, 0x0020), "DA"),
+    "AcquisitionTime": ((0x0008, 0x0032), "TM"),
+    "Modality": ((0x0008, 0x0060), "CS"),
+    "Manufacturer": ((0x0008, 0x0070), "LO"),
+    "SeriesDescription": ((0x0008, 0x103E), "LO"),
+    "ManufacturerModelName": ((0x0008, 0x1090), "LO"),
+    "PatientName": ((0x0010, 0x0010), "PN"),
+    "PatientID": ((0x0010, 0x0020), "LO"),
+    "SliceThickness": ((0x0018, 0x0050), "DS"),
+    "RepetitionTime": ((0x0018, 0x0080), "DS"),
+    "EchoTime": ((0x0018, 0x0081), "DS"),
+    "InversionTime": ((0x0018, 0x0082), "DS"),
+    "EchoNumbers": ((0x0018, 0x0086), "IS"),
+    "MagneticFieldStrength": ((0x0018, 0x0087), "DS"),
+    "SpacingBetweenSlices": ((0x0018, 0x0088), "DS"),
+    "SoftwareVersions": ((0x0018, 0x1020), "LO"),
+    "ProtocolName": ((0x0018, 0x1030), "LO"),
+    "FlipAngle": ((0x0018, 0x1314), "DS"),
+    "StudyInstanceUID": ((0x0020, 0x000D), "UI"),
+    "SeriesInstanceUID": ((0x0020, 0x000E), "UI"),
+    "SeriesNumber": ((0x0020, 0x0011), "IS"),
+    "AcquisitionNumber": ((0x0020, 0x0012), "IS"),
+    "InstanceNumber": ((0x0020, 0x0013), "IS"),
+    "ImagePositionPatient": ((0x0020, 0x0032), "DS"),
+    "ImageOrientationPatient": ((0x0020, 0x0037), "DS"),
+    "SamplesPerPixel": ((0x0028, 0x0002), "US"),
+    "PhotometricInterpretation": ((0x0028, 0x0004), "CS"),
+    "NumberOfFrames": ((0x0028, 0x0008), "IS"),
+    "Rows": ((0x0028, 0x0010), "US"),
+    "Columns": ((0x0028, 0x0011), "US"),
+    "PixelSpacing": ((0x0028, 0x0030), "DS"),
+    "BitsAllocated": ((0x0028, 0x0100), "US"),
+    "BitsStored": ((0x0028, 0x0101), "US"),
+    "PixelRepresentation": ((0x0028, 0x0103), "US"),
+    "RescaleIntercept": ((0x0028, 0x1052), "DS"),
+    "RescaleSlope": ((0x0028, 0x1053), "DS"),
+}
+
+_DICOM_VRS_BY_TAG = {t: vr for t, vr in DICOM_KEYWORDS.values()}
+
+UNDEFINED_LENGTH = 0xFFFFFFFF
+PIXEL_DATA_GROUP = 0x7FE0
+PIXEL_DATA_TAG = (PIXEL_DATA_GROUP, 0x0010)
+
+IMPLICIT_VR_LITTLE_ENDIAN = "1.2.840.10008.1.2"
+EXPLICIT_VR_LITTLE_ENDIAN = "1.2.840.10008.1.2.1"
+EXPLICIT_VR_BIG_ENDIAN = "1.2.840.10008.1.2.2"
+DEFLATED_EXPLICIT_VR_LITTLE_ENDIAN = "1.2.840.10008.1.2.1.99"
+
+# VRs that are followed by two reserved bytes and a 4-byte length in explicit VR
+_LONG_LENGTH_VRS = frozenset(
+    (b"OB", b"OD", b"OF", b"OL", b"OV", b"OW", b"SQ", b"SV", b"UC", b"UN", b"UR")
+    + (b"UT", b"UV")
+)
+_TEXT_VRS = frozenset(
+    ("AE", "AS", "CS", "DA", "DS", "DT", "IS", "LO", "LT", "PN", "SH", "ST", "TM")
+    + ("UC", "UI", "UR", "UT")
+)
+_NUMERIC_VR_FORMATS = {
+    "US": "H",
+    "SS": "h",
+    "UL": "I",
+    "SL": "i",
+    "FL": "f",
+    "FD": "d",
+    "UV": "Q",
+    "SV": "q",
+}
+
+_ITEM_TAG = (0xFFFE, 0xE000)
+_ITEM_DELIMITATION_TAG = (0xFFFE, 0xE00D)
+_SEQUENCE_DELIMITATION_TAG = (0xFFFE, 0xE0DD)
+
+
+class _DicomElementHeader(ty.NamedTuple):
+    """The header of a data element, the value of which starts at `offset`"""
+
+    tag: ty.Tuple[int, int]
+    vr: str
+    length: int
+    offset: int
+    little_endian: bool
+    stream: ty.BinaryIO
+
+    def read_value(self) -> bytes:
+        self.stream.seek(self.offset)
+        return self.stream.read(self.length)
+
+
+def locate_dicom_pixel_data(
+    file: ty.Union[str, os.PathLike[ty.Any], ty.BinaryIO],
+) -> ty.Optional[ty.Tuple[int, int]]:
+    """Scans the header of a DICOM file (see ``read_dicom_tags``) to find where its
+    pixel data is stored, so that it can be read or copied without parsing the data
+    set.
+
+    Parameters
+    ----------
+    file : str or os.PathLike or BinaryIO
+        The path to the DICOM file or a binary stream positioned at its start
+
+    Returns
+    -------
+    tuple[int, int] or None
+        The offset of the pixel data from the start of the file and its length in
+        bytes, or None if the file doesn't contain native pixel data, i.e. it is
+        missing, encapsulated (compressed) or the data set is deflated
+    """
+    with _open_dicom_stream(file) as stream:
+        for elem in _iter_dicom_elements(stream, include_pixel_data=True):
+            if elem.tag == PIXEL_DATA_TAG:
+                if elem.length == UNDEFINED_LENGTH or elem.stream is not stream:
+                    return None
+                return elem.offset, elem.length
+            if elem.tag > PIXEL_DATA_TAG:
+                break
+    return None
+
+
+def _parse_dicom_tag(tag: DicomTagType) -> ty.Tuple[int, int]:
+    if isinstance(tag, str):
+        return DICOM_KEYWORDS[tag][0]
+    group, element = tag
+    if isinstance(group, str):
+        group = int(group, 16)
+    if isinstance(element, str):
+        element = int(element, 16)
+    return (group, element)
+
+
+@contextmanager
+def _open_dicom_stream(
+    file: ty.Union[str, os.PathLike[ty.Any], ty.BinaryIO],
+) -> ty.Iterator[ty.BinaryIO]:
     if isinstance(file, (str, os.PathLike)):
-        filepath = file
-        file_stream = open(filepath, "rb")
-        close_stream = True
+        with open(file, "rb", buffering=HEADER_BUFFER_SIZE) as stream:
+            instrumentation.count("file.open")
+            try:
+                yield stream
+            finally:
+                if instrumentation.is_recording():
+                    # The position of the underlying file is the extent of the file
+                    # that has been read into the buffer
+                    instrumentation.count(
+                        "file.bytes_read", stream.raw.tell()  # type: ignore[attr-defined]
+                    )
     elif hasattr(file, "read"):
-        file_stream = file  # type: ignore[assignment]
-        close_stream = False
+        yield file
     else:
         raise TypeError("file must be a path-like object or a binary stream")
 
-    try:
-        file_stream.seek(132)  # Skip preamble and 'DICM' if at file start
 
+# Size of the read buffer used when scanning headers, large enough for most headers to
+# be read in a single system call
+HEADER_BUFFER_SIZE = 64 * 1024
+
+
+def _iter_dicom_elements(
+    stream: ty.BinaryIO, include_pixel_data: bool = False
+) -> ty.Iterator[_DicomElementHeader]:
+    """Iterates over the headers of the top-level data elements of a DICOM file up to
+    the pixel data group (or past it if `include_pixel_data` is set). Values that aren't
+    read by the caller while the iterator is suspended are skipped over."""
+    start = stream.tell()
+    preamble = stream.read(132)
+    if preamble[128:132] != b"DICM":
+        # No preamble, so guess the encoding of the data set from its first element
+        stream.seek(start)
+        explicit = _looks_like_explicit_vr(stream.read(6)[4:6])
+        stream.seek(start)
+        yield from _iter_data_set_elements(stream, explicit, True, include_pixel_data)
+        return
+    transfer_syntax = None
+    # The file meta-information group is always explicit VR little endian
+    while True:
+        pos = stream.tell()
+        elem = _read_element_header(stream, True, "<")
+        if elem is None:
+            return
+        if elem.tag[0] != 0x0002:
+            stream.seek(pos)
+            break
+        if elem.tag == (0x0002, 0x0010):
+            transfer_syntax = _decode_dicom_value(elem.read_value(), "UI", True)
+        yield elem
+        stream.seek(elem.offset + elem.length)
+    if transfer_syntax == DEFLATED_EXPLICIT_VR_LITTLE_ENDIAN:
+        stream = io.BytesIO(zlib.decompress(stream.read(), -zlib.MAX_WBITS))
+    yield from _iter_data_set_elements(
+        stream,
+        explicit=transfer_syntax != IMPLICIT_VR_LITTLE_ENDIAN,
+        little_endian=transfer_syntax != EXPLICIT_VR_BIG_ENDIAN,
+        include_pixel_data=include_pixel_data,
+    )
+
+
+def _iter_data_set_elements(
+    stream: ty.BinaryIO,
+    explicit: bool,
+    little_endian: bool,
+    include_pixel_data: bool = False,
+) -> ty.Iterator[_DicomElementHeader]:
+    endian = "<" if little_endian else ">"
+    while True:
+        elem = _read_element_header(stream, explicit, endian)
+        if elem is None or (elem.tag[0] >= PIXEL_DATA_GROUP and not include_pixel_data):
+            return
+        yield elem
+        if elem.length == UNDEFINED_LENGTH:
+            stream.seek(elem.offset)
+            _skip_undefined_length(stream, explicit and elem.vr != "UN", endian)
+        else:
+            stream.seek(elem.offset + elem.length)
+
+
+def _read_element_header(
+    stream: ty.BinaryIO, explicit: bool, endian: str
+) -> ty.Optional[_DicomElementHeader]:
+    header = stream.read(8)
+    if len(header) < 8:
+        return None
+    group, element = struct.unpack(endian + "HH", header[:4])
+    tag = (group, element)
+    if group == 0xFFFE:  # items and delimiters never have a VR
+        vr = ""
+        (length,) = struct.unpack(endian + "I", header[4:])
+    elif explicit:
+        vr_bytes = header[4:6]
+        vr = vr_bytes.decode(errors="replace")
+        if vr_bytes in _LONG_LENGTH_VRS:
+            length_bytes = stream.read(4)
+            if len(length_bytes) < 4:
+                return None
+            (length,) = struct.unpack(endian + "I", length_bytes)
+        else:
+            (length,) = struct.unpack(endian + "H", header[6:])
+    else:
+        vr = _DICOM_VRS_BY_TAG.get(tag, "UN")
+        (length,) = struct.unpack(endian + "I", header[4:])
+    return _DicomElementHeader(tag, vr, length, stream.tell(), endian == "<", stream)
+
+
+def _skip_undefined_length(stream: ty.BinaryIO, explicit: bool, endian: str) -> None:
+    """Skips over the items of a sequence (or encapsulated value) of undefined length,
+    leaving the stream positioned after its sequence delimitation item"""
+    while True:
+        item = _read_element_header(stream, False, endian)
+        if item is None or item.tag == _SEQUENCE_DELIMITATION_TAG:
+            return
+        if item.tag != _ITEM_TAG:
+            raise ValueError(
+                f"Unexpected tag {item.tag} found while skipping over sequence items"
+            )
+        if item.length != UNDEFINED_LENGTH:
+            stream.seek(item.offset + item.length)
+            continue
+        # Item of undefined length, so skip its nested elements up to its delimiter
         while True:
-            tag_bytes = file_stream.read(4)
-            if len(tag_bytes) < 4:
+            elem = _read_element_header(stream, explicit, endian)
+            if elem is None:
+                return
+            if elem.tag == _ITEM_DELIMITATION_TAG:
                 break
-
-            group = int.from_bytes(tag_bytes[:2], "little")
-            element = int.from_bytes(tag_bytes[2:], "little")
-            tag = (group, element)
-
-            vr_bytes = file_stream.read(2)
-            # If the VR bytes are not purely alphabetic, assume implicit VR.
-            if vr_bytes.decode(errors="ignore").strip().isalpha():
-                vr = vr_bytes.decode()
-                if vr in {"OB", "OW", "OF", "SQ", "UT", "UN"}:
-                    file_stream.read(2)  # reserved
-                    length = int.from_bytes(file_stream.read(4), "little")
-                else:
-                    length = int.from_bytes(file_stream.read(2), "little")
+            if elem.length == UNDEFINED_LENGTH:
+                _skip_undefined_length(stream, explicit and elem.vr != "UN", endian)
             else:
-                # Implicit VR: rewind the 2 bytes and read a 4-byte length
-                file_stream.seek(-2, 1)
-                length = int.from_bytes(file_stream.read(4), "little")
-            value = file_stream.read(length)
-
-            if tag == target_tag:
-                try:
-                    return value.decode().strip()
-                except UnicodeDecodeError:
-                    return value
-    finally:
-        if close_stream:
-            file_stream.close()
-
-    return None  # Not found
+                stream.seek(elem.offset + elem.length)
+
+
+def _looks_like_explicit_vr(vr_bytes: bytes) -> bool:
+    return len(vr_bytes) == 2 and all(65 <= b <= 90 for b in vr_bytes)
+
+
+def _decode_dicom_value(raw: bytes, vr: str, little_endian: bool) -> DicomValueType:
+    if vr in _TEXT_VRS or vr == "UN":
+        try:
+            value = raw.decode()
+        except UnicodeDecodeError:
+            return raw
+        return value.rstrip("\x00").strip()
+    try:
+        fmt = _NUMERIC_VR_FORMATS[vr]
+    except KeyError:
+        if vr == "AT":
+            endian = "<" if little_endian else ">"
+            return tuple(
+                struct.unpack_from(endian + "HH", raw, i)
+                for i in range(0, len(raw) - 3, 4)
+            )
+        return raw
+    count = len(raw) // struct.calcsize(fmt)
+    values = struct.unpack(
+        ("<" if little_endian else ">") + fmt * count,
+        raw[: count * struct.calcsize(fmt)],
+    )
+    return values[0] if count == 1 else values
+
+
+def read_indexed_dicom_tags(
+    fspath: ty.Union[str, os.PathLike[str]],
+    keys: ty.Sequence[str],
+    index: HeaderIndex,
+) -> ty.Dict[str, ty.Any]:
+    """Reads the values of DICOM tags from the header index, falling back to scanning
+    the file header (see ``read_dicom_tags``) and adding the values to the index if
+    the file isn't indexed or has been modified since it was
+
+    Parameters
+    ----------
+    fspath : str or os.PathLike
+        the path to the DICOM file
+    keys : Sequence[str]
+        the keywords of the tags to read
+    index : HeaderIndex
+        the index to look the values up in
+
+    Returns
+    -------
+    dict[str, Any]
+        the values of the tags, None for tags that aren't present in the file
+    """
+    tags = index.get_tags(fspath, keys)
+    if tags is None:
+        scanned = read_dicom_tags(fspath, keys)
+        tags = {k: scanned.get(k) for k in keys}
+        index.put_tags(fspath, tags)
+    return tags
+
+
+def read_dicom_modality(fspath: ty.Union[str, os.PathLike[str]]) -> ty.Optional[str]:
+    """Reads the Modality tag from the header of a DICOM file, via the header index if
+    one is in use (see ``get_header_index``). Values are memoised on the path, size and
+    modification time of the file so each file is only scanned once while unchanged
+
+    Parameters
+    ----------
+    fspath : str or os.PathLike
+        the path to the DICOM file
+
+    Returns
+    -------
+    str or None
+        the modality code, e.g. "MR", or None if the tag isn't present
+    """
+    return _read_modality(*file_key(fspath))
+
+
+@functools.lru_cache(maxsize=65536)
+def _read_modality(path: str, size: int, mtime: int) -> ty.Optional[str]:
+    index = get_header_index()
+    if index is not None:
+        modality = read_indexed_dicom_tags(path, ["Modality"], index)["Modality"]
+    else:
+        modality = read_dicom_tags(path, ["Modality"]).get("Modality")
+    return str(modality) if modality else None
+
+
+def dicom_modality_classifier(
+    modality: ty.Optional[str],
+) -> ty.Optional[ty.Type[ContentsClassifier]]:
+    """Looks up the imaging modality classifier corresponding to a DICOM modality code,
+    i.e. the one with a matching ``dicom_modality`` attribute
+
+    Parameters
+    ----------
+    modality : str or None
+        the DICOM modality code, e.g. "MR"
+
+    Returns
+    -------
+    type[ContentsClassifier] or None
+        the corresponding classifier, e.g. ``MagneticResonanceImaging``, or None if
+        there isn't one
+    """
+    if not modality:
+        return None
+    return get_contents_ontology().by_dicom_modality.get(modality.strip().upper())
+
+
+def _modality_classified_type(
+    klass: ty.Type[MedicalImage],
+    classifier: ty.Optional[ty.Type[ContentsClassifier]],
+) -> ty.Type[MedicalImage]:
+    """Adds the modality classifier to the classifiers of the type, unless it is None
+    or the type is already classified by modality"""
+    if classifier is None or any(
+        issubclass(c, ImagingModality) for c in klass.classifiers
+    ):
+        return klass
+    if klass.is_classified:
+        unclassified = klass.unclassified  # type: ignore[attr-defined]
+    else:
+        unclassified = klass
+    return unclassified[klass.classifiers + (classifier,)]  # type: ignore[no-any-return]
+
+
+def _read_series_ids(
+    fspaths: ty.List[Path],
+    id_keys: ty.Tuple[str, ...],
+    index: ty.Optional[HeaderIndex] = None,
+) -> ty.List[ty.Tuple[Path, ty.Optional[ty.Tuple[DicomValueType, ...]]]]:
+    """Reads the series ID keys from the headers of a chunk of files, returning None
+    for paths that aren't DICOM files or whose headers can't be parsed"""
+    ids: ty.List[ty.Tuple[Path, ty.Optional[ty.Tuple[DicomValueType, ...]]]] = []
+    to_index = []
+    for fspath in fspaths:
+        if index is not None:
+            indexed = index.get_tags(fspath, id_keys)
+            if indexed is not None:
+                ids.append((fspath, tuple(_hashable(indexed[k]) for k in id_keys)))
+                continue
+        try:
+            with _open_dicom_stream(fspath) as stream:
+                if stream.read(132)[128:] != Dicom.magic_number:
+                    ids.append((fspath, None))
+                    continue
+                stream.seek(0)
+                tags = read_dicom_tags(stream, id_keys)
+        except (IsADirectoryError, FileNotFoundError, PermissionError):
+            ids.append((fspath, None))
+        except (ValueError, EOFError, struct.error, zlib.error) as e:
+            # A single truncated or corrupt file shouldn't abort a whole ingest
+            logger.warning("Could not read the header of %s: %s", fspath, e)
+            ids.append((fspath, None))
+        else:
+            ids.append((fspath, tuple(tags.get(k) for k in id_keys)))
+            to_index.append((fspath, {k: tags.get(k) for k in id_keys}))
+    if index is not None and to_index:
+        index.put_many_tags(to_index)
+    return ids
+
+
+def _instance_number(value: DicomValueType) -> int:
+    """Converts an InstanceNumber value to an int, 0 if it is missing or invalid"""
+    try:
+        return int(value)  # type: ignore[arg-type]
+    except (TypeError, ValueError):
+        return 0
+
+
+def _hashable(value: ty.Any) -> ty.Any:
+    """Converts lists loaded from JSON back into tuples"""
+    if isinstance(value, list):
+        return tuple(_hashable(v) for v in value)
+    return value
+
+
+@contextmanager
+def worker_pool(
+    pool: ty.Union[str, concurrent.futures.Executor], max_workers: ty.Optional[int]
+) -> ty.Iterator[concurrent.futures.Executor]:
+    """Context manager that provides an executor to run jobs over many DICOM files with,
+    either a new thread or process pool or an existing executor (which is left open)
+
+    Parameters
+    ----------
+    pool : str or concurrent.futures.Executor
+        the type of worker pool to create, "thread" or "process", or an existing
+        executor to use
+    max_workers : int, optional
+        the maximum number of workers in a new pool
+
+    Yields
+    ------
+    concurrent.futures.Executor
+        the executor to submit the jobs to
+    """
+    if isinstance(pool, concurrent.futures.Executor):
+        yield pool
+    elif pool == "thread":
+        with concurrent.futures.ThreadPoolExecutor(max_workers) as executor:
+            yield executor
+    elif pool == "process":
+        with concurrent.futures.ProcessPoolExecutor(max_workers) as executor:
+            yield executor
+    else:
+        raise ValueError(
+            f"Unrecognised worker pool type {pool!r}, should be 'thread', 'process' or "
+            "an instance of concurrent.futures.Executor"
+        )
+
+
+T = ty.TypeVar("T")
+
+
+def _chunked(iterable: ty.Iterable[T], size: int) -> ty.Iterator[ty.List[T]]:
+    iterator = iter(iterable)
+    while chunk := list(itertools.islice(iterator, size)):
+        yield chunk
 
 
 # class Vnd_Siemens_Vision(DicomImage):
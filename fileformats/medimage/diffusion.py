@@ -1,11 +1,10 @@
 import typing
-from fileformats.core import extra, validated_property
+from fileformats.core import extra, validated_property, mtime_cached_property
 from fileformats.core.typing import TypeAlias
 from fileformats.core.mixin import WithAdjacentFiles
 from fileformats.generic import BinaryFile
 from .nifti import NiftiGzX, NiftiGz, Nifti1, NiftiX
 
-
 if typing.TYPE_CHECKING:
     import numpy.typing  # noqa: F401
 
@@ -15,24 +14,45 @@ EncodingArrayType: TypeAlias = (
 
 
 class DwiEncoding:
+    """Mixin for file-sets containing diffusion encodings. The encodings and the shells
+    they are clustered into are cached until the files are modified"""
+
+    # The maximum difference between b-values (in s/mm^2) that are considered to belong
+    # to the same shell
+    shell_tolerance: float = 50.0
+
     @extra
     def read_encodings(self) -> EncodingArrayType:
         "Both the gradient direction and weighting combined into a single Nx4 array"
         raise NotImplementedError
 
-    @property
+    @mtime_cached_property
     def encodings_array(self) -> EncodingArrayType:
         return self.read_encodings()
 
     @property
     def directions(self) -> EncodingArrayType:
         "gradient direction and weighting combined into a single Nx4 array"
-        return self.encodings_array[:, :3]
+        return self.encodings_array[:, :3]  # type: ignore[arg-type]
 
     @property
     def b_values(self) -> EncodingArrayType:
         "the b-value weighting"
-        return self.encodings_array[:, 3]
+        return self.encodings_array[:, 3]  # type: ignore[arg-type]
+
+    @property
+    def shells(self) -> EncodingArrayType:
+        "the b-values of the shells the encodings are acquired on, in ascending order"
+        return self._shell_clusters[0]  # type: ignore[arg-type]
+
+    @property
+    def shell_indices(self) -> EncodingArrayType:
+        "the index of the shell (see `shells`) that each encoding belongs to"
+        return self._shell_clusters[1]  # type: ignore[arg-type]
+
+    @mtime_cached_property
+    def _shell_clusters(self) -> typing.Tuple[EncodingArrayType, EncodingArrayType]:
+        return cluster_shells(self.b_values, self.shell_tolerance)
 
 
 class Bval(BinaryFile):
@@ -55,14 +75,45 @@ class Bvec(WithAdjacentFiles, DwiEncoding, BinaryFile):
 
     @validated_property
     def num_encodings(self) -> int:
-        num_bvals = len(self.b_values_file.read_array())
-        num_bvecs = len(self.directions)
-        if num_bvals != num_bvecs:
-            raise ValueError(
-                f"The number of b-values ({num_bvals}) does not match the number of "
-                f"directions {num_bvecs}"
-            )
-        return num_bvals
+        # The numbers of b-values and directions are checked against each other when
+        # the encodings are read
+        return len(self.encodings_array)
+
+
+def cluster_shells(
+    b_values: EncodingArrayType, tolerance: float
+) -> typing.Tuple[EncodingArrayType, EncodingArrayType]:
+    """Groups b-values into shells, starting a new shell wherever the gap between
+    consecutive sorted b-values is larger than the tolerance
+
+    Parameters
+    ----------
+    b_values : numpy.ndarray
+        the b-values of the encodings
+    tolerance : float
+        the maximum difference between consecutive b-values in the same shell
+
+    Returns
+    -------
+    shells : numpy.ndarray
+        the mean b-value of each shell, in ascending order
+    indices : numpy.ndarray
+        the index of the shell each b-value belongs to
+    """
+    import numpy
+
+    b_values = numpy.asarray(b_values, dtype=float)
+    if not b_values.size:
+        return numpy.empty(0), numpy.empty(0, dtype=int)
+    order = numpy.argsort(b_values, kind="stable")
+    sorted_b = b_values[order]
+    sorted_indices = numpy.concatenate(
+        ([0], numpy.cumsum(numpy.diff(sorted_b) > tolerance))
+    )
+    indices = numpy.empty_like(sorted_indices)
+    indices[order] = sorted_indices
+    shells = numpy.bincount(indices, weights=b_values) / numpy.bincount(indices)
+    return shells, indices
 
 
 # NIfTI file format gzipped with BIDS side car
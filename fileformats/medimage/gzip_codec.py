@@ -0,0 +1,459 @@
+"""Block-parallel gzip compression and decompression for the gzipped image formats.
+
+Data is compressed in independent blocks across a pool of threads (zlib releases the
+GIL) and each block is written as a separate gzip member. Concatenated members are
+valid gzip (RFC 1952), so the files can be read by any standard gzip reader, like the
+output of pigz. The compressed size of each member is stored in a subfield of its
+header's "extra" field, which allows the members of files written this way to be
+located without decompressing them, and therefore decompressed in parallel too. Files
+without the subfield are decompressed serially with the standard library.
+
+The codec used by the converters and readers can be changed by calling
+``set_gzip_codec``, and the number of threads used by the default codec by setting the
+``FILEFORMATS_MEDIMAGE_GZIP_THREADS`` environment variable (1 to disable threading).
+"""
+
+import os
+import io
+import gzip
+import zlib
+import shutil
+import struct
+import typing as ty
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+
+GZIP_THREADS_ENV_VAR = "FILEFORMATS_MEDIMAGE_GZIP_THREADS"
+
+# The amount of uncompressed data in each independently compressed member
+GZIP_BLOCK_SIZE = 1024 * 1024
+
+DEFAULT_COMPRESS_LEVEL = 6
+
+# Member header with the FEXTRA flag set, containing a single "MI" subfield that holds
+# the compressed size of the member (header and trailer included)
+_MEMBER_HEADER = struct.Struct("<2sBBIBBH2sHI")
+_MEMBER_TRAILER = struct.Struct("<II")
+_GZIP_MAGIC = b"\x1f\x8b"
+_FEXTRA = 0x04
+_SIZE_SUBFIELD_ID = b"MI"
+_OS_UNKNOWN = 255
+
+
+class GzipCodec:
+    """Compresses and decompresses gzip streams serially using the standard library"""
+
+    def open(
+        self,
+        fspath: ty.Union[str, os.PathLike[str]],
+        mode: str = "rb",
+        compresslevel: int = DEFAULT_COMPRESS_LEVEL,
+    ) -> ty.BinaryIO:
+        """Opens a gzipped file for reading or writing
+
+        Parameters
+        ----------
+        fspath : str or os.PathLike
+            path to the gzipped file
+        mode : str, optional
+            either "rb" or "wb", by default "rb"
+        compresslevel : int, optional
+            the zlib compression level to write with, by default 6
+
+        Returns
+        -------
+        BinaryIO
+            file object that reads/writes uncompressed data
+        """
+        _check_mode(mode)
+        return gzip.open(  # type: ignore[return-value]
+            fspath, mode, compresslevel=compresslevel
+        )
+
+    def __repr__(self) -> str:
+        return f"{type(self).__name__}()"
+
+
+class ParallelGzipCodec(GzipCodec):
+    """Compresses gzip streams in independent blocks across a pool of threads, and
+    decompresses streams written that way in parallel
+
+    Parameters
+    ----------
+    threads : int, optional
+        the number of threads to use, by default the number of CPUs
+    block_size : int, optional
+        the amount of uncompressed data in each block, by default 1 MiB
+    """
+
+    def __init__(
+        self, threads: ty.Optional[int] = None, block_size: int = GZIP_BLOCK_SIZE
+    ):
+        self.threads = threads if threads else (os.cpu_count() or 1)
+        self.block_size = block_size
+
+    def open(
+        self,
+        fspath: ty.Union[str, os.PathLike[str]],
+        mode: str = "rb",
+        compresslevel: int = DEFAULT_COMPRESS_LEVEL,
+    ) -> ty.BinaryIO:
+        _check_mode(mode)
+        raw: io.RawIOBase
+        if mode == "rb":
+            # Streams that weren't written by this codec (e.g. by gzip or the standard
+            # library) can only be decompressed serially, so are read with the
+            # standard library without setting up the parallel reader
+            with open(fspath, "rb") as f:
+                header = f.read(_MEMBER_HEADER.size)
+            if _member_size(header) is None:
+                return super().open(fspath, mode)
+            raw = ParallelGzipReader(fspath, self.threads)
+            return io.BufferedReader(raw, self.block_size)
+        raw = ParallelGzipWriter(fspath, self.threads, self.block_size, compresslevel)
+        return io.BufferedWriter(raw, self.block_size)
+
+    def __repr__(self) -> str:
+        return f"{type(self).__name__}(threads={self.threads})"
+
+
+class ParallelGzipWriter(io.RawIOBase):
+    """Writes a gzip stream, compressing blocks of the data written to it in parallel
+    and writing them in order as separate members"""
+
+    def __init__(
+        self,
+        fspath: ty.Union[str, os.PathLike[str]],
+        threads: int,
+        block_size: int = GZIP_BLOCK_SIZE,
+        compresslevel: int = DEFAULT_COMPRESS_LEVEL,
+    ):
+        self._file = open(fspath, "wb")
+        self._executor = ThreadPoolExecutor(threads)
+        self._max_pending = 2 * threads
+        self._pending: ty.Deque[Future[bytes]] = deque()
+        self._buffer = bytearray()
+        self._block_size = block_size
+        self._level = compresslevel
+        self._num_members = 0
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data: ty.Any) -> int:
+        with memoryview(data) as view:
+            self._buffer += view
+            size = view.nbytes
+        while len(self._buffer) >= self._block_size:
+            self._submit(bytes(self._buffer[: self._block_size]))
+            del self._buffer[: self._block_size]
+        return size
+
+    def close(self) -> None:
+        if self.closed:
+            return
+        try:
+            if self._buffer or not self._num_members:
+                self._submit(bytes(self._buffer))
+                self._buffer.clear()
+            while self._pending:
+                self._file.write(self._pending.popleft().result())
+        finally:
+            self._executor.shutdown()
+            self._file.close()
+            super().close()
+
+    def _submit(self, block: bytes) -> None:
+        self._pending.append(self._executor.submit(compress_member, block, self._level))
+        self._num_members += 1
+        while len(self._pending) > self._max_pending:
+            self._file.write(self._pending.popleft().result())
+
+
+class ParallelGzipReader(io.RawIOBase):
+    """Reads a gzip stream, decompressing members written by ``ParallelGzipWriter``
+    ahead of the read position in parallel. Other gzip streams are decompressed
+    serially. Seeking backwards restarts decompression from the start of the file."""
+
+    def __init__(self, fspath: ty.Union[str, os.PathLike[str]], threads: int):
+        self._fspath = fspath
+        self._threads = threads
+        self._executor: ty.Optional[ThreadPoolExecutor] = None
+        self._position = 0
+        self._start()
+
+    def readable(self) -> bool:
+        return True
+
+    def seekable(self) -> bool:
+        return True
+
+    def tell(self) -> int:
+        return self._position
+
+    def readinto(self, buffer: ty.Any) -> int:
+        with memoryview(buffer) as view, view.cast("B") as out:
+            while self._offset >= len(self._block):
+                if not self._next_block():
+                    return 0
+            size = min(len(out), len(self._block) - self._offset)
+            out[:size] = self._block[self._offset : self._offset + size]
+        self._offset += size
+        self._position += size
+        return size
+
+    def seek(self, offset: int, whence: int = io.SEEK_SET) -> int:
+        if whence == io.SEEK_CUR:
+            offset += self._position
+        elif whence == io.SEEK_END:
+            while self.read(GZIP_BLOCK_SIZE):
+                pass
+            offset += self._position
+        elif whence != io.SEEK_SET:
+            raise ValueError(f"Invalid whence ({whence})")
+        if offset < 0:
+            raise ValueError(f"Negative seek position {offset}")
+        if offset < self._position:
+            self._restart()
+        while self._position < offset:
+            if not self.read(min(offset - self._position, GZIP_BLOCK_SIZE)):
+                break
+        return self._position
+
+    def close(self) -> None:
+        if self.closed:
+            return
+        self._stop()
+        super().close()
+
+    def _start(self) -> None:
+        self._file: ty.BinaryIO = open(self._fspath, "rb")
+        self._block = b""
+        self._offset = 0
+        self._position = 0
+        self._pending: ty.Deque[Future[bytes]] = deque()
+        self._serial: ty.Optional[gzip.GzipFile] = None
+        self._next_member = 0
+
+    def _stop(self) -> None:
+        for future in self._pending:
+            future.cancel()
+        if self._executor is not None:
+            self._executor.shutdown()
+            self._executor = None
+        if self._serial is not None:
+            self._serial.close()
+        self._file.close()
+
+    def _restart(self) -> None:
+        self._stop()
+        self._start()
+
+    def _next_block(self) -> bool:
+        if self._serial is None:
+            self._schedule()
+        if self._pending:
+            self._block = self._pending.popleft().result()
+        elif self._serial is not None:
+            self._block = self._serial.read(GZIP_BLOCK_SIZE)
+        else:
+            self._block = b""
+        self._offset = 0
+        return bool(self._block)
+
+    def _schedule(self) -> None:
+        """Reads the next members from the file and submits them for decompression,
+        switching to serial decompression when a member without its size is found"""
+        while self._serial is None and len(self._pending) < 2 * self._threads:
+            self._file.seek(self._next_member)
+            header = self._file.read(_MEMBER_HEADER.size)
+            if not header:
+                return
+            size = _member_size(header)
+            if size is None:
+                self._file.seek(self._next_member)
+                self._serial = gzip.GzipFile(fileobj=self._file, mode="rb")
+                return
+            self._file.seek(self._next_member)
+            member = self._file.read(size)
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(self._threads)
+            self._pending.append(self._executor.submit(decompress_member, member))
+            self._next_member += size
+
+
+def compress_member(data: bytes, compresslevel: int = DEFAULT_COMPRESS_LEVEL) -> bytes:
+    """Compresses data into a single gzip member that records its own compressed size
+
+    Parameters
+    ----------
+    data : bytes
+        the data to compress, less than 4 GiB
+    compresslevel : int, optional
+        the zlib compression level, by default 6
+
+    Returns
+    -------
+    bytes
+        the gzip member
+    """
+    compressor = zlib.compressobj(compresslevel, zlib.DEFLATED, -zlib.MAX_WBITS)
+    deflated = compressor.compress(data) + compressor.flush()
+    size = _MEMBER_HEADER.size + len(deflated) + _MEMBER_TRAILER.size
+    header = _MEMBER_HEADER.pack(
+        _GZIP_MAGIC,
+        zlib.DEFLATED,
+        _FEXTRA,
+        0,
+        0,
+        _OS_UNKNOWN,
+        8,
+        _SIZE_SUBFIELD_ID,
+        4,
+        size,
+    )
+    trailer = _MEMBER_TRAILER.pack(zlib.crc32(data), len(data) & 0xFFFFFFFF)
+    return header + deflated + trailer
+
+
+def decompress_member(member: bytes) -> bytes:
+    """Decompresses a single gzip member written by ``compress_member``
+
+    Parameters
+    ----------
+    member : bytes
+        the gzip member
+
+    Returns
+    -------
+    bytes
+        the decompressed data
+
+    Raises
+    ------
+    ValueError
+        if the CRC or length of the decompressed data doesn't match the member trailer
+    """
+    decompressor = zlib.decompressobj(-zlib.MAX_WBITS)
+    data = decompressor.decompress(member[_MEMBER_HEADER.size :])
+    crc, length = _MEMBER_TRAILER.unpack_from(decompressor.unused_data)
+    if crc != zlib.crc32(data) or length != len(data) & 0xFFFFFFFF:
+        raise ValueError("CRC check failed while decompressing gzip member")
+    return data
+
+
+def compress_file(
+    in_fspath: ty.Union[str, os.PathLike[str]],
+    out_fspath: ty.Union[str, os.PathLike[str]],
+    codec: ty.Optional[GzipCodec] = None,
+    compresslevel: int = DEFAULT_COMPRESS_LEVEL,
+) -> None:
+    """Gzips a file
+
+    Parameters
+    ----------
+    in_fspath : str or os.PathLike
+        the file to compress
+    out_fspath : str or os.PathLike
+        the path to write the gzipped file to
+    codec : GzipCodec, optional
+        the codec to compress with, by default the one returned by ``get_gzip_codec``
+    compresslevel : int, optional
+        the zlib compression level, by default 6
+    """
+    if codec is None:
+        codec = get_gzip_codec()
+    with (
+        open(in_fspath, "rb") as src,
+        codec.open(out_fspath, "wb", compresslevel=compresslevel) as dst,
+    ):
+        shutil.copyfileobj(src, dst, GZIP_BLOCK_SIZE)
+
+
+def decompress_file(
+    in_fspath: ty.Union[str, os.PathLike[str]],
+    out_fspath: ty.Union[str, os.PathLike[str]],
+    codec: ty.Optional[GzipCodec] = None,
+) -> None:
+    """Decompresses a gzipped file
+
+    Parameters
+    ----------
+    in_fspath : str or os.PathLike
+        the gzipped file
+    out_fspath : str or os.PathLike
+        the path to write the decompressed file to
+    codec : GzipCodec, optional
+        the codec to decompress with, by default the one returned by ``get_gzip_codec``
+    """
+    if codec is None:
+        codec = get_gzip_codec()
+    with codec.open(in_fspath, "rb") as src, open(out_fspath, "wb") as dst:
+        shutil.copyfileobj(src, dst, GZIP_BLOCK_SIZE)
+
+
+def get_gzip_codec() -> GzipCodec:
+    """Returns the codec used to compress and decompress gzipped images
+
+    Returns
+    -------
+    GzipCodec
+        the codec set by ``set_gzip_codec`` or, if it hasn't been called, a
+        ``ParallelGzipCodec`` using the number of threads in the
+        ``FILEFORMATS_MEDIMAGE_GZIP_THREADS`` environment variable (the number of CPUs
+        if not set), or a serial ``GzipCodec`` if it is set to 1
+    """
+    if _gzip_codec is not None:
+        return _gzip_codec
+    threads = int(os.environ.get(GZIP_THREADS_ENV_VAR) or 0)
+    if threads == 1:
+        return GzipCodec()
+    return ParallelGzipCodec(threads)
+
+
+def set_gzip_codec(codec: ty.Optional[GzipCodec]) -> ty.Optional[GzipCodec]:
+    """Sets the codec used to compress and decompress gzipped images, overriding the
+    one set in the environment
+
+    Parameters
+    ----------
+    codec : GzipCodec or None
+        the codec to use, or None to revert to the default
+
+    Returns
+    -------
+    GzipCodec or None
+        the codec previously set by ``set_gzip_codec``
+    """
+    global _gzip_codec
+    previous = _gzip_codec
+    _gzip_codec = codec
+    return previous
+
+
+def _member_size(header: bytes) -> ty.Optional[int]:
+    """Returns the compressed size recorded in the header of a gzip member, or None if
+    the member wasn't written by ``compress_member``"""
+    if len(header) < _MEMBER_HEADER.size:
+        return None
+    magic, method, flags, _, _, _, xlen, subfield_id, length, size = (
+        _MEMBER_HEADER.unpack(header)
+    )
+    if (
+        magic != _GZIP_MAGIC
+        or method != zlib.DEFLATED
+        or flags != _FEXTRA
+        or xlen != 8
+        or subfield_id != _SIZE_SUBFIELD_ID
+        or length != 4
+    ):
+        return None
+    return int(size)
+
+
+def _check_mode(mode: str) -> None:
+    if mode not in ("rb", "wb"):
+        raise ValueError(f"Unsupported mode {mode!r}, should be 'rb' or 'wb'")
+
+
+_gzip_codec: ty.Optional[GzipCodec] = None
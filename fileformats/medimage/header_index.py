@@ -0,0 +1,306 @@
+"""A persistent, on-disk index of values read from image headers, so that headers of
+unchanged files don't need to be parsed again in new processes.
+
+The index is disabled by default and can be enabled by either setting the
+``FILEFORMATS_MEDIMAGE_HEADER_INDEX`` environment variable to the path of the index file
+or by calling ``set_header_index``.
+"""
+
+import os
+import json
+import base64
+import sqlite3
+import importlib
+import threading
+import typing as ty
+from pathlib import Path
+from . import instrumentation
+
+HEADER_INDEX_ENV_VAR = "FILEFORMATS_MEDIMAGE_HEADER_INDEX"
+
+# Types of values that aren't native to JSON but can be reconstructed from their string
+# representation, which are stored in the index along with the name of their type
+STR_ENCODED_TYPES = ("pydicom.valuerep.PersonName",)
+
+FileKeyType = ty.Tuple[str, int, int]
+
+
+class HeaderIndex:
+    """An index of header values stored in a SQLite database, keyed by the absolute
+    path, size and modification time of each file so that entries are invalidated when
+    the files are changed.
+
+    Two types of entries are stored for each file, a set of selected tags (e.g. the
+    values used to group and sort DICOM series) and, optionally, the full metadata
+    read from the header.
+
+    Parameters
+    ----------
+    path : str or os.PathLike
+        path to the SQLite database file, which is created if it doesn't exist
+    timeout : float, optional
+        the number of seconds to wait for locks held by other processes to be released,
+        by default 30.0
+    """
+
+    def __init__(self, path: ty.Union[str, os.PathLike[str]], timeout: float = 30.0):
+        self.path = Path(path).absolute()
+        self.timeout = timeout
+        self._local = threading.local()
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with self._connection as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS headers ("
+                "path TEXT PRIMARY KEY, size INTEGER, mtime INTEGER, tags TEXT, "
+                "metadata TEXT)"
+            )
+
+    def __reduce__(self) -> ty.Tuple[ty.Any, ...]:
+        # Connections can't be pickled so the index is reopened in worker processes
+        return (type(self), (self.path, self.timeout))
+
+    def __repr__(self) -> str:
+        return f"{type(self).__name__}({str(self.path)!r})"
+
+    @property
+    def _connection(self) -> sqlite3.Connection:
+        """A connection to the database for the current thread"""
+        try:
+            conn: sqlite3.Connection = self._local.connection
+        except AttributeError:
+            conn = sqlite3.connect(self.path, timeout=self.timeout)
+            conn.execute("PRAGMA journal_mode=WAL")
+            self._local.connection = conn
+        return conn
+
+    def get_tags(
+        self, fspath: ty.Union[str, os.PathLike[str]], keys: ty.Iterable[str]
+    ) -> ty.Optional[ty.Dict[str, ty.Any]]:
+        """Returns the indexed values of the given tags for the file, or None if the
+        file isn't indexed, has changed or if any of the tags are missing
+
+        Parameters
+        ----------
+        fspath : str or os.PathLike
+            path to the file
+        keys : Iterable[str]
+            the names of the tags to return
+
+        Returns
+        -------
+        dict[str, Any] or None
+            the indexed values of the tags
+        """
+        tags = self._get(fspath, "tags")
+        try:
+            selected = {k: tags[k] for k in keys} if tags is not None else None
+        except KeyError:
+            selected = None
+        instrumentation.count(
+            "header_index.miss" if selected is None else "header_index.hit"
+        )
+        return selected
+
+    def put_tags(
+        self,
+        fspath: ty.Union[str, os.PathLike[str]],
+        tags: ty.Mapping[str, ty.Any],
+    ) -> None:
+        """Adds the values of tags read from a file to the index, merging them with any
+        values of other tags indexed for the same version of the file
+
+        Parameters
+        ----------
+        fspath : str or os.PathLike
+            path to the file
+        tags : Mapping[str, Any]
+            the values of the tags, which need to be serialisable to JSON
+        """
+        self.put_many_tags([(fspath, tags)])
+
+    def put_many_tags(
+        self,
+        entries: ty.Iterable[
+            ty.Tuple[ty.Union[str, os.PathLike[str]], ty.Mapping[str, ty.Any]]
+        ],
+    ) -> None:
+        """Adds the values of tags read from several files to the index in a single
+        transaction
+
+        Parameters
+        ----------
+        entries : Iterable[tuple[str or os.PathLike, Mapping[str, Any]]]
+            pairs of file paths and the values of the tags read from them
+        """
+        with self._connection as conn:
+            for fspath, tags in entries:
+                key = file_key(fspath)
+                existing = self._select(conn, key, "tags")
+                merged = dict(existing) if existing else {}
+                merged.update(tags)
+                self._upsert(conn, key, "tags", merged)
+
+    def get_metadata(
+        self, fspath: ty.Union[str, os.PathLike[str]]
+    ) -> ty.Optional[ty.Dict[str, ty.Any]]:
+        """Returns the full header metadata indexed for the file, or None if the file
+        isn't indexed or has changed
+
+        Parameters
+        ----------
+        fspath : str or os.PathLike
+            path to the file
+
+        Returns
+        -------
+        dict[str, Any] or None
+            the indexed metadata
+        """
+        metadata = self._get(fspath, "metadata")
+        instrumentation.count(
+            "header_index.miss" if metadata is None else "header_index.hit"
+        )
+        return metadata
+
+    def put_metadata(
+        self,
+        fspath: ty.Union[str, os.PathLike[str]],
+        metadata: ty.Mapping[str, ty.Any],
+    ) -> None:
+        """Adds the full header metadata read from a file to the index. Values of the
+        ``STR_ENCODED_TYPES`` and bytes are stored so that they are returned with the same
+        types. Metadata containing values of other types that can't be serialised to
+        JSON isn't stored, so that it is read from the file each time instead
+
+        Parameters
+        ----------
+        fspath : str or os.PathLike
+            path to the file
+        metadata : Mapping[str, Any]
+            the metadata read from the file
+        """
+        with self._connection as conn:
+            self._upsert(conn, file_key(fspath), "metadata", metadata)
+
+    def clear(self) -> None:
+        """Removes all entries from the index"""
+        with self._connection as conn:
+            conn.execute("DELETE FROM headers")
+
+    def _get(
+        self, fspath: ty.Union[str, os.PathLike[str]], column: str
+    ) -> ty.Optional[ty.Dict[str, ty.Any]]:
+        try:
+            key = file_key(fspath)
+        except FileNotFoundError:
+            return None
+        return self._select(self._connection, key, column)
+
+    @staticmethod
+    def _select(
+        conn: sqlite3.Connection, key: FileKeyType, column: str
+    ) -> ty.Optional[ty.Dict[str, ty.Any]]:
+        row = conn.execute(
+            f"SELECT {column} FROM headers WHERE path = ? AND size = ? AND mtime = ?",
+            key,
+        ).fetchone()
+        if row is None or row[0] is None:
+            return None
+        value: ty.Dict[str, ty.Any] = json.loads(row[0], object_hook=_decode_value)
+        return value
+
+    @staticmethod
+    def _upsert(
+        conn: sqlite3.Connection,
+        key: FileKeyType,
+        column: str,
+        value: ty.Mapping[str, ty.Any],
+    ) -> None:
+        try:
+            serialised = json.dumps(value, default=_encode_value)
+        except (TypeError, ValueError):
+            # Leave the entry out so the values are read from the file instead of being
+            # returned with different types
+            return
+        updated = conn.execute(
+            f"UPDATE headers SET {column} = ? WHERE path = ? AND size = ? AND mtime = ?",
+            (serialised,) + key,
+        )
+        if not updated.rowcount:
+            # Either a new file or a new version of it, so replace any stale entry
+            conn.execute(
+                f"INSERT OR REPLACE INTO headers (path, size, mtime, {column}) "
+                "VALUES (?, ?, ?, ?)",
+                key + (serialised,),
+            )
+
+
+def _encode_value(value: ty.Any) -> ty.Dict[str, str]:
+    if isinstance(value, bytes):
+        return {"__bytes__": base64.b64encode(value).decode("ascii")}
+    type_name = f"{type(value).__module__}.{type(value).__qualname__}"
+    if type_name in STR_ENCODED_TYPES:
+        return {"__type__": type_name, "value": str(value)}
+    raise TypeError(f"Values of type {type_name} can't be stored in the header index")
+
+
+def _decode_value(dct: ty.Dict[str, ty.Any]) -> ty.Any:
+    if "__bytes__" in dct:
+        return base64.b64decode(dct["__bytes__"])
+    type_name = dct.get("__type__")
+    if type_name in STR_ENCODED_TYPES:
+        module_name, name = type_name.rsplit(".", 1)
+        return getattr(importlib.import_module(module_name), name)(dct["value"])
+    return dct
+
+
+def file_key(fspath: ty.Union[str, os.PathLike[str]]) -> FileKeyType:
+    """The key that entries for a file are stored under in the index, its absolute path,
+    size and modification time (in ns)"""
+    path = os.path.abspath(fspath)
+    stat = os.stat(path)
+    return (path, stat.st_size, stat.st_mtime_ns)
+
+
+def get_header_index() -> ty.Optional[HeaderIndex]:
+    """Returns the header index that is currently in use, if any
+
+    Returns
+    -------
+    HeaderIndex or None
+        the header index set by ``set_header_index`` or, if it hasn't been called,
+        the one at the path in the ``FILEFORMATS_MEDIMAGE_HEADER_INDEX`` environment
+        variable. None if neither are set.
+    """
+    global _header_index
+    if _header_index is _UNSET:
+        path = os.environ.get(HEADER_INDEX_ENV_VAR)
+        _header_index = HeaderIndex(path) if path else None
+    return _header_index  # type: ignore[return-value]
+
+
+def set_header_index(
+    index: ty.Union[HeaderIndex, str, os.PathLike[str], None],
+) -> ty.Optional[HeaderIndex]:
+    """Sets the header index to use, overriding the one set in the environment
+
+    Parameters
+    ----------
+    index : HeaderIndex or str or os.PathLike or None
+        the index or path to the index file to use, or None to disable the index
+
+    Returns
+    -------
+    HeaderIndex or None
+        the index that was previously in use
+    """
+    global _header_index
+    previous = get_header_index()
+    if index is not None and not isinstance(index, HeaderIndex):
+        index = HeaderIndex(index)
+    _header_index = index
+    return previous
+
+
+_UNSET = object()
+_header_index: ty.Union[HeaderIndex, None, object] = _UNSET
@@ -0,0 +1,226 @@
+"""Opt-in instrumentation of the I/O performed by the medimage readers (and the
+readers, converters and caches in the extras package), which counts file opens, bytes
+read, header parses, array decodes, conversions and cache hits/misses and times the
+steps they are made in, e.g.::
+
+    with record_io() as recording:
+        series.metadata
+    print(recording.as_dict()["counters"])
+
+Nothing is recorded (and the hooks do next to nothing) unless a recording is active.
+Recordings are process-wide so they capture I/O performed by thread pools started
+while they are active, but not by process pools.
+"""
+
+import time
+import threading
+import typing as ty
+from contextlib import contextmanager
+
+SpanType = ty.Dict[str, ty.Any]
+
+
+class IORecording:
+    """The counters, timings and (optionally) individual spans recorded while a
+    ``record_io`` context is active
+
+    Parameters
+    ----------
+    keep_spans : bool, optional
+        whether to keep each timed step as a span, by default False, in which case only
+        the totals of the timings are kept
+    on_span : Callable[[dict[str, Any]], None], optional
+        called with each span as it ends, e.g. to forward it to a tracing system
+    """
+
+    def __init__(
+        self,
+        keep_spans: bool = False,
+        on_span: ty.Optional[ty.Callable[[SpanType], None]] = None,
+    ):
+        self.keep_spans = keep_spans
+        self.on_span = on_span
+        self.counters: ty.Dict[str, int] = {}
+        self.timings: ty.Dict[str, ty.List[float]] = {}
+        self.spans: ty.List[SpanType] = []
+        self._lock = threading.Lock()
+
+    def __repr__(self) -> str:
+        return f"{type(self).__name__}(counters={self.counters})"
+
+    def count(self, event: str, n: int = 1) -> None:
+        """Adds to the counter of an event
+
+        Parameters
+        ----------
+        event : str
+            the name of the event, e.g. "file.open"
+        n : int, optional
+            the number to add to the counter, by default 1
+        """
+        with self._lock:
+            self.counters[event] = self.counters.get(event, 0) + n
+
+    def add_span(self, span: SpanType) -> None:
+        """Adds a timed step to the totals of the timings (and the list of spans if
+        they are being kept)
+
+        Parameters
+        ----------
+        span : dict[str, Any]
+            the span, in the format returned by ``as_spans``
+        """
+        duration = (span["end_time_unix_nano"] - span["start_time_unix_nano"]) / 1e9
+        with self._lock:
+            timing = self.timings.setdefault(span["name"], [0, 0.0])
+            timing[0] += 1
+            timing[1] += duration
+            if self.keep_spans:
+                self.spans.append(span)
+        if self.on_span is not None:
+            self.on_span(span)
+
+    def as_dict(self) -> ty.Dict[str, ty.Any]:
+        """Exports the recorded counters and timings
+
+        Returns
+        -------
+        dict[str, Any]
+            the counters, keyed by event name, under "counters" and the number of times
+            and total time in seconds spent in each step, keyed by step name, under
+            "timings"
+        """
+        with self._lock:
+            return {
+                "counters": dict(self.counters),
+                "timings": {
+                    n: {"count": c, "total_time": t}
+                    for n, (c, t) in self.timings.items()
+                },
+            }
+
+    def as_spans(self) -> ty.List[SpanType]:
+        """Exports the recorded spans (if ``keep_spans`` is set) in the format of
+        OpenTelemetry spans, i.e. dictionaries with "name", "start_time_unix_nano",
+        "end_time_unix_nano" and "attributes" keys
+
+        Returns
+        -------
+        list[dict[str, Any]]
+            the spans in the order they ended
+        """
+        with self._lock:
+            return list(self.spans)
+
+
+@contextmanager
+def record_io(
+    keep_spans: bool = False,
+    on_span: ty.Optional[ty.Callable[[SpanType], None]] = None,
+) -> ty.Iterator[IORecording]:
+    """Records the I/O performed while the context is active
+
+    Parameters
+    ----------
+    keep_spans : bool, optional
+        whether to keep each timed step as a span, by default False
+    on_span : Callable[[dict[str, Any]], None], optional
+        called with each span as it ends
+
+    Yields
+    ------
+    IORecording
+        the recording the counters and timings are added to
+    """
+    global _recordings
+    recording = IORecording(keep_spans=keep_spans, on_span=on_span)
+    # The active recordings are replaced rather than modified so they can be iterated
+    # over by the hooks without locking
+    with _recordings_lock:
+        _recordings += (recording,)
+    try:
+        yield recording
+    finally:
+        with _recordings_lock:
+            _recordings = tuple(r for r in _recordings if r is not recording)
+
+
+def is_recording() -> bool:
+    """Whether any recordings are active, which can be checked to skip gathering values
+    that are only needed by them"""
+    return bool(_recordings)
+
+
+def count(event: str, n: int = 1) -> None:
+    """Adds to the counter of an event in all active recordings
+
+    Parameters
+    ----------
+    event : str
+        the name of the event, e.g. "file.open"
+    n : int, optional
+        the number to add to the counter, by default 1
+    """
+    for recording in _recordings:
+        recording.count(event, n)
+
+
+def span(name: str, **attributes: ty.Any) -> ty.ContextManager[None]:
+    """Times a step in all active recordings, counting it as an event of the same name
+
+    Parameters
+    ----------
+    name : str
+        the name of the step, e.g. "dicom.read_header"
+    **attributes : Any
+        attributes of the step to store with the span, e.g. the path of the file
+
+    Returns
+    -------
+    ContextManager
+        the context to run the step in
+    """
+    if not _recordings:
+        return _NULL_SPAN
+    return _Span(name, attributes)
+
+
+class _Span:
+    __slots__ = ("name", "attributes", "start")
+
+    def __init__(self, name: str, attributes: ty.Dict[str, ty.Any]):
+        self.name = name
+        self.attributes = attributes
+        self.start = 0
+
+    def __enter__(self) -> None:
+        self.start = time.time_ns()
+
+    def __exit__(self, *exc_info: ty.Any) -> None:
+        attributes = {k: str(v) for k, v in self.attributes.items()}
+        if exc_info[0] is not None:
+            attributes["exception.type"] = exc_info[0].__name__
+        span = {
+            "name": self.name,
+            "start_time_unix_nano": self.start,
+            "end_time_unix_nano": time.time_ns(),
+            "attributes": attributes,
+        }
+        for recording in _recordings:
+            recording.count(self.name)
+            recording.add_span(span)
+
+
+class _NullSpan:
+    __slots__ = ()
+
+    def __enter__(self) -> None:
+        pass
+
+    def __exit__(self, *exc_info: ty.Any) -> None:
+        pass
+
+
+_NULL_SPAN = _NullSpan()
+_recordings: ty.Tuple[IORecording, ...] = ()
+_recordings_lock = threading.Lock()
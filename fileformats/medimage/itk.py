@@ -10,6 +10,7 @@ from fileformats.image import (
 from fileformats.application import Gzip
 from .nifti import Nifti1, NiftiGz
 from .dicom import DicomImage
+from .sniffing import WithSniffedContents
 
 
 class GDCM(DicomImage):
@@ -33,7 +34,7 @@ class MetaImage(RasterImage):
     ext = ".mhd"
 
 
-class Nrrd(WithMagicNumber, RasterImage):
+class Nrrd(WithSniffedContents, WithMagicNumber, RasterImage):
 
     ext = ".nrrd"
     alternate_exts = (".nhdr",)
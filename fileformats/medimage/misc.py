@@ -1,11 +1,12 @@
+import struct
+import typing as ty
 from fileformats.application import Gzip
 from fileformats.generic import BinaryFile
-from fileformats.core import validated_property
+from fileformats.core import validated_property, extra_implementation, FileSet
 from fileformats.core.mixin import WithSeparateHeader, WithMagicVersion
 from .base import MedicalImage
 from fileformats.core.exceptions import FormatMismatchError
 
-
 # ==================
 # Other Data Formats
 # ==================
@@ -23,7 +24,7 @@ class Analyze(WithSeparateHeader, MedicalImage, BinaryFile):
     header_type = AnalyzeHeader
 
 
-class Mgh(WithMagicVersion, BinaryFile):
+class Mgh(WithMagicVersion, MedicalImage, BinaryFile):
     """
     FreeSurfer 4-dimensional brain images
 
@@ -33,6 +34,11 @@ class Mgh(WithMagicVersion, BinaryFile):
     ext = ".mgh"
     magic_pattern = rb"(....)"  # First integer is the version string
 
+    @classmethod
+    def decode_version(cls, version_bytes: bytes) -> str:
+        # The version is stored as a big-endian integer
+        return str(struct.unpack(">i", version_bytes)[0])
+
     @validated_property
     def _is_supported_version(self) -> None:
         assert isinstance(self.version, str)
@@ -51,3 +57,44 @@ class MghGz(Gzip[Mgh]):  # type: ignore[type-arg]
 
     iana_mime = "application/x-mgh+zip"
     ext = ".mgz"
+
+
+# The fields of the fixed-layout, big-endian MGH header (named as in nibabel), and the
+# orientation fields that follow them, which are only valid if "goodRASFlag" is set
+MGH_HEADER = struct.Struct(">7ih")
+MGH_RAS_HEADER = struct.Struct(">15f")
+
+
+@extra_implementation(FileSet.read_metadata)
+def mgh_read_metadata(mgh: Mgh, **kwargs: ty.Any) -> ty.Mapping[str, ty.Any]:
+    with mgh.open() as f:
+        block = f.read(MGH_HEADER.size + MGH_RAS_HEADER.size)
+    values = MGH_HEADER.unpack_from(block)
+    metadata: ty.Dict[str, ty.Any] = {
+        "version": values[0],
+        "dims": values[1:5],
+        "type": values[5],
+        "dof": values[6],
+        "goodRASFlag": values[7],
+    }
+    if metadata["goodRASFlag"]:
+        ras = MGH_RAS_HEADER.unpack_from(block, MGH_HEADER.size)
+        metadata["delta"] = ras[:3]
+        metadata["Mdc"] = (ras[3:6], ras[6:9], ras[9:12])
+        metadata["Pxyz_c"] = ras[12:]
+    else:
+        metadata["delta"] = (1.0, 1.0, 1.0)
+    return metadata
+
+
+@extra_implementation(MedicalImage.dims)
+def mgh_dims(mgh: Mgh) -> ty.Tuple[int, int, int]:
+    dims = mgh.metadata["dims"]
+    if dims[3] == 1:
+        dims = dims[:3]  # Drop singleton frame dimension
+    return tuple(dims)
+
+
+@extra_implementation(MedicalImage.vox_sizes)
+def mgh_vox_sizes(mgh: Mgh) -> ty.Tuple[float, float, float]:
+    return tuple(mgh.metadata["delta"])
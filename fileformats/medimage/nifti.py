@@ -1,8 +1,13 @@
+import os
+import gzip
+import struct
+import typing as ty
 from fileformats.generic import BinaryFile
-from fileformats.core import validated_property
+from fileformats.core import validated_property, extra_implementation, FileSet
 from fileformats.core.mixin import WithSideCars, WithMagicNumber, WithAdjacentFiles
 from fileformats.application import Json
 from fileformats.application.archive import BaseGzip
+from . import instrumentation
 from .base import MedicalImage
 
 
@@ -64,3 +69,222 @@ class NiftiWithDataFile(WithAdjacentFiles, Nifti1):
     @validated_property
     def data_file(self) -> NiftiDataFile:
         return NiftiDataFile(self.select_by_ext(NiftiDataFile))
+
+
+# =====================================================================
+# Native header parsing
+# =====================================================================
+
+NIFTI1_HEADER_SIZE = 348
+NIFTI2_HEADER_SIZE = 540
+GZIP_MAGIC = b"\x1f\x8b"
+
+# The fields of the fixed-layout NIfTI-1 and NIfTI-2 headers, as (name, struct format)
+# pairs, named as in the reference C headers (and nibabel)
+NIFTI1_HEADER_FIELDS = (
+    ("sizeof_hdr", "i"),
+    ("data_type", "10s"),
+    ("db_name", "18s"),
+    ("extents", "i"),
+    ("session_error", "h"),
+    ("regular", "1s"),
+    ("dim_info", "B"),
+    ("dim", "8h"),
+    ("intent_p1", "f"),
+    ("intent_p2", "f"),
+    ("intent_p3", "f"),
+    ("intent_code", "h"),
+    ("datatype", "h"),
+    ("bitpix", "h"),
+    ("slice_start", "h"),
+    ("pixdim", "8f"),
+    ("vox_offset", "f"),
+    ("scl_slope", "f"),
+    ("scl_inter", "f"),
+    ("slice_end", "h"),
+    ("slice_code", "B"),
+    ("xyzt_units", "B"),
+    ("cal_max", "f"),
+    ("cal_min", "f"),
+    ("slice_duration", "f"),
+    ("toffset", "f"),
+    ("glmax", "i"),
+    ("glmin", "i"),
+    ("descrip", "80s"),
+    ("aux_file", "24s"),
+    ("qform_code", "h"),
+    ("sform_code", "h"),
+    ("quatern_b", "f"),
+    ("quatern_c", "f"),
+    ("quatern_d", "f"),
+    ("qoffset_x", "f"),
+    ("qoffset_y", "f"),
+    ("qoffset_z", "f"),
+    ("srow_x", "4f"),
+    ("srow_y", "4f"),
+    ("srow_z", "4f"),
+    ("intent_name", "16s"),
+    ("magic", "4s"),
+)
+
+NIFTI2_HEADER_FIELDS = (
+    ("sizeof_hdr", "i"),
+    ("magic", "4s"),
+    ("eol_check", "4b"),
+    ("datatype", "h"),
+    ("bitpix", "h"),
+    ("dim", "8q"),
+    ("intent_p1", "d"),
+    ("intent_p2", "d"),
+    ("intent_p3", "d"),
+    ("pixdim", "8d"),
+    ("vox_offset", "q"),
+    ("scl_slope", "d"),
+    ("scl_inter", "d"),
+    ("cal_max", "d"),
+    ("cal_min", "d"),
+    ("slice_duration", "d"),
+    ("toffset", "d"),
+    ("slice_start", "q"),
+    ("slice_end", "q"),
+    ("descrip", "80s"),
+    ("aux_file", "24s"),
+    ("qform_code", "i"),
+    ("sform_code", "i"),
+    ("quatern_b", "d"),
+    ("quatern_c", "d"),
+    ("quatern_d", "d"),
+    ("qoffset_x", "d"),
+    ("qoffset_y", "d"),
+    ("qoffset_z", "d"),
+    ("srow_x", "4d"),
+    ("srow_y", "4d"),
+    ("srow_z", "4d"),
+    ("slice_code", "i"),
+    ("xyzt_units", "i"),
+    ("intent_code", "i"),
+    ("intent_name", "16s"),
+    ("dim_info", "B"),
+    ("unused_str", "15s"),
+)
+
+
+def read_nifti_header(fspath: ty.Union[str, os.PathLike[str]]) -> ty.Dict[str, ty.Any]:
+    """Reads the fixed-layout header of a NIfTI-1 or NIfTI-2 file (gzipped or not)
+    without loading the rest of the image. Only the first 540 bytes of the file are
+    read (decompressed)
+
+    Parameters
+    ----------
+    fspath : str or os.PathLike
+        path to the NIfTI file (or the ".hdr" file of a header/data file pair)
+
+    Returns
+    -------
+    dict[str, Any]
+        the values of the header fields, with array fields as tuples and character
+        fields as strings
+    """
+    with instrumentation.span("nifti.read_header"), open(fspath, "rb") as f:
+        instrumentation.count("file.open")
+        compressed = f.read(2) == GZIP_MAGIC
+        f.seek(0)
+        if compressed:
+            with gzip.GzipFile(fileobj=f) as gz:
+                block = gz.read(NIFTI2_HEADER_SIZE)
+        else:
+            block = f.read(NIFTI2_HEADER_SIZE)
+        if instrumentation.is_recording():
+            instrumentation.count("file.bytes_read", f.raw.tell())
+    return parse_nifti_header(block)
+
+
+def parse_nifti_header(block: bytes) -> ty.Dict[str, ty.Any]:
+    """Parses a NIfTI-1 or NIfTI-2 header from the leading bytes of a file, detecting
+    the version and byte order from the "sizeof_hdr" field
+
+    Parameters
+    ----------
+    block : bytes
+        the first bytes of the file, at least as long as the header
+
+    Returns
+    -------
+    dict[str, Any]
+        the values of the header fields
+
+    Raises
+    ------
+    ValueError
+        if the block doesn't start with a valid NIfTI header
+    """
+    for byte_order in "<>":
+        if len(block) < 4:
+            break
+        (sizeof_hdr,) = struct.unpack(byte_order + "i", block[:4])
+        if sizeof_hdr == NIFTI1_HEADER_SIZE:
+            header_struct = _NIFTI1_STRUCTS[byte_order]
+        elif sizeof_hdr == NIFTI2_HEADER_SIZE:
+            header_struct = _NIFTI2_STRUCTS[byte_order]
+        else:
+            continue
+        if len(block) < sizeof_hdr:
+            break
+        values = iter(header_struct.unpack(block[:sizeof_hdr]))
+        header: ty.Dict[str, ty.Any] = {}
+        for name, count, is_str in _FIELD_LAYOUTS[sizeof_hdr]:
+            if is_str:
+                header[name] = next(values).split(b"\0", 1)[0].decode("latin-1")
+            elif count > 1:
+                header[name] = tuple(next(values) for _ in range(count))
+            else:
+                header[name] = next(values)
+        return header
+    raise ValueError(
+        "Could not read NIfTI header, 'sizeof_hdr' field was not "
+        f"{NIFTI1_HEADER_SIZE} or {NIFTI2_HEADER_SIZE} in either byte order"
+    )
+
+
+@extra_implementation(FileSet.read_metadata)
+def nifti_read_metadata(nifti: Nifti, **kwargs: ty.Any) -> ty.Mapping[str, ty.Any]:
+    return read_nifti_header(nifti.fspath)
+
+
+@extra_implementation(MedicalImage.vox_sizes)
+def nifti_vox_sizes(nifti: Nifti) -> ty.Tuple[float, float, float]:
+    ndims = len(nifti_dims(nifti))
+    return tuple(float(d) for d in nifti.metadata["pixdim"][1 : ndims + 1])  # type: ignore[return-value]
+
+
+@extra_implementation(MedicalImage.dims)
+def nifti_dims(nifti: Nifti) -> ty.Tuple[int, int, int]:
+    dim_array = [int(d) for d in nifti.metadata["dim"]]
+    for i in range(1, len(dim_array)):
+        if all(d == 1 for d in dim_array[i:]):
+            break  # Stop when the remaining dimensions are singletons
+    return tuple(dim_array[1:i])  # type: ignore[return-value]
+
+
+def _field_layouts(
+    fields: ty.Tuple[ty.Tuple[str, str], ...],
+) -> ty.List[ty.Tuple[str, int, bool]]:
+    """The name, number of values and whether each field is a character array"""
+    layouts = []
+    for name, fmt in fields:
+        count = int(fmt[:-1]) if len(fmt) > 1 else 1
+        is_str = fmt.endswith("s")
+        layouts.append((name, 1 if is_str else count, is_str))
+    return layouts
+
+
+_NIFTI1_STRUCTS = {
+    o: struct.Struct(o + "".join(f for _, f in NIFTI1_HEADER_FIELDS)) for o in "<>"
+}
+_NIFTI2_STRUCTS = {
+    o: struct.Struct(o + "".join(f for _, f in NIFTI2_HEADER_FIELDS)) for o in "<>"
+}
+_FIELD_LAYOUTS = {
+    NIFTI1_HEADER_SIZE: _field_layouts(NIFTI1_HEADER_FIELDS),
+    NIFTI2_HEADER_SIZE: _field_layouts(NIFTI2_HEADER_FIELDS),
+}
@@ -0,0 +1,443 @@
+"""Detection of the format of files from a single read of the start of each file.
+
+Formats defined with the ``WithMagicNumber`` and ``WithMagicVersion`` mixins each open
+the file to check their signature when they are validated, so a file can be opened
+many times when it is matched against a long list of candidate formats. Instead, the
+``FormatSniffer`` reads the first kilobyte or so of the file once (enough to cover the
+NIfTI magic at offset 344, the "DICM" prefix at offset 128 and the "NRRD" and MGH
+version signatures at the start) and matches the signatures of all the candidates
+against it, e.g.::
+
+    sniffer = FormatSniffer()
+    nifti = sniffer.from_path("/path/to/image.nii")
+    # or, for files on high-latency (e.g. object-store backed) mounts
+    images = asyncio.run(sniffer.from_paths_batch(fspaths))
+
+While a matching format is constructed, the buffer is served to the reads made by its
+signature checks (see ``read_sniffed_contents``) so the file isn't opened again for
+them.
+"""
+
+import os
+import re
+import contextvars
+import typing as ty
+from contextlib import contextmanager
+from pathlib import Path
+from fileformats.core import FileSet
+from fileformats.core.mixin import WithMagicNumber, WithMagicVersion
+from fileformats.core.exceptions import FormatMismatchError, FormatRecognitionError
+from . import instrumentation
+
+# The minimum number of bytes read from the start of each file, which is increased if
+# the signature of a candidate format extends beyond it
+SNIFF_BUFFER_SIZE = 1024
+
+# The number of files read at the same time in the batch modes
+SNIFF_CONCURRENCY = 32
+
+FileSetType = ty.Type[FileSet]
+
+
+class FormatSignature(ty.NamedTuple):
+    """The bytes that identify a format at a fixed offset from the start of its files
+
+    Parameters
+    ----------
+    offset : int
+        the offset of the signature from the start of the file
+    length : int
+        the number of bytes the signature is matched against
+    magic : bytes, optional
+        the exact bytes of the signature (for ``WithMagicNumber`` formats)
+    pattern : re.Pattern, optional
+        a regular expression the signature is matched with (for ``WithMagicVersion``
+        formats)
+    """
+
+    offset: int
+    length: int
+    magic: ty.Optional[bytes] = None
+    pattern: ty.Optional[ty.Pattern[bytes]] = None
+
+    @property
+    def end(self) -> int:
+        return self.offset + self.length
+
+    def matches(self, buffer: bytes) -> bool:
+        """Whether the start of a file matches the signature
+
+        Parameters
+        ----------
+        buffer : bytes
+            the start of the file
+
+        Returns
+        -------
+        bool
+            whether the signature matches
+        """
+        section = buffer[self.offset : self.end]
+        if self.magic is not None:
+            return section == self.magic
+        assert self.pattern is not None
+        return self.pattern.match(section) is not None
+
+
+def format_signature(klass: FileSetType) -> ty.Optional[FormatSignature]:
+    """Derives the signature of a format from the attributes of its magic number/version
+    mixins
+
+    Parameters
+    ----------
+    klass : type[FileSet]
+        the format class
+
+    Returns
+    -------
+    FormatSignature or None
+        the signature, None if the format doesn't have one
+    """
+    if issubclass(klass, WithMagicNumber):
+        magic = klass.magic_number
+        if isinstance(magic, str) and getattr(klass, "binary", True):
+            magic = bytes.fromhex(magic)
+        elif isinstance(magic, str):
+            magic = magic.encode()
+        return FormatSignature(klass.magic_number_offset, len(magic), magic=magic)
+    if issubclass(klass, WithMagicVersion):
+        length = klass.magic_pattern_maxlength or len(klass.magic_pattern)
+        return FormatSignature(
+            klass.magic_pattern_offset,
+            length,
+            pattern=re.compile(klass.magic_pattern),
+        )
+    return None
+
+
+class FormatSniffer:
+    """Matches files against the signatures of a set of candidate formats from a single
+    read of the start of each file
+
+    Parameters
+    ----------
+    candidates : Iterable[type[FileSet]], optional
+        the candidate formats, by default all the formats in ``fileformats.medimage``
+        that have signatures. Candidates without signatures are matched by their
+        extensions only
+    """
+
+    def __init__(self, candidates: ty.Optional[ty.Iterable[FileSetType]] = None):
+        if candidates is None:
+            candidates = medimage_formats()
+        # Try the most specific formats first, i.e. subclasses before their bases
+        self.candidates = tuple(
+            sorted(dict.fromkeys(candidates), key=lambda c: -len(c.__mro__))
+        )
+        self.signatures = {c: format_signature(c) for c in self.candidates}
+        self.buffer_size = max(
+            [SNIFF_BUFFER_SIZE]
+            + [s.end for s in self.signatures.values() if s is not None]
+        )
+
+    def __repr__(self) -> str:
+        return f"{type(self).__name__}({len(self.candidates)} candidates)"
+
+    def read_buffer(self, fspath: ty.Union[str, os.PathLike[str]]) -> bytes:
+        """Reads the start of a file, which is matched against the signatures
+
+        Parameters
+        ----------
+        fspath : str or os.PathLike
+            the path to the file
+
+        Returns
+        -------
+        bytes
+            the start of the file (the whole file if it is shorter than the buffer)
+        """
+        with open(fspath, "rb", buffering=0) as f:
+            instrumentation.count("file.open")
+            buffer = f.read(self.buffer_size)
+        instrumentation.count("file.bytes_read", len(buffer))
+        return buffer
+
+    def match(
+        self, buffer: bytes, fspath: ty.Union[str, os.PathLike[str], None] = None
+    ) -> ty.List[FileSetType]:
+        """Matches the start of a file against the signatures of the candidates
+
+        Parameters
+        ----------
+        buffer : bytes
+            the start of the file
+        fspath : str or os.PathLike, optional
+            the path to the file, which if provided is also matched against the
+            extensions of the candidates
+
+        Returns
+        -------
+        list[type[FileSet]]
+            the candidates that match, most specific first
+        """
+        name = Path(fspath).name if fspath is not None else None
+        matches = []
+        for candidate in self.candidates:
+            signature = self.signatures[candidate]
+            if signature is not None and not signature.matches(buffer):
+                continue
+            if name is not None and not _matches_ext(candidate, name):
+                continue
+            if signature is None and name is None:
+                continue
+            matches.append(candidate)
+        return matches
+
+    def sniff(self, fspath: ty.Union[str, os.PathLike[str]]) -> ty.List[FileSetType]:
+        """Finds the candidates whose signatures (and extensions) match a file
+
+        Parameters
+        ----------
+        fspath : str or os.PathLike
+            the path to the file
+
+        Returns
+        -------
+        list[type[FileSet]]
+            the candidates that match, most specific first
+        """
+        with instrumentation.span("sniff", path=fspath):
+            return self.match(self.read_buffer(fspath), fspath)
+
+    def from_path(self, fspath: ty.Union[str, os.PathLike[str]]) -> FileSet:
+        """Returns the file as an instance of the most specific candidate that it
+        matches and that validates, e.g. that has the required side-cars
+
+        Parameters
+        ----------
+        fspath : str or os.PathLike
+            the path to the file
+
+        Returns
+        -------
+        FileSet
+            the file as an instance of the format it was recognised as
+
+        Raises
+        ------
+        FormatRecognitionError
+            if the file doesn't match any of the candidates
+        """
+        with instrumentation.span("sniff", path=fspath):
+            buffer = self.read_buffer(fspath)
+            matches = self.match(buffer, fspath)
+        with serve_sniffed_buffer(fspath, buffer, self.buffer_size):
+            for candidate in matches:
+                try:
+                    return candidate(Path(fspath))
+                except FormatMismatchError:
+                    continue
+        raise FormatRecognitionError(
+            f"{fspath} doesn't match any of the candidate formats "
+            f"({[c.__name__ for c in self.candidates]})"
+        )
+
+    async def sniff_batch(
+        self,
+        fspaths: ty.Iterable[ty.Union[str, os.PathLike[str]]],
+        max_concurrency: int = SNIFF_CONCURRENCY,
+    ) -> ty.List[ty.List[FileSetType]]:
+        """Sniffs many files concurrently, so that the latency of reading each file
+        (e.g. from an object-store backed mount) is overlapped with the others
+
+        Parameters
+        ----------
+        fspaths : Iterable[str or os.PathLike]
+            the paths to the files
+        max_concurrency : int, optional
+            the maximum number of files read at the same time, by default
+            ``SNIFF_CONCURRENCY``
+
+        Returns
+        -------
+        list[list[type[FileSet]]]
+            the candidates that match each file, in the order of the paths
+        """
+        # Imported here so it is only loaded by callers that are already using it
+        import asyncio
+
+        semaphore = asyncio.Semaphore(max_concurrency)
+
+        async def sniff(
+            fspath: ty.Union[str, os.PathLike[str]],
+        ) -> ty.List[FileSetType]:
+            async with semaphore:
+                return await asyncio.to_thread(self.sniff, fspath)
+
+        return list(await asyncio.gather(*(sniff(p) for p in fspaths)))
+
+    async def from_paths_batch(
+        self,
+        fspaths: ty.Iterable[ty.Union[str, os.PathLike[str]]],
+        max_concurrency: int = SNIFF_CONCURRENCY,
+        on_unrecognised: ty.Optional[ty.Callable[[Path], None]] = None,
+    ) -> ty.List[FileSet]:
+        """Recognises the formats of many files concurrently (see ``from_path``)
+
+        Parameters
+        ----------
+        fspaths : Iterable[str or os.PathLike]
+            the paths to the files
+        max_concurrency : int, optional
+            the maximum number of files read at the same time, by default
+            ``SNIFF_CONCURRENCY``
+        on_unrecognised : Callable[[Path], None], optional
+            called with the paths that don't match any of the candidates, which are
+            then skipped. If not provided an error is raised for them instead
+
+        Returns
+        -------
+        list[FileSet]
+            the recognised files, in the order of the paths
+
+        Raises
+        ------
+        FormatRecognitionError
+            if a file doesn't match any of the candidates and ``on_unrecognised`` isn't
+            provided
+        """
+        import asyncio
+
+        semaphore = asyncio.Semaphore(max_concurrency)
+
+        async def recognise(
+            fspath: ty.Union[str, os.PathLike[str]],
+        ) -> ty.Optional[FileSet]:
+            async with semaphore:
+                try:
+                    return await asyncio.to_thread(self.from_path, fspath)
+                except FormatRecognitionError:
+                    if on_unrecognised is None:
+                        raise
+                    on_unrecognised(Path(fspath))
+                    return None
+
+        recognised = await asyncio.gather(*(recognise(p) for p in fspaths))
+        return [f for f in recognised if f is not None]
+
+
+def medimage_formats() -> ty.List[FileSetType]:
+    """The formats in ``fileformats.medimage`` that have signatures, skipping those
+    that are only aliases of the format they subclass (e.g. ``GDCM``), which would
+    otherwise be preferred to it as the more specific format
+
+    Returns
+    -------
+    list[type[FileSet]]
+        the formats
+    """
+    import fileformats.medimage
+
+    formats = []
+    for name in fileformats.medimage.__all__:
+        obj = getattr(fileformats.medimage, name)
+        if (
+            isinstance(obj, type)
+            and issubclass(obj, FileSet)
+            and format_signature(obj) is not None
+            and not _is_alias(obj)
+        ):
+            formats.append(obj)
+    return formats
+
+
+def _is_alias(klass: FileSetType) -> bool:
+    return len(klass.__bases__) == 1 and all(n.startswith("_") for n in vars(klass))
+
+
+def _matches_ext(klass: FileSetType, name: str) -> bool:
+    ext = getattr(klass, "ext", None)
+    if not ext:
+        return True
+    exts = (ext,) + tuple(getattr(klass, "alternate_exts", None) or ())
+    return any(name.endswith(e) for e in exts)
+
+
+class WithSniffedContents:
+    """Mixin for formats whose reads of the start of their files (e.g. by the checks
+    of their magic numbers) are served from the buffer the file was sniffed from while
+    it is being recognised by a ``FormatSniffer``"""
+
+    def read_contents(self, size: ty.Optional[int] = None, offset: int = 0) -> bytes:
+        if self.binary:  # type: ignore[attr-defined]
+            contents = read_sniffed_contents(
+                self.fspath, size, offset  # type: ignore[attr-defined]
+            )
+            if contents is not None:
+                return contents
+        return super().read_contents(size=size, offset=offset)  # type: ignore[misc,no-any-return]
+
+
+@contextmanager
+def serve_sniffed_buffer(
+    fspath: ty.Union[str, os.PathLike[str]], buffer: bytes, buffer_size: int
+) -> ty.Iterator[None]:
+    """Serves reads of the start of a file from the buffer it was sniffed from while
+    the context is active (see ``read_sniffed_contents``)
+
+    Parameters
+    ----------
+    fspath : str or os.PathLike
+        the path to the file
+    buffer : bytes
+        the start of the file
+    buffer_size : int
+        the number of bytes that were requested when the buffer was read, so it can be
+        determined whether the buffer holds the whole file
+    """
+    buffers = dict(_sniffed_buffers.get())
+    buffers[os.path.abspath(fspath)] = (buffer, len(buffer) < buffer_size)
+    token = _sniffed_buffers.set(buffers)
+    try:
+        yield
+    finally:
+        _sniffed_buffers.reset(token)
+
+
+def read_sniffed_contents(
+    fspath: ty.Union[str, os.PathLike[str]], size: ty.Optional[int], offset: int
+) -> ty.Optional[bytes]:
+    """Reads a section of a file from the buffer it was sniffed from, if it is being
+    served (see ``serve_sniffed_buffer``) and holds the section
+
+    Parameters
+    ----------
+    fspath : str or os.PathLike
+        the path to the file
+    size : int, optional
+        the number of bytes to read, to the end of the file if None
+    offset : int
+        the offset of the section from the start of the file
+
+    Returns
+    -------
+    bytes or None
+        the section of the file, None if it isn't available from a buffer
+    """
+    buffers = _sniffed_buffers.get()
+    if not buffers or offset < 0:
+        return None
+    try:
+        buffer, whole_file = buffers[os.path.abspath(fspath)]
+    except KeyError:
+        return None
+    if size is None:
+        return buffer[offset:] if whole_file else None
+    if offset + size > len(buffer) and not whole_file:
+        return None
+    return buffer[offset : offset + size]
+
+
+_sniffed_buffers: contextvars.ContextVar[ty.Dict[str, ty.Tuple[bytes, bool]]] = (
+    contextvars.ContextVar("sniffed_buffers", default={})
+)
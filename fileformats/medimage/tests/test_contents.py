@@ -1,11 +1,22 @@
 import pytest
 
 from fileformats.core import from_mime
+from fileformats.core.exceptions import FormatDefinitionError
 from fileformats.medimage import (
+    MedicalImage,
     NiftiGz,
     NiftiGzX,
     T1w,
+    Brain,
+    SpinalCord,
+    Mri,
+    ImagingModality,
+    MagneticResonanceImaging,
+    ComputedTomography,
 )
+from fileformats.medimage.contents.anatomical_entity import AnatomicalEntity
+from fileformats.medimage.contents.ontology import get_contents_ontology
+from fileformats.medimage.base import _classified_type, CLASSIFIED_TYPES_CACHE_SIZE
 
 
 def test_image_contents1():
@@ -16,3 +27,41 @@ def test_image_contents1():
 def test_image_contents_generation() -> None:
     img = NiftiGzX[T1w].sample()
     assert len(img.dims()) == 3
+
+
+def test_classified_types_memoised():
+    classified = NiftiGzX[Brain, T1w]
+    assert NiftiGzX[T1w, Brain] is classified
+    assert NiftiGzX[[T1w, Brain]] is classified
+    assert NiftiGzX[T1w] is not classified
+    with pytest.raises(FormatDefinitionError, match="ImagingModality"):
+        NiftiGzX[T1w, Mri]
+    # Invalid combinations are rejected every time, not just when first created
+    with pytest.raises(FormatDefinitionError):
+        NiftiGzX[T1w, Mri]
+    # The memo of the classifiers as passed is bounded
+    assert _classified_type.cache_info().maxsize == CLASSIFIED_TYPES_CACHE_SIZE
+
+
+def test_contents_ontology():
+    ontology = get_contents_ontology()
+    assert ontology.by_dicom_modality["MR"] is MagneticResonanceImaging
+    assert ontology.by_dicom_modality["CT"] is ComputedTomography
+    assert ontology.by_ontology_link["http://www.radlex.org/RID/RID10794"] is T1w
+    assert ontology.is_subclass(T1w, MagneticResonanceImaging)
+    assert not ontology.is_subclass(Brain, ImagingModality)
+    exclusive = MedicalImage.exclusive_classifiers
+    assert ontology.exclusive_category(T1w, exclusive) is ImagingModality
+    assert ontology.exclusive_category(Brain, exclusive) is AnatomicalEntity
+    assert ontology.conflicts([T1w, Brain], exclusive) == {}
+    assert set(ontology.conflicts([T1w, Mri], exclusive)) == {Mri, ImagingModality}
+    assert ontology.conflicts([Brain, SpinalCord], exclusive) == {
+        AnatomicalEntity: [Brain, SpinalCord]
+    }
+
+    # The index is rebuilt when new classifiers are defined
+    class NewModality(ImagingModality):
+        dicom_modality = "NEW"
+
+    assert get_contents_ontology() is not ontology
+    assert get_contents_ontology().by_dicom_modality["NEW"] is NewModality
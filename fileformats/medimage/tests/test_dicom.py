@@ -1,12 +1,30 @@
+import io
 import itertools
 import pytest
+import pydicom
+from pydicom.dataset import Dataset, FileMetaDataset
+from pydicom.sequence import Sequence
+from pydicom.uid import (
+    ImplicitVRLittleEndian,
+    ExplicitVRLittleEndian,
+    ExplicitVRBigEndian,
+    DeflatedExplicitVRLittleEndian,
+    generate_uid,
+)
 from medimages4tests.dummy.dicom.mri.t1w.siemens.skyra.syngo_d13c import (
     get_image as get_dicom,
 )
 from medimages4tests.dummy.nifti import get_image as get_nifti
 from fileformats.core.exceptions import FormatMismatchError
 from fileformats.core import from_paths
-from fileformats.medimage import DicomDir, DicomSeries
+from fileformats.medimage import DicomDir, DicomSeries, Mri, Ct
+from fileformats.medimage.dicom import (
+    read_dicom_tags,
+    read_dicom_modality,
+    get_dicom_tag,
+    locate_dicom_pixel_data,
+    slice_location,
+)
 
 
 def test_dicom_identify():
@@ -48,3 +66,229 @@ def test_dicom_dir_metadata(tmp_path):
     assert not isinstance(series.metadata["SeriesNumber"], list)
     # check the SOP Instance ID has been converted into a list
     assert isinstance(series.metadata["SOPInstanceUID"], list)
+
+
+def test_dicom_dir_spatial_order(dummy_t1w_dicom):
+    # A new instance whose metadata is read first, which must not leave the unsorted
+    # files in the cache of its contents
+    dicom_dir = DicomDir(dummy_t1w_dicom.fspath)
+    dicom_dir.metadata["SeriesNumber"]
+    locations = []
+    for dicom in dicom_dir.contents:
+        tags = read_dicom_tags(
+            dicom.fspath, ["ImagePositionPatient", "ImageOrientationPatient"]
+        )
+        locations.append(
+            slice_location(
+                tags["ImagePositionPatient"], tags["ImageOrientationPatient"]
+            )
+        )
+    assert locations == sorted(locations)
+    assert len(set(locations)) == len(locations)
+
+
+def test_dicom_series_read_batch(tmp_path):
+    filesets = [DicomSeries.sample(tmp_path, seed=i) for i in range(1, 4)]
+
+    batch = DicomSeries.read_batch(
+        [f.fspaths for f in filesets], metadata_keys=["SeriesNumber"]
+    )
+
+    assert batch["dims"].tolist() == [list(f.dims()) for f in filesets]
+    assert batch["vox_sizes"].tolist() == [list(f.vox_sizes()) for f in filesets]
+    assert batch["SeriesNumber"].tolist() == [
+        f.metadata["SeriesNumber"] for f in filesets
+    ]
+
+
+def _dicom_stream(transfer_syntax):
+    """Writes a small DICOM data set with a nested sequence to an in-memory stream"""
+    ds = Dataset()
+    ds.file_meta = FileMetaDataset()
+    ds.file_meta.TransferSyntaxUID = transfer_syntax
+    ds.file_meta.MediaStorageSOPClassUID = "1.2.840.10008.5.1.4.1.1.4"
+    ds.file_meta.MediaStorageSOPInstanceUID = generate_uid()
+    ds.SOPInstanceUID = ds.file_meta.MediaStorageSOPInstanceUID
+    ds.Modality = "MR"
+    code = Dataset()
+    code.CodeValue = "123"
+    code.CodeMeaning = "A procedure"
+    ds.ProcedureCodeSequence = Sequence([code])
+    ds.SeriesNumber = 5
+    ds.Rows = 4
+    ds.Columns = 3
+    ds.PixelSpacing = [0.5, 0.75]
+    ds.BitsAllocated = 16
+    ds.PixelRepresentation = 0
+    ds.PixelData = b"\x00\x01" * 12
+    stream = io.BytesIO()
+    kwargs = {}
+    if not transfer_syntax.is_deflated:
+        kwargs = {
+            "implicit_vr": transfer_syntax.is_implicit_VR,
+            "little_endian": transfer_syntax.is_little_endian,
+        }
+    pydicom.dcmwrite(stream, ds, enforce_file_format=True, **kwargs)
+    stream.seek(0)
+    return ds, stream
+
+
+@pytest.mark.parametrize(
+    "transfer_syntax",
+    [
+        ImplicitVRLittleEndian,
+        ExplicitVRLittleEndian,
+        ExplicitVRBigEndian,
+        DeflatedExplicitVRLittleEndian,
+    ],
+)
+def test_read_dicom_tags(transfer_syntax):
+    ds, stream = _dicom_stream(transfer_syntax)
+    tags = read_dicom_tags(
+        stream,
+        ["SOPInstanceUID", "Modality", "SeriesNumber", "Rows", ("0028", "0011")]
+        + ["PixelSpacing", (0x0010, 0x0010)],
+    )
+    assert tags == {
+        "SOPInstanceUID": ds.SOPInstanceUID,
+        "Modality": "MR",
+        "SeriesNumber": "5",
+        "Rows": 4,
+        ("0028", "0011"): 3,
+        "PixelSpacing": "0.5\\0.75",
+    }
+
+
+@pytest.mark.parametrize(
+    "transfer_syntax",
+    [
+        ImplicitVRLittleEndian,
+        ExplicitVRLittleEndian,
+        ExplicitVRBigEndian,
+        DeflatedExplicitVRLittleEndian,
+    ],
+)
+def test_locate_dicom_pixel_data(transfer_syntax):
+    ds, stream = _dicom_stream(transfer_syntax)
+    location = locate_dicom_pixel_data(stream)
+    if transfer_syntax.is_deflated:
+        assert location is None
+    else:
+        offset, length = location
+        assert stream.getvalue()[offset : offset + length] == ds.PixelData
+
+
+def test_read_dicom_tags_matches_pydicom():
+    dicom_file = next(get_dicom().iterdir())
+    dcm = pydicom.dcmread(dicom_file, stop_before_pixels=True)
+    tags = read_dicom_tags(
+        dicom_file, ["StudyInstanceUID", "SeriesNumber", "Rows", "Columns"]
+    )
+    assert tags["StudyInstanceUID"] == dcm.StudyInstanceUID
+    assert int(tags["SeriesNumber"]) == dcm.SeriesNumber
+    assert tags["Rows"] == dcm.Rows
+    assert tags["Columns"] == dcm.Columns
+    assert get_dicom_tag(dicom_file, (0x0020, 0x000D)) == dcm.StudyInstanceUID
+
+
+@pytest.mark.parametrize("pool", ["thread", "process"])
+def test_series_from_paths_pool(tmp_path, pool):
+    filesets = [
+        DicomSeries.sample(tmp_path, seed=1),
+        DicomSeries.sample(tmp_path, seed=2),
+    ]
+    not_dicom = tmp_path / "not-a-dicom.txt"
+    not_dicom.write_text("not a dicom")
+    # A file whose deflated data set is corrupt, which can't be parsed past the file
+    # meta information
+    corrupt = tmp_path / "corrupt.dcm"
+    _, stream = _dicom_stream(DeflatedExplicitVRLittleEndian)
+    data = stream.read()
+    meta_end = 144 + int.from_bytes(data[140:144], "little")
+    corrupt.write_bytes(data[:meta_end] + b"\xff" * 64)
+    fspaths = list(itertools.chain(*(f.fspaths for f in filesets)))
+    fspaths += [not_dicom, corrupt]
+
+    detected, remaining = DicomSeries.from_paths(fspaths, max_workers=2, pool=pool)
+
+    assert detected == set(filesets)
+    assert remaining == {not_dicom, corrupt}
+
+
+def test_dicom_modality_classification(tmp_path):
+    dicom_dir = DicomDir(get_dicom())
+    assert dicom_dir.modality == "MR"
+    assert dicom_dir.modality_classifier is Mri
+    assert type(dicom_dir.classify_modality()) is DicomDir[Mri]
+    assert dicom_dir.contents[0].modality == "MR"
+    # Already classified types are left as they are
+    classified = DicomDir[Mri](dicom_dir.fspath)
+    assert classified.classify_modality() is classified
+
+    # Relabel a copy of the series as CT
+    mr_paths = sorted(dicom_dir.fspath.iterdir())
+    ct_paths = []
+    for fspath in mr_paths:
+        dcm = pydicom.dcmread(fspath)
+        dcm.Modality = "CT"
+        dcm.SeriesNumber = 99
+        ct_path = tmp_path / fspath.name
+        dcm.save_as(ct_path)
+        ct_paths.append(ct_path)
+    assert read_dicom_modality(ct_paths[0]) == "CT"
+
+    detected, remaining = DicomSeries.from_paths(
+        mr_paths + ct_paths, classify_modality=True
+    )
+    assert not remaining
+    assert {type(s) for s in detected} == {DicomSeries[Mri], DicomSeries[Ct]}
+    (ct_series,) = (s for s in detected if isinstance(s, DicomSeries[Ct]))
+    assert sorted(ct_series.fspaths) == ct_paths
+
+
+def test_series_iter_from_paths(tmp_path):
+    filesets = []
+    for seed in (1, 2):
+        series_dir = tmp_path / str(seed)
+        series_dir.mkdir()
+        filesets.append(DicomSeries.sample(series_dir, seed=seed))
+    not_dicom = tmp_path / "2" / "not-a-dicom.txt"
+    not_dicom.write_text("not a dicom")
+    fspaths = [p for f in filesets for p in sorted(f.fspaths)] + [not_dicom]
+
+    consumed = []
+
+    def iter_paths():
+        for fspath in fspaths:
+            consumed.append(fspath)
+            yield fspath
+
+    # Series are yielded as soon as the directory they are in has been read
+    unrecognised = []
+    detected = DicomSeries.iter_from_paths(
+        iter_paths(),
+        scope="directory",
+        chunk_size=16,
+        max_workers=1,
+        on_unrecognised=unrecognised.append,
+    )
+    assert next(detected) == filesets[0]
+    assert len(consumed) < len(fspaths)
+    assert list(detected) == [filesets[1]]
+    assert unrecognised == [not_dicom]
+
+    # or when the caller signals that they are complete
+    consumed.clear()
+    num_images = len(filesets[0].fspaths)
+    detected = DicomSeries.iter_from_paths(
+        iter_paths(),
+        series_complete=lambda ids, n: n == num_images,
+        chunk_size=16,
+        max_workers=1,
+    )
+    assert next(detected) == filesets[0]
+    assert len(consumed) < len(fspaths)
+    assert list(detected) == [filesets[1]]
+
+    with pytest.raises(ValueError, match="Unrecognised scope"):
+        next(DicomSeries.iter_from_paths(fspaths, scope="study"))
@@ -0,0 +1,79 @@
+import gzip
+import os
+import pytest
+from fileformats.medimage.gzip_codec import (
+    GzipCodec,
+    ParallelGzipCodec,
+    compress_file,
+    decompress_file,
+    get_gzip_codec,
+    set_gzip_codec,
+    GZIP_THREADS_ENV_VAR,
+)
+
+
+@pytest.fixture
+def data():
+    return os.urandom(100_000) + bytes(range(256)) * 2000 + b"\0" * 123_457
+
+
+@pytest.mark.parametrize(
+    "writer", [ParallelGzipCodec(4, block_size=64_000), GzipCodec()]
+)
+@pytest.mark.parametrize("reader", [ParallelGzipCodec(4), GzipCodec()])
+def test_gzip_codec_roundtrip(tmp_path, data, writer, reader):
+    fspath = tmp_path / "data.gz"
+    with writer.open(fspath, "wb") as f:
+        f.write(data[:1000])
+        f.write(data[1000:])
+    # Readable by standard gzip readers whichever codec wrote it
+    with gzip.open(fspath) as f:
+        assert f.read() == data
+    with reader.open(fspath) as f:
+        assert f.read(10) == data[:10]
+        assert f.read() == data[10:]
+        f.seek(200_000)
+        assert f.read(100) == data[200_000:200_100]
+        f.seek(5)
+        assert f.read(100) == data[5:105]
+
+
+def test_gzip_codec_serial_fallback(tmp_path, data):
+    fspath = tmp_path / "data.gz"
+    with gzip.open(fspath, "wb") as f:
+        f.write(data)
+    # Single-member files not written by the parallel codec are read serially
+    with ParallelGzipCodec(4).open(fspath) as f:
+        assert isinstance(f, gzip.GzipFile)
+        assert f.read() == data
+
+
+def test_gzip_codec_empty(tmp_path):
+    fspath = tmp_path / "empty.gz"
+    with ParallelGzipCodec(2).open(fspath, "wb"):
+        pass
+    with gzip.open(fspath) as f:
+        assert f.read() == b""
+    with ParallelGzipCodec(2).open(fspath) as f:
+        assert f.read() == b""
+
+
+def test_compress_decompress_file(tmp_path, data):
+    in_fspath = tmp_path / "data"
+    in_fspath.write_bytes(data)
+    compress_file(in_fspath, tmp_path / "data.gz", ParallelGzipCodec(3))
+    decompress_file(tmp_path / "data.gz", tmp_path / "out", ParallelGzipCodec(3))
+    assert (tmp_path / "out").read_bytes() == data
+
+
+def test_gzip_codec_config(monkeypatch):
+    monkeypatch.setenv(GZIP_THREADS_ENV_VAR, "1")
+    assert type(get_gzip_codec()) is GzipCodec
+    monkeypatch.setenv(GZIP_THREADS_ENV_VAR, "7")
+    assert get_gzip_codec().threads == 7
+    codec = ParallelGzipCodec(2)
+    previous = set_gzip_codec(codec)
+    try:
+        assert get_gzip_codec() is codec
+    finally:
+        set_gzip_codec(previous)
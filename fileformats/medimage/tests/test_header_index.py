@@ -0,0 +1,97 @@
+import itertools
+import os
+import pytest
+from medimages4tests.dummy.dicom.mri.t1w.siemens.skyra.syngo_d13c import (
+    get_image as get_dicom,
+)
+from fileformats.medimage import DicomImage, DicomSeries, DicomDir
+import fileformats.medimage.header_index as header_index_module
+from fileformats.medimage.header_index import (
+    HeaderIndex,
+    get_header_index,
+    set_header_index,
+)
+
+
+@pytest.fixture
+def header_index(tmp_path):
+    index = HeaderIndex(tmp_path / "index" / "headers.sqlite")
+    previous = set_header_index(index)
+    yield index
+    set_header_index(previous)
+
+
+def test_header_index_invalidation(tmp_path):
+    index = HeaderIndex(tmp_path / "headers.sqlite")
+    fspath = tmp_path / "file.dcm"
+    fspath.write_bytes(b"0" * 10)
+    index.put_tags(fspath, {"SeriesNumber": "1"})
+    index.put_tags(fspath, {"Modality": "MR"})
+    assert index.get_tags(fspath, ["SeriesNumber", "Modality"]) == {
+        "SeriesNumber": "1",
+        "Modality": "MR",
+    }
+    assert index.get_tags(fspath, ["SeriesNumber", "Rows"]) is None
+    # Changing the file invalidates the entry
+    fspath.write_bytes(b"0" * 11)
+    assert index.get_tags(fspath, ["SeriesNumber"]) is None
+    # Entries are persisted between index objects
+    index.put_metadata(fspath, {"PatientName": "Doe^John"})
+    assert HeaderIndex(index.path).get_metadata(fspath) == {"PatientName": "Doe^John"}
+
+
+def test_series_from_paths_indexed(tmp_path, header_index):
+    filesets = [
+        DicomSeries.sample(tmp_path, seed=1),
+        DicomSeries.sample(tmp_path, seed=2),
+    ]
+    fspaths = list(itertools.chain(*(f.fspaths for f in filesets)))
+    detected, _ = DicomSeries.from_paths(fspaths)
+    assert detected == set(filesets)
+    assert header_index.get_tags(fspaths[0], DicomSeries.ID_KEYS) is not None
+    # Warm start should read the IDs from the index
+    detected, _ = DicomSeries.from_paths(fspaths, pool="process", max_workers=2)
+    assert detected == set(filesets)
+
+
+def test_dicom_dir_indexed(tmp_path, header_index):
+    dicom_dir = DicomDir.sample(tmp_path)
+    sorted_paths = [d.fspath for d in dicom_dir.contents]
+    assert header_index.get_tags(sorted_paths[0], ["SOPInstanceUID"])
+    # Reread from a new object with a warm index
+    assert [d.fspath for d in DicomDir(dicom_dir).contents] == sorted_paths
+    metadata = DicomDir(dicom_dir).metadata
+    assert not isinstance(metadata["SeriesNumber"], list)
+    assert header_index.get_metadata(sorted_paths[0])["SeriesNumber"] == (
+        metadata["SeriesNumber"]
+    )
+    assert DicomDir(dicom_dir).metadata["SOPInstanceUID"] == metadata["SOPInstanceUID"]
+
+
+@pytest.mark.parametrize(
+    "metadata_keys",
+    [None, ["PatientName", "SeriesNumber"], [(0x0010, 0x0010)], [0x00200011]],
+)
+def test_dicom_metadata_indexed(metadata_keys, header_index):
+    fspath = sorted(get_dicom().iterdir())[0]
+    set_header_index(None)
+    expected = DicomImage(fspath).read_metadata(metadata_keys=metadata_keys)
+    set_header_index(header_index)
+    # Read twice so the second read is served from the index where possible
+    for _ in range(2):
+        metadata = DicomImage(fspath).read_metadata(metadata_keys=metadata_keys)
+        assert metadata == expected
+        assert {k: type(v) for k, v in metadata.items()} == {
+            k: type(v) for k, v in expected.items()
+        }
+
+
+def test_header_index_from_env(tmp_path, monkeypatch):
+    monkeypatch.setattr(
+        header_index_module, "_header_index", header_index_module._UNSET
+    )
+    monkeypatch.setenv(
+        header_index_module.HEADER_INDEX_ENV_VAR,
+        os.fspath(tmp_path / "env-index.sqlite"),
+    )
+    assert get_header_index().path == tmp_path / "env-index.sqlite"
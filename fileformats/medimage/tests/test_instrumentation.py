@@ -0,0 +1,41 @@
+from medimages4tests.dummy.dicom.mri.t1w.siemens.skyra.syngo_d13c import (
+    get_image as get_dicom,
+)
+from medimages4tests.dummy.nifti import get_image as get_nifti
+from fileformats.medimage.dicom import read_dicom_tags, read_indexed_dicom_tags
+from fileformats.medimage.header_index import HeaderIndex
+from fileformats.medimage.nifti import read_nifti_header
+from fileformats.medimage.instrumentation import record_io
+
+
+def test_record_io(tmp_path):
+    fspaths = sorted(get_dicom().iterdir())[:3]
+    index = HeaderIndex(tmp_path / "headers.sqlite")
+    spans = []
+    with record_io(keep_spans=True, on_span=spans.append) as recording:
+        for fspath in fspaths:
+            read_dicom_tags(fspath, ["SeriesNumber"])
+        read_indexed_dicom_tags(fspaths[0], ["SeriesNumber"], index)
+        read_indexed_dicom_tags(fspaths[0], ["SeriesNumber"], index)
+        read_nifti_header(get_nifti())
+    # Nothing is recorded once the context has exited
+    read_dicom_tags(fspaths[0], ["SeriesNumber"])
+
+    recorded = recording.as_dict()
+    counters = recorded["counters"]
+    assert counters["file.open"] == 5
+    assert (
+        0
+        < counters["file.bytes_read"]
+        <= sum(p.stat().st_size for p in fspaths + [fspaths[0], get_nifti()])
+    )
+    assert counters["dicom.read_header"] == 4
+    assert counters["nifti.read_header"] == 1
+    assert counters["header_index.miss"] == 1
+    assert counters["header_index.hit"] == 1
+    assert recorded["timings"]["dicom.read_header"]["count"] == 4
+    assert recorded["timings"]["dicom.read_header"]["total_time"] > 0
+
+    assert recording.as_spans() == spans
+    assert [s["name"] for s in spans].count("dicom.read_header") == 4
+    assert all(s["end_time_unix_nano"] >= s["start_time_unix_nano"] for s in spans)
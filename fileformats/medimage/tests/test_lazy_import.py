@@ -0,0 +1,40 @@
+import sys
+import json
+import subprocess
+from fileformats.core import from_mime
+import fileformats.medimage
+
+
+def test_lazy_import_single_format():
+    # Run in a fresh interpreter as the test session has already imported everything
+    loaded = json.loads(
+        subprocess.check_output(
+            [
+                sys.executable,
+                "-c",
+                "import sys, json\n"
+                "from fileformats.medimage import Nifti\n"
+                "print(json.dumps(sorted(sys.modules)))",
+            ]
+        )
+    )
+    assert "fileformats.medimage.nifti" in loaded
+    for module in (
+        "fileformats.medimage.dicom",
+        "fileformats.medimage.itk",
+        "fileformats.medimage.raw",
+        "fileformats.image",
+    ):
+        assert module not in loaded
+    # The modality and anatomical entity classifiers are loaded by base.py, which needs
+    # them to define the exclusive categories of MedicalImage
+    assert "fileformats.medimage.contents.imaging.modality" in loaded
+    assert "fileformats.medimage.contents.anatomical_entity" in loaded
+
+
+def test_lazy_import_names():
+    assert set(fileformats.medimage.__all__) <= set(dir(fileformats.medimage))
+    for name in fileformats.medimage.__all__:
+        assert getattr(fileformats.medimage, name) is not None
+    assert from_mime("medimage/nifti-gz-x") is fileformats.medimage.NiftiGzX
+    assert fileformats.medimage.dicom.DicomDir is fileformats.medimage.DicomDir
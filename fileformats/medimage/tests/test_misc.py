@@ -0,0 +1,24 @@
+import pytest
+from fileformats.medimage import Mgh
+
+
+def test_mgh_header(tmp_path):
+    nibabel = pytest.importorskip("nibabel")
+    numpy = pytest.importorskip("numpy")
+    affine = numpy.diag([1.5, 2.0, 2.5, 1.0])
+    fspath = tmp_path / "image.mgh"
+    nibabel.save(
+        nibabel.MGHImage(numpy.zeros((4, 5, 6), dtype=numpy.float32), affine), fspath
+    )
+    expected = nibabel.load(fspath).header
+
+    mgh = Mgh(fspath)
+
+    assert mgh.metadata["version"] == 1
+    assert mgh.metadata["dims"] == tuple(expected["dims"])
+    assert mgh.metadata["type"] == expected["type"]
+    assert sum(mgh.metadata["Mdc"], ()) == pytest.approx(tuple(expected["Mdc"].flat))
+    assert mgh.metadata["Pxyz_c"] == pytest.approx(tuple(expected["Pxyz_c"]))
+    assert mgh.dims() == (4, 5, 6)
+    assert mgh.vox_sizes() == (1.5, 2.0, 2.5)
+    assert Mgh.read_batch([fspath])["dims"].tolist() == [[4, 5, 6]]
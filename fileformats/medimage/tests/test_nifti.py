@@ -2,7 +2,8 @@ import pytest
 from medimages4tests.dummy.dicom.mri.t1w.siemens.skyra.syngo_d13c import get_image as get_dicom
 from medimages4tests.dummy.nifti import get_image as get_nifti
 from fileformats.core.exceptions import FormatMismatchError
-from fileformats.medimage import Nifti1
+from fileformats.medimage import Nifti, Nifti1, NiftiGz
+from fileformats.medimage.nifti import read_nifti_header
 
 
 def test_nifti_identify():
@@ -12,3 +13,97 @@ def test_nifti_identify():
 def test_nifti_not_identify():
     with pytest.raises(FormatMismatchError, match="No matching files with extensions"):
         Nifti1(get_dicom())
+
+
+@pytest.mark.parametrize(
+    "header_class,suffix,byte_order",
+    [
+        ("Nifti1Header", ".nii", "<"),
+        ("Nifti1Header", ".nii", ">"),
+        ("Nifti2Header", ".nii", "<"),
+        ("Nifti1Header", ".nii.gz", "<"),
+    ],
+)
+def test_read_nifti_header(tmp_path, header_class, suffix, byte_order):
+    nibabel = pytest.importorskip("nibabel")
+    numpy = pytest.importorskip("numpy")
+    header = getattr(nibabel, header_class)(endianness=byte_order)
+    header.set_data_shape((6, 5, 4, 3))
+    header.set_zooms((1.5, 2.0, 2.5, 3.0))
+    header.set_data_dtype(numpy.int16)
+    header["descrip"] = b"a description"
+    image_class = nibabel.Nifti1Image if "1" in header_class else nibabel.Nifti2Image
+    fspath = tmp_path / ("image" + suffix)
+    image = image_class(numpy.zeros((6, 5, 4, 3), dtype=numpy.int16), None, header)
+    nibabel.save(image, fspath)
+
+    with nibabel.openers.ImageOpener(fspath) as f:
+        expected = type(header).from_fileobj(f)
+    header_values = read_nifti_header(fspath)
+    assert set(header_values) == set(expected.keys())
+    for key, value in header_values.items():
+        if isinstance(value, str):
+            assert value == expected[key].item().decode("latin-1")
+        elif isinstance(value, tuple):
+            assert value == pytest.approx(tuple(expected[key]))
+        else:
+            assert value == pytest.approx(expected[key].item())
+
+    nifti = (NiftiGz if suffix == ".nii.gz" else Nifti)(fspath)
+    assert nifti.dims() == (6, 5, 4, 3)
+    assert nifti.vox_sizes() == (1.5, 2.0, 2.5, 3.0)
+
+
+def test_read_nifti_header_invalid(tmp_path):
+    fspath = tmp_path / "image.nii"
+    fspath.write_bytes(b"\0" * 1024)
+    with pytest.raises(ValueError, match="Could not read NIfTI header"):
+        read_nifti_header(fspath)
+
+
+def test_nifti_read_batch(tmp_path):
+    nibabel = pytest.importorskip("nibabel")
+    numpy = pytest.importorskip("numpy")
+    shapes = [(4, 5, 6), (4, 5, 6, 3), (7, 8, 9)]
+    fspaths = []
+    for i, shape in enumerate(shapes):
+        fspath = tmp_path / f"image{i}.nii.gz"
+        image = nibabel.Nifti1Image(numpy.zeros(shape, dtype=numpy.uint8), None)
+        image.header.set_zooms((i + 1.0,) * len(shape))
+        nibabel.save(image, fspath)
+        fspaths.append(fspath)
+    invalid = tmp_path / "invalid.nii.gz"
+    invalid.write_bytes(b"not an image")
+
+    batch = NiftiGz.read_batch(
+        fspaths[:2] + [invalid, NiftiGz(fspaths[2])],
+        metadata_keys=["datatype", "dim"],
+        ignore_errors=True,
+    )
+
+    assert batch["fspath"].tolist() == [str(p) for p in fspaths[:2] + [invalid]] + [
+        str(fspaths[2])
+    ]
+    assert batch["ndim"].tolist() == [3, 4, 0, 3]
+    assert batch["dims"].tolist() == [
+        [4, 5, 6, 1],
+        [4, 5, 6, 3],
+        [0, 0, 0, 0],
+        [7, 8, 9, 1],
+    ]
+    assert numpy.array_equal(
+        batch["vox_sizes"],
+        [
+            [1.0, 1.0, 1.0, numpy.nan],
+            [2.0, 2.0, 2.0, 2.0],
+            [numpy.nan] * 4,
+            [3.0, 3.0, 3.0, numpy.nan],
+        ],
+        equal_nan=True,
+    )
+    assert batch["error"][2] is not None
+    assert [e is None for e in batch["error"]] == [True, True, False, True]
+    assert batch["datatype"].tolist() == [2, 2, None, 2]
+
+    with pytest.raises(FormatMismatchError):
+        NiftiGz.read_batch(fspaths + [invalid])
@@ -0,0 +1,58 @@
+import asyncio
+import pytest
+from medimages4tests.dummy.dicom.mri.t1w.siemens.skyra.syngo_d13c import (
+    get_image as get_dicom,
+)
+from medimages4tests.dummy.nifti import get_image as get_nifti
+from fileformats.core.exceptions import FormatRecognitionError
+from fileformats.medimage import DicomImage, Mgh, Nifti1, Nrrd
+from fileformats.medimage.instrumentation import record_io
+from fileformats.medimage.sniffing import FormatSniffer
+
+
+@pytest.fixture
+def sniffed_paths(tmp_path):
+    mgh = tmp_path / "image.mgh"
+    mgh.write_bytes((1).to_bytes(4, "big") + bytes(280))
+    nrrd = tmp_path / "image.nrrd"
+    nrrd.write_bytes(b"NRRD0004\ntype: uint8\ndimension: 1\nsizes: 1\n\n\x00")
+    return [get_nifti(), mgh, nrrd, sorted(get_dicom().iterdir())[0]]
+
+
+def test_sniff_from_path(sniffed_paths):
+    sniffer = FormatSniffer()
+    for fspath, klass in zip(sniffed_paths, [Nifti1, Mgh, Nrrd, DicomImage]):
+        assert klass in sniffer.sniff(fspath)
+        with record_io() as recording:
+            fileset = sniffer.from_path(fspath)
+        assert type(fileset) is klass
+        if klass is not DicomImage:
+            # The checks of the signatures are served from the sniffed buffer
+            assert recording.as_dict()["counters"]["file.open"] == 1
+
+
+def test_sniff_unrecognised(tmp_path):
+    fspath = tmp_path / "image.nii"
+    fspath.write_bytes(bytes(400))
+    sniffer = FormatSniffer()
+    assert sniffer.sniff(fspath) == []
+    with pytest.raises(FormatRecognitionError):
+        sniffer.from_path(fspath)
+
+
+def test_sniff_batch(sniffed_paths, tmp_path):
+    unrecognised = tmp_path / "notes.txt"
+    unrecognised.write_text("not an image")
+    sniffer = FormatSniffer([Nifti1, Mgh, Nrrd])
+    sniffed = asyncio.run(sniffer.sniff_batch(sniffed_paths, max_concurrency=2))
+    assert sniffed == [[Nifti1], [Mgh], [Nrrd], []]
+    skipped = []
+    filesets = asyncio.run(
+        sniffer.from_paths_batch(
+            sniffed_paths[:3] + [unrecognised], on_unrecognised=skipped.append
+        )
+    )
+    assert [type(f) for f in filesets] == [Nifti1, Mgh, Nrrd]
+    assert skipped == [unrecognised]
+    with pytest.raises(FormatRecognitionError):
+        asyncio.run(sniffer.from_paths_batch([unrecognised]))